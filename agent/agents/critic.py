@@ -5,6 +5,7 @@ from typing import Dict, List, Optional, Union
 from clients.ollama_client import OllamaClient
 from models.tasks import CriticFeedback, parse_critic_feedback
 from prompts import SystemPrompts, UserPrompts
+from utils.prompt_payload import encode, strip_raw, task_results_payload
 from utils.prompt_renderer import render
 
 
@@ -23,17 +24,83 @@ class Critic:
         baseline_feedback: Optional[Union[CriticFeedback, Dict[str, object]]] = None,
         scenario_id: str | None = None,
     ) -> CriticFeedback:
-        baseline_payload_text = ""
-        if baseline_feedback:
-            payload: Dict[str, object] = {}
-            if isinstance(baseline_feedback, CriticFeedback):
-                payload = baseline_feedback.raw or baseline_feedback.__dict__
-            elif isinstance(baseline_feedback, dict):
-                payload = baseline_feedback
-            try:
-                baseline_payload_text = json.dumps(payload, ensure_ascii=False, indent=2)
-            except Exception:
-                baseline_payload_text = ""
+        content = self.client.chat(
+            model=self.model,
+            messages=self._build_messages(
+                goal, context, constraints, task_results, unresolved_tasks, baseline_feedback
+            ),
+            scenario_id=scenario_id,
+            notes="critic.evaluate_final",
+        )
+        # print("[Critic][debug] raw:", content)
+        return self._parse_feedback(content)
+
+    async def aevaluate_final(
+        self,
+        goal: str,
+        context: str,
+        constraints: str,
+        task_results: List[Dict[str, object]],
+        unresolved_tasks: List[Dict[str, object]],
+        baseline_feedback: Optional[Union[CriticFeedback, Dict[str, object]]] = None,
+        scenario_id: str | None = None,
+    ) -> CriticFeedback:
+        content = await self.client.achat(
+            model=self.model,
+            messages=self._build_messages(
+                goal, context, constraints, task_results, unresolved_tasks, baseline_feedback
+            ),
+            scenario_id=scenario_id,
+            notes="critic.evaluate_final",
+        )
+        return self._parse_feedback(content)
+
+    def evaluate_incremental(
+        self,
+        goal: str,
+        constraints: str,
+        baseline_feedback: Union[CriticFeedback, Dict[str, object]],
+        changes: List[Dict[str, object]],
+        scenario_id: str | None = None,
+    ) -> CriticFeedback:
+        """
+        Re-evaluate after corrections from the baseline feedback and the diffs of the corrected
+        files only (see utils.file_diff.diff_task_results), instead of every task result.
+        """
+        content = self.client.chat(
+            model=self.model,
+            messages=self._build_incremental_messages(goal, constraints, baseline_feedback, changes),
+            scenario_id=scenario_id,
+            notes="critic.evaluate_incremental",
+        )
+        return self._parse_feedback(content)
+
+    async def aevaluate_incremental(
+        self,
+        goal: str,
+        constraints: str,
+        baseline_feedback: Union[CriticFeedback, Dict[str, object]],
+        changes: List[Dict[str, object]],
+        scenario_id: str | None = None,
+    ) -> CriticFeedback:
+        content = await self.client.achat(
+            model=self.model,
+            messages=self._build_incremental_messages(goal, constraints, baseline_feedback, changes),
+            scenario_id=scenario_id,
+            notes="critic.evaluate_incremental",
+        )
+        return self._parse_feedback(content)
+
+    def _build_messages(
+        self,
+        goal: str,
+        context: str,
+        constraints: str,
+        task_results: List[Dict[str, object]],
+        unresolved_tasks: List[Dict[str, object]],
+        baseline_feedback: Optional[Union[CriticFeedback, Dict[str, object]]],
+    ) -> List[Dict[str, str]]:
+        baseline_payload_text = self._baseline_text(baseline_feedback)
 
         user_prompt = render(
             UserPrompts.CRITIC,
@@ -41,23 +108,66 @@ class Critic:
                 "GOAL": goal,
                 "CONTEXT": context,
                 "CONSTRAINTS": constraints,
-                "TASK_RESULTS": json.dumps(task_results, ensure_ascii=False, indent=2),
-                "UNRESOLVED_TASKS": json.dumps(unresolved_tasks, ensure_ascii=False, indent=2),
+                "TASK_RESULTS": encode(task_results_payload(task_results)),
+                "UNRESOLVED_TASKS": encode(unresolved_tasks),
                 "BASELINE_FEEDBACK": baseline_payload_text,
             },
         )
 
-        content = self.client.chat(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": SystemPrompts.CRITIC.strip()},
-                {"role": "user", "content": user_prompt.strip()},
-            ],
-            scenario_id=scenario_id,
-            notes="critic.evaluate_final",
+        return [
+            {"role": "system", "content": SystemPrompts.CRITIC.strip()},
+            {"role": "user", "content": user_prompt.strip()},
+        ]
+
+    def _build_incremental_messages(
+        self,
+        goal: str,
+        constraints: str,
+        baseline_feedback: Union[CriticFeedback, Dict[str, object]],
+        changes: List[Dict[str, object]],
+    ) -> List[Dict[str, str]]:
+        changes_text = "\n\n".join(
+            "Tache {id} ({title}) :\n{diff}\nRevue de la tache apres correction :\n{review}".format(
+                id=change.get("task_id"),
+                title=change.get("title", ""),
+                diff=str(change.get("diff", "")).rstrip("\n"),
+                review=encode(strip_raw(change.get("review") or {})),
+            )
+            for change in changes
         )
-        # print("[Critic][debug] raw:", content)
+        user_prompt = render(
+            UserPrompts.CRITIC_INCREMENTAL,
+            {
+                "GOAL": goal,
+                "CONSTRAINTS": constraints,
+                "BASELINE_FEEDBACK": self._baseline_text(baseline_feedback),
+                "CHANGES": changes_text,
+            },
+        )
+
+        return [
+            {"role": "system", "content": SystemPrompts.CRITIC.strip()},
+            {"role": "user", "content": user_prompt.strip()},
+        ]
+
+    def _baseline_text(self, baseline_feedback: Optional[Union[CriticFeedback, Dict[str, object]]]) -> str:
+        if not baseline_feedback:
+            return ""
+        payload: Dict[str, object] = {}
+        if isinstance(baseline_feedback, CriticFeedback):
+            payload = baseline_feedback.raw or {
+                "score": baseline_feedback.score,
+                "problems": baseline_feedback.problems,
+                "recommendations": baseline_feedback.recommendations,
+            }
+        elif isinstance(baseline_feedback, dict):
+            payload = strip_raw(baseline_feedback)
+        try:
+            return encode(payload)
+        except Exception:
+            return ""
 
+    def _parse_feedback(self, content: str) -> CriticFeedback:
         raw = self._parse_json_object(content)
         if raw is None:
             return CriticFeedback(score=0, problems=["Critic returned non-JSON output"], recommendations=[], raw={})
@@ -1,10 +1,11 @@
 import json
 import re
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional
 
 from clients.ollama_client import OllamaClient
 from models.tasks import ExecutionOutput, FileEdit, Task, parse_execution_output
 from prompts import SystemPrompts, UserPrompts
+from utils.prompt_payload import encode
 from utils.prompt_renderer import render
 
 
@@ -20,28 +21,58 @@ class Executor:
         existing_code: Optional[str] = "",
         constraints: Optional[str] = "",
         scenario_id: str | None = None,
+        on_token: Optional[Callable[[str], None]] = None,
     ) -> ExecutionOutput:
+        raw_content = self.client.chat(
+            model=self.model,
+            messages=self._build_messages(task, project_context, existing_code, constraints),
+            scenario_id=scenario_id,
+            notes=f"executor.execute task={task.id}",
+            on_token=on_token,
+        )
+        # print("[Executor][debug] raw:", raw_content)
+        return self._parse_output(raw_content)
+
+    async def aexecute(
+        self,
+        task: Task,
+        project_context: str = "",
+        existing_code: Optional[str] = "",
+        constraints: Optional[str] = "",
+        scenario_id: str | None = None,
+        on_token: Optional[Callable[[str], None]] = None,
+    ) -> ExecutionOutput:
+        raw_content = await self.client.achat(
+            model=self.model,
+            messages=self._build_messages(task, project_context, existing_code, constraints),
+            scenario_id=scenario_id,
+            notes=f"executor.execute task={task.id}",
+            on_token=on_token,
+        )
+        return self._parse_output(raw_content)
+
+    def _build_messages(
+        self,
+        task: Task,
+        project_context: str,
+        existing_code: Optional[str],
+        constraints: Optional[str],
+    ) -> List[Dict[str, str]]:
         user_prompt = render(
             UserPrompts.EXECUTOR,
             {
-                "TASK_JSON": json.dumps(task.__dict__, ensure_ascii=False, indent=2),
+                "TASK_JSON": encode(task.__dict__),
                 "PROJECT_CONTEXT": project_context or "",
                 "EXISTING_CODE": existing_code or "",
                 "CONSTRAINTS": constraints or "",
             },
         )
+        return [
+            {"role": "system", "content": SystemPrompts.EXECUTOR.strip()},
+            {"role": "user", "content": user_prompt.strip()},
+        ]
 
-        raw_content = self.client.chat(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": SystemPrompts.EXECUTOR.strip()},
-                {"role": "user", "content": user_prompt.strip()},
-            ],
-            scenario_id=scenario_id,
-            notes=f"executor.execute task={task.id}",
-        )
-        # print("[Executor][debug] raw:", raw_content)
-
+    def _parse_output(self, raw_content: str) -> ExecutionOutput:
         try:
             raw = json.loads(raw_content)
         except json.JSONDecodeError:
@@ -0,0 +1,44 @@
+from typing import Dict, List
+
+from clients.ollama_client import OllamaClient
+from prompts import SystemPrompts, UserPrompts
+from utils.prompt_renderer import render
+
+
+class MemorySummarizer:
+    """Rolls old memory entries of a conversation into one compact summary (see MemoryStore.compact)."""
+
+    def __init__(self, client: OllamaClient, model: str = "gemma3:4b", max_input_chars: int = 12000) -> None:
+        self.client = client
+        self.model = model
+        self.max_input_chars = max_input_chars
+
+    def summarize(self, previous_summary: str, responses: List[str]) -> str:
+        return self.client.chat(
+            model=self.model,
+            messages=self._build_messages(previous_summary, responses),
+            scenario_id="memory.compaction",
+            notes="memory_summarizer.summarize",
+        ).strip()
+
+    def _build_messages(self, previous_summary: str, responses: List[str]) -> List[Dict[str, str]]:
+        # Most recent responses first when the input must be cut.
+        blocks: List[str] = []
+        budget = self.max_input_chars
+        for response in reversed(responses):
+            if budget <= 0:
+                break
+            block = f"- {response.strip()[:budget]}"
+            blocks.append(block)
+            budget -= len(block)
+        user_prompt = render(
+            UserPrompts.MEMORY_SUMMARY,
+            {
+                "PREVIOUS_SUMMARY": previous_summary or "",
+                "RESPONSES": "\n".join(reversed(blocks)),
+            },
+        )
+        return [
+            {"role": "system", "content": SystemPrompts.MEMORY_SUMMARY.strip()},
+            {"role": "user", "content": user_prompt.strip()},
+        ]
@@ -1,7 +1,7 @@
 import ast
 import json
 import re
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional
 
 from clients.ollama_client import OllamaClient
 from models.tasks import Task, parse_tasks
@@ -14,7 +14,42 @@ class Planner:
         self.client = client
         self.model = model
 
-    def plan(self, goal: str, context: str = "", constraints: str = "", scenario_id: str | None = None) -> List[Task]:
+    def plan(
+        self,
+        goal: str,
+        context: str = "",
+        constraints: str = "",
+        scenario_id: str | None = None,
+        on_token: Optional[Callable[[str], None]] = None,
+    ) -> List[Task]:
+        content = self.client.chat(
+            model=self.model,
+            messages=self._build_messages(goal, context, constraints),
+            scenario_id=scenario_id,
+            notes="planner.plan",
+            on_token=on_token,
+        )
+        # print("[Planner][debug] raw:", content)
+        return self._parse_tasks(content)
+
+    async def aplan(
+        self,
+        goal: str,
+        context: str = "",
+        constraints: str = "",
+        scenario_id: str | None = None,
+        on_token: Optional[Callable[[str], None]] = None,
+    ) -> List[Task]:
+        content = await self.client.achat(
+            model=self.model,
+            messages=self._build_messages(goal, context, constraints),
+            scenario_id=scenario_id,
+            notes="planner.plan",
+            on_token=on_token,
+        )
+        return self._parse_tasks(content)
+
+    def _build_messages(self, goal: str, context: str, constraints: str) -> List[Dict[str, str]]:
         user_prompt = render(
             UserPrompts.PLANNER,
             {
@@ -23,22 +58,15 @@ class Planner:
                 "CONSTRAINTS": constraints or "",
             },
         )
+        return [
+            {"role": "system", "content": SystemPrompts.PLANNER.strip()},
+            {"role": "user", "content": user_prompt.strip()},
+        ]
 
-        content = self.client.chat(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": SystemPrompts.PLANNER.strip()},
-                {"role": "user", "content": user_prompt.strip()},
-            ],
-            scenario_id=scenario_id,
-            notes="planner.plan",
-        )
-        # print("[Planner][debug] raw:", content)
-
+    def _parse_tasks(self, content: str) -> List[Task]:
         raw = self._parse_json_array(content)
         if raw is None:
             return []
-
         return parse_tasks(raw)
 
     def _parse_json_array(self, text: str) -> Optional[List[dict]]:
@@ -1,4 +1,5 @@
 import re
+from typing import Dict, List
 
 from clients.ollama_client import OllamaClient
 from prompts import SystemPrompts, UserPrompts
@@ -14,20 +15,20 @@ class PromptOptimizer:
         """
         Returns (optimized_prompt, raw_model_output).
         """
-        user_prompt = render(
-            UserPrompts.OPTIMIZER,
-            {
-                "PROMPT": prompt,
-                "CONTEXT": context or "",
-            },
+        content = self.client.chat(
+            model=self.model,
+            messages=self._build_messages(prompt, context),
+            scenario_id=scenario_id,
+            notes="prompt_optimizer.optimize",
         )
 
-        content = self.client.chat(
+        optimized = self._extract_prompt(content)
+        return optimized.strip(), content
+
+    async def aoptimize(self, prompt: str, context: str = "", scenario_id: str | None = None) -> tuple[str, str]:
+        content = await self.client.achat(
             model=self.model,
-            messages=[
-                {"role": "system", "content": SystemPrompts.OPTIMIZER.strip()},
-                {"role": "user", "content": user_prompt.strip()},
-            ],
+            messages=self._build_messages(prompt, context),
             scenario_id=scenario_id,
             notes="prompt_optimizer.optimize",
         )
@@ -35,6 +36,19 @@ class PromptOptimizer:
         optimized = self._extract_prompt(content)
         return optimized.strip(), content
 
+    def _build_messages(self, prompt: str, context: str) -> List[Dict[str, str]]:
+        user_prompt = render(
+            UserPrompts.OPTIMIZER,
+            {
+                "PROMPT": prompt,
+                "CONTEXT": context or "",
+            },
+        )
+        return [
+            {"role": "system", "content": SystemPrompts.OPTIMIZER.strip()},
+            {"role": "user", "content": user_prompt.strip()},
+        ]
+
     def _extract_prompt(self, text: str) -> str:
         """
         Prefer the first fenced block, otherwise return the raw text.
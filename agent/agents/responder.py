@@ -1,8 +1,8 @@
-import json
-from typing import Dict, List
+from typing import Callable, Dict, List, Optional
 
 from clients.ollama_client import OllamaClient
 from prompts import SystemPrompts, UserPrompts
+from utils.prompt_payload import encode, strip_raw, task_results_payload
 from utils.prompt_renderer import render
 
 
@@ -19,26 +19,58 @@ class Responder:
         unresolved_tasks: List[Dict[str, object]],
         final_critic: Dict[str, object],
         scenario_id: str | None = None,
+        on_token: Optional[Callable[[str], None]] = None,
     ) -> str:
-        user_prompt = render(
-            UserPrompts.RESPONDER,
-            {
-                "GOAL": goal,
-                "CONTEXT": context or "Non precise",
-                "TASK_RESULTS": json.dumps(tasks, ensure_ascii=False, indent=2),
-                "UNRESOLVED_TASKS": json.dumps(unresolved_tasks, ensure_ascii=False, indent=2),
-                "FINAL_CRITIC": json.dumps(final_critic, ensure_ascii=False, indent=2),
-            },
+        content = self.client.chat(
+            model=self.model,
+            messages=self._build_messages(goal, context, tasks, unresolved_tasks, final_critic),
+            temperature=0.2,
+            scenario_id=scenario_id,
+            notes="responder.build_markdown_response",
+            on_token=on_token,
         )
+        return content.strip()
 
-        content = self.client.chat(
+    async def abuild_markdown_response(
+        self,
+        goal: str,
+        context: str,
+        tasks: List[Dict[str, object]],
+        unresolved_tasks: List[Dict[str, object]],
+        final_critic: Dict[str, object],
+        scenario_id: str | None = None,
+        on_token: Optional[Callable[[str], None]] = None,
+    ) -> str:
+        content = await self.client.achat(
             model=self.model,
-            messages=[
-                {"role": "system", "content": SystemPrompts.RESPONDER.strip()},
-                {"role": "user", "content": user_prompt.strip()},
-            ],
+            messages=self._build_messages(goal, context, tasks, unresolved_tasks, final_critic),
             temperature=0.2,
             scenario_id=scenario_id,
             notes="responder.build_markdown_response",
+            on_token=on_token,
         )
         return content.strip()
+
+    def _build_messages(
+        self,
+        goal: str,
+        context: str,
+        tasks: List[Dict[str, object]],
+        unresolved_tasks: List[Dict[str, object]],
+        final_critic: Dict[str, object],
+    ) -> List[Dict[str, str]]:
+        user_prompt = render(
+            UserPrompts.RESPONDER,
+            {
+                "GOAL": goal,
+                "CONTEXT": context or "Non precise",
+                "TASK_RESULTS": encode(task_results_payload(tasks)),
+                "UNRESOLVED_TASKS": encode(unresolved_tasks),
+                "FINAL_CRITIC": encode(strip_raw(final_critic)),
+            },
+        )
+
+        return [
+            {"role": "system", "content": SystemPrompts.RESPONDER.strip()},
+            {"role": "user", "content": user_prompt.strip()},
+        ]
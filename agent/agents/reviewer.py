@@ -1,9 +1,10 @@
 import json
-from typing import List
+from typing import Dict, List
 
 from clients.ollama_client import OllamaClient
 from models.tasks import ExecutionOutput, Task, TaskReview, parse_task_review
 from prompts import SystemPrompts, UserPrompts
+from utils.prompt_payload import encode, execution_payload
 from utils.prompt_renderer import render
 
 
@@ -20,25 +21,50 @@ class Reviewer:
         constraints: str = "",
         scenario_id: str | None = None,
     ) -> TaskReview:
+        content = self.client.chat(
+            model=self.model,
+            messages=self._build_messages(task, execution, context, constraints),
+            scenario_id=scenario_id,
+            notes=f"reviewer.review task={task.id}",
+        )
+        # print("[Reviewer][debug] raw:", content)
+        return self._parse_review(content)
+
+    async def areview(
+        self,
+        task: Task,
+        execution: ExecutionOutput,
+        context: str = "",
+        constraints: str = "",
+        scenario_id: str | None = None,
+    ) -> TaskReview:
+        content = await self.client.achat(
+            model=self.model,
+            messages=self._build_messages(task, execution, context, constraints),
+            scenario_id=scenario_id,
+            notes=f"reviewer.review task={task.id}",
+        )
+        return self._parse_review(content)
+
+    def _build_messages(
+        self,
+        task: Task,
+        execution: ExecutionOutput,
+        context: str,
+        constraints: str,
+    ) -> List[Dict[str, str]]:
         code_blocks: List[str] = []
         for file_edit in execution.files:
             code_blocks.append(f"{file_edit.path}:\n{file_edit.content}")
         code_text = "\n\n".join(code_blocks) if code_blocks else "Aucun fichier de code fourni."
 
-        execution_json = json.dumps(
-            {
-                "status": execution.status,
-                "notes": execution.notes,
-                "files": [{"path": f.path, "content": f.content} for f in execution.files],
-            },
-            ensure_ascii=False,
-            indent=2,
-        )
+        # File bodies are only sent once, in CODE_BLOCKS.
+        execution_json = encode(execution_payload(execution, include_contents=False))
 
         user_prompt = render(
             UserPrompts.TASK_REVIEW,
             {
-                "TASK_JSON": json.dumps(task.__dict__, ensure_ascii=False, indent=2),
+                "TASK_JSON": encode(task.__dict__),
                 "CONTEXT": context or "",
                 "CONSTRAINTS": constraints or "",
                 "EXECUTION_JSON": execution_json,
@@ -46,17 +72,12 @@ class Reviewer:
             },
         )
 
-        content = self.client.chat(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": SystemPrompts.TASK_REVIEW.strip()},
-                {"role": "user", "content": user_prompt.strip()},
-            ],
-            scenario_id=scenario_id,
-            notes=f"reviewer.review task={task.id}",
-        )
-        # print("[Reviewer][debug] raw:", content)
+        return [
+            {"role": "system", "content": SystemPrompts.TASK_REVIEW.strip()},
+            {"role": "user", "content": user_prompt.strip()},
+        ]
 
+    def _parse_review(self, content: str) -> TaskReview:
         try:
             raw = json.loads(content)
         except json.JSONDecodeError:
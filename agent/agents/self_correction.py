@@ -1,8 +1,9 @@
 import json
-from typing import List
+from typing import Dict, List
 from clients.ollama_client import OllamaClient
 from models.tasks import CriticFeedback, ExecutionOutput, FileEdit, Task, parse_execution_output
 from prompts import SystemPrompts, UserPrompts
+from utils.prompt_payload import encode, execution_payload
 from utils.prompt_renderer import render
 
 
@@ -18,40 +19,60 @@ class SelfCorrection:
         critic_feedback: CriticFeedback,
         scenario_id: str | None = None,
     ) -> ExecutionOutput:
-        current_code_json = json.dumps(
-            {
-                "status": current_output.status,
-                "notes": current_output.notes,
-                "files": [{"path": f.path, "content": f.content} for f in current_output.files],
-            },
-            ensure_ascii=False,
-            indent=2,
+        content = self.client.chat(
+            model=self.model,
+            messages=self._build_messages(task, current_output, critic_feedback),
+            scenario_id=scenario_id,
+            notes=f"self_correction task={task.id}",
         )
+        # print("[SelfCorrection][debug] raw:", content)
+        return self._parse_output(content)
+
+    async def acorrect(
+        self,
+        task: Task,
+        current_output: ExecutionOutput,
+        critic_feedback: CriticFeedback,
+        scenario_id: str | None = None,
+    ) -> ExecutionOutput:
+        content = await self.client.achat(
+            model=self.model,
+            messages=self._build_messages(task, current_output, critic_feedback),
+            scenario_id=scenario_id,
+            notes=f"self_correction task={task.id}",
+        )
+        return self._parse_output(content)
+
+    def _build_messages(
+        self,
+        task: Task,
+        current_output: ExecutionOutput,
+        critic_feedback: CriticFeedback,
+    ) -> List[Dict[str, str]]:
+        current_code_json = encode(execution_payload(current_output))
 
         user_prompt = render(
             UserPrompts.EXECUTOR_SELF_CORRECTION,
             {
-                "TASK_JSON": json.dumps(task.__dict__, ensure_ascii=False, indent=2),
+                "TASK_JSON": encode(task.__dict__),
                 "CURRENT_CODE": current_code_json,
-                "CRITIC_FEEDBACK": json.dumps(
-                    critic_feedback.raw or critic_feedback.__dict__,
-                    ensure_ascii=False,
-                    indent=2,
+                "CRITIC_FEEDBACK": encode(
+                    critic_feedback.raw
+                    or {
+                        "score": critic_feedback.score,
+                        "problems": critic_feedback.problems,
+                        "recommendations": critic_feedback.recommendations,
+                    }
                 ),
             },
         )
 
-        content = self.client.chat(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": SystemPrompts.EXECUTOR_SELF_CORRECTION.strip()},
-                {"role": "user", "content": user_prompt.strip()},
-            ],
-            scenario_id=scenario_id,
-            notes=f"self_correction task={task.id}",
-        )
-        # print("[SelfCorrection][debug] raw:", content)
+        return [
+            {"role": "system", "content": SystemPrompts.EXECUTOR_SELF_CORRECTION.strip()},
+            {"role": "user", "content": user_prompt.strip()},
+        ]
 
+    def _parse_output(self, content: str) -> ExecutionOutput:
         try:
             raw = json.loads(content)
         except json.JSONDecodeError:
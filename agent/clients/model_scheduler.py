@@ -0,0 +1,228 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Deque, Dict, Iterator, List, Optional
+
+from utils.run_context import RunContext, current_run
+
+# Seconds between checks of the run's cancellation while a thread waits for a slot.
+CANCEL_POLL_INTERVAL = 0.5
+
+
+@dataclass
+class _Waiter:
+    model: str
+    enqueued_at: float
+    wake: Callable[[], None]
+    granted: bool = False
+
+
+@dataclass
+class ModelStats:
+    waiting: int = 0
+    in_flight: int = 0
+    granted: int = 0
+    total_wait_ms: float = 0.0
+    max_wait_ms: float = 0.0
+    batch_grants: int = field(default=0, repr=False)
+
+
+class ModelScheduler:
+    """
+    Admission control in front of Ollama: at most `limit(model)` concurrent calls per model
+    (mirror of OLLAMA_NUM_PARALLEL) and, when `max_loaded_models` is set, at most that many
+    distinct models in flight at once. Queued calls for a model already in flight are admitted
+    first so work is batched per model instead of forcing Ollama to swap models in VRAM;
+    `max_batch` bounds how long one model can keep others waiting.
+    Works for both threads (`slot`) and asyncio tasks (`aslot`).
+    """
+
+    def __init__(
+        self,
+        default_limit: int = 2,
+        limits: Optional[Dict[str, int]] = None,
+        max_loaded_models: int = 0,
+        max_batch: int = 8,
+    ) -> None:
+        self.default_limit = max(1, default_limit)
+        self.limits = {model: max(1, int(value)) for model, value in (limits or {}).items()}
+        self.max_loaded_models = max(0, max_loaded_models)
+        self.max_batch = max(1, max_batch)
+        self.lock = threading.Lock()
+        self._waiters: Deque[_Waiter] = deque()
+        self._stats: Dict[str, ModelStats] = {}
+
+    # Public API -----------------------------------------------------------------
+    def limit(self, model: str) -> int:
+        return self.limits.get(model, self.default_limit)
+
+    @contextmanager
+    def slot(self, model: str) -> Iterator[None]:
+        """
+        Block the calling thread until a slot for `model` is granted. Inside a run, the wait
+        stops with the run's error once it is cancelled or its deadline has passed.
+        """
+        granted = threading.Event()
+        waiter = self._enqueue(model, granted.set)
+        run = current_run()
+        try:
+            while not granted.wait(self._wait_step(run)):
+                assert run is not None
+                run.check()
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        try:
+            yield
+        finally:
+            self.release(model)
+
+    @asynccontextmanager
+    async def aslot(self, model: str) -> AsyncIterator[None]:
+        """Await a slot for `model` without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future = loop.create_future()
+
+        def _resolve() -> None:
+            if not future.done():
+                future.set_result(None)
+
+        waiter = self._enqueue(model, lambda: loop.call_soon_threadsafe(_resolve))
+        try:
+            await future
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        try:
+            yield
+        finally:
+            self.release(model)
+
+    def release(self, model: str) -> None:
+        with self.lock:
+            stats = self._model_stats(model)
+            stats.in_flight = max(0, stats.in_flight - 1)
+            if stats.in_flight == 0:
+                stats.batch_grants = 0
+            self._dispatch()
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Per-model queue depth, in-flight calls and queue wait times (ms)."""
+        with self.lock:
+            now = time.monotonic()
+            oldest: Dict[str, float] = {}
+            for waiter in self._waiters:
+                oldest.setdefault(waiter.model, (now - waiter.enqueued_at) * 1000)
+            return {
+                model: {
+                    "limit": self.limit(model),
+                    "queue_depth": stats.waiting,
+                    "in_flight": stats.in_flight,
+                    "granted": stats.granted,
+                    "avg_wait_ms": round(stats.total_wait_ms / stats.granted, 2) if stats.granted else 0.0,
+                    "max_wait_ms": round(stats.max_wait_ms, 2),
+                    "oldest_wait_ms": round(oldest.get(model, 0.0), 2),
+                }
+                for model, stats in self._stats.items()
+            }
+
+    # Internal helpers ----------------------------------------------------------
+    def _wait_step(self, run: Optional[RunContext]) -> Optional[float]:
+        if run is None:
+            return None
+        remaining = run.remaining()
+        return CANCEL_POLL_INTERVAL if remaining is None else min(remaining, CANCEL_POLL_INTERVAL)
+
+    def _enqueue(self, model: str, wake: Callable[[], None]) -> _Waiter:
+        waiter = _Waiter(model=model, enqueued_at=time.monotonic(), wake=wake)
+        with self.lock:
+            self._waiters.append(waiter)
+            self._model_stats(model).waiting += 1
+            self._dispatch()
+        return waiter
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        """Cancelled while queued: drop the waiter, or give back a slot granted in the meantime."""
+        with self.lock:
+            if waiter.granted:
+                stats = self._model_stats(waiter.model)
+                stats.in_flight = max(0, stats.in_flight - 1)
+                if stats.in_flight == 0:
+                    stats.batch_grants = 0
+            else:
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+                self._model_stats(waiter.model).waiting -= 1
+            self._dispatch()
+
+    def _model_stats(self, model: str) -> ModelStats:
+        stats = self._stats.get(model)
+        if stats is None:
+            stats = ModelStats()
+            self._stats[model] = stats
+        return stats
+
+    def _loaded_models(self) -> List[str]:
+        return [model for model, stats in self._stats.items() if stats.in_flight > 0]
+
+    def _can_start(self, model: str) -> bool:
+        stats = self._model_stats(model)
+        if stats.in_flight >= self.limit(model):
+            return False
+        if not self.max_loaded_models:
+            return True
+        loaded = self._loaded_models()
+        if model in loaded:
+            others_waiting = any(waiter.model != model for waiter in self._waiters)
+            # Let the current batch drain so a waiting model can be loaded.
+            return not (others_waiting and stats.batch_grants >= self.max_batch)
+        return len(loaded) < self.max_loaded_models
+
+    def _dispatch(self) -> None:
+        # Caller holds self.lock. Waiters for models already in flight go first (batching).
+        while self._waiters:
+            loaded = set(self._loaded_models())
+            ordered = sorted(self._waiters, key=lambda waiter: waiter.model not in loaded)
+            chosen = next((waiter for waiter in ordered if self._can_start(waiter.model)), None)
+            if chosen is None:
+                return
+            self._waiters.remove(chosen)
+            self._grant(chosen)
+
+    def _grant(self, waiter: _Waiter) -> None:
+        # Caller holds self.lock.
+        stats = self._model_stats(waiter.model)
+        try:
+            waiter.wake()
+        except RuntimeError:
+            # The waiter's event loop is closed: nobody would use or release the slot, drop it.
+            stats.waiting -= 1
+            return
+        wait_ms = (time.monotonic() - waiter.enqueued_at) * 1000
+        stats.waiting -= 1
+        stats.in_flight += 1
+        stats.granted += 1
+        stats.total_wait_ms += wait_ms
+        stats.max_wait_ms = max(stats.max_wait_ms, wait_ms)
+        if any(other.model != waiter.model for other in self._waiters):
+            stats.batch_grants += 1
+        waiter.granted = True
+
+
+def parse_model_limits(spec: str) -> Dict[str, int]:
+    """Parse `model=N` pairs separated by commas (e.g. "codellama:13b=1,qwen2.5=2")."""
+    limits: Dict[str, int] = {}
+    for item in (spec or "").split(","):
+        model, sep, value = item.strip().rpartition("=")
+        if not sep or not model.strip():
+            continue
+        try:
+            limits[model.strip()] = max(1, int(value))
+        except ValueError:
+            continue
+    return limits
@@ -1,9 +1,28 @@
+import asyncio
+import contextlib
+import json
+import time
 import uuid
-from typing import Any, Dict, List, Optional
+import weakref
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
 
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
 
+from clients.model_scheduler import ModelScheduler
 from utils.cost_logger import CostLogger, utc_ms
+from utils.metrics import (
+    LLM_GENERATION_SECONDS,
+    LLM_LATENCY,
+    LLM_QUEUE_WAIT,
+    LLM_REQUESTS,
+    LLM_TOKENS,
+    RESPONSE_CACHE_REQUESTS,
+)
+from utils.response_cache import CachedResponse, ResponseCache
+from utils.run_context import current_run
+from utils.tracing import record_span, span
 
 
 class OllamaClient:
@@ -13,11 +32,25 @@ class OllamaClient:
         timeout: int = 180,
         cost_logger: Optional[CostLogger] = None,
         costs_path: str = "costs.csv",
+        max_connections: int = 8,
+        response_cache: Optional[ResponseCache] = None,
+        scheduler: Optional[ModelScheduler] = None,
     ) -> None:
         self.base_url = base_url.rstrip("/")
         self.timeout = timeout
-        self.default_scenario_id: Optional[str] = None
         self.cost_logger = cost_logger or CostLogger(path=costs_path)
+        self.max_connections = max(1, max_connections)
+        self.response_cache = response_cache
+        self.scheduler = scheduler
+        # Keep-alive pool shared by every agent using the synchronous API.
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_connections)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # httpx pools are bound to the event loop they were created on: one pool per loop.
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+            weakref.WeakKeyDictionary()
+        )
 
     def chat(
         self,
@@ -30,83 +63,696 @@ class OllamaClient:
         call_id: Optional[str] = None,
         notes: str = "",
         endpoint: str = "/api/chat",
+        on_token: Optional[Callable[[str], None]] = None,
     ) -> str:
-        """Call Ollama chat endpoint and return the content string."""
-        options = {"temperature": temperature}
-        if extra_options:
-            options.update(extra_options)
+        """
+        Call Ollama chat endpoint and return the content string.
+        When `stream` is set or `on_token` is given, the completion is streamed and each
+        chunk is forwarded to `on_token` as it arrives; the full content is still returned.
+        """
+        if stream or on_token is not None:
+            parts: List[str] = []
+            for chunk in self.chat_stream(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                extra_options=extra_options,
+                scenario_id=scenario_id,
+                call_id=call_id,
+                notes=notes,
+                endpoint=endpoint,
+            ):
+                parts.append(chunk)
+                self._forward_token(on_token, chunk)
+            return "".join(parts)
 
-        payload: Dict[str, Any] = {
-            "model": model,
-            "messages": messages,
-            "stream": stream,
-            "options": options,
-        }
+        payload = self._build_payload(model, messages, temperature, False, extra_options)
+        call_identifier, scenario_label, prompt_hash, prompt_text = self._prepare_call(
+            model, messages, scenario_id, call_id
+        )
+        start_ms = utc_ms()
+        status_label = "success"
+        cache_key = self._cache_key(model, payload, prompt_hash)
+        cached = self._cache_lookup(
+            cache_key, model, endpoint, scenario_label, call_identifier, prompt_hash, prompt_text, start_ms, notes
+        )
+        if cached is not None:
+            return cached
 
-        call_identifier = call_id or str(uuid.uuid4())
-        scenario_label = (scenario_id or self.default_scenario_id or "").strip() or "unknown"
-        prompt_text = self._flatten_messages(messages)
-        prompt_hash = self.cost_logger.hash_prompt(prompt_text) if self.cost_logger else ""
-        prompt_tokens = self.cost_logger.count_tokens(model, prompt_text) if self.cost_logger else 0
+        with self._model_slot(model, notes):
+            # Latency excludes the time spent queued in the model scheduler.
+            start_ms = utc_ms()
+            try:
+                response = self.session.post(
+                    f"{self.base_url}{endpoint}",
+                    json=payload,
+                    timeout=self._call_timeout(),
+                )
+                response.raise_for_status()
+                data = response.json()
+
+                # For non-streaming responses, Ollama returns the final message content.
+                content = data.get("message", {}).get("content")
+                if content is None:
+                    status_label = "error:missing_content"
+                    raise ValueError("Ollama chat response missing message content")
+
+                self._log_success(
+                    model=model,
+                    endpoint=endpoint,
+                    scenario_label=scenario_label,
+                    call_identifier=call_identifier,
+                    prompt_hash=prompt_hash,
+                    prompt_text=prompt_text,
+                    content=content,
+                    data=data,
+                    start_ms=start_ms,
+                    status_label=status_label,
+                    notes=notes,
+                    cache_key=cache_key,
+                )
+                return content
+            except Exception as exc:
+                self._log_failure(
+                    model=model,
+                    endpoint=endpoint,
+                    scenario_label=scenario_label,
+                    call_identifier=call_identifier,
+                    prompt_hash=prompt_hash,
+                    prompt_text=prompt_text,
+                    start_ms=start_ms,
+                    status_label=status_label,
+                    exc=exc,
+                    notes=notes,
+                )
+                self._raise_if_deadline(exc)
+                raise
+
+    def chat_stream(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.2,
+        extra_options: Optional[Dict[str, Any]] = None,
+        scenario_id: Optional[str] = None,
+        call_id: Optional[str] = None,
+        notes: str = "",
+        endpoint: str = "/api/chat",
+    ) -> Iterator[str]:
+        """
+        Stream an Ollama chat completion, yielding content chunks as they arrive.
+        Ollama answers with NDJSON lines; the last one (`done: true`) carries the token counts
+        that are logged once the stream is exhausted.
+        """
+        payload = self._build_payload(model, messages, temperature, True, extra_options)
+        call_identifier, scenario_label, prompt_hash, prompt_text = self._prepare_call(
+            model, messages, scenario_id, call_id
+        )
         start_ms = utc_ms()
         status_label = "success"
+        parts: List[str] = []
+        final_data: Dict[str, Any] = {}
+        cache_key = self._cache_key(model, payload, prompt_hash)
+        cached = self._cache_lookup(
+            cache_key, model, endpoint, scenario_label, call_identifier, prompt_hash, prompt_text, start_ms, notes
+        )
+        if cached is not None:
+            if cached:
+                yield cached
+            return
 
-        try:
-            response = requests.post(
-                f"{self.base_url}{endpoint}",
-                json=payload,
-                timeout=self.timeout,
-            )
-            response.raise_for_status()
-            data = response.json()
-
-            # For non-streaming responses, Ollama returns the final message content.
-            content = data.get("message", {}).get("content")
-            if content is None:
-                status_label = "error:missing_content"
-                raise ValueError("Ollama chat response missing message content")
-
-            completion_tokens = int(data.get("eval_count") or 0)
-            prompt_tokens_api = data.get("prompt_eval_count")
-            if prompt_tokens_api is not None:
-                prompt_tokens = int(prompt_tokens_api)
-            if completion_tokens == 0 and self.cost_logger:
-                completion_tokens = self.cost_logger.count_tokens(model, content)
-
-            latency_ms = max(0, utc_ms() - start_ms)
-            if self.cost_logger:
-                self.cost_logger.log_success(
-                    scenario_id=scenario_label,
-                    call_id=call_identifier,
+        with self._model_slot(model, notes):
+            start_ms = utc_ms()
+            try:
+                with self.session.post(
+                    f"{self.base_url}{endpoint}",
+                    json=payload,
+                    timeout=self._call_timeout(),
+                    stream=True,
+                ) as response:
+                    response.raise_for_status()
+                    for line in response.iter_lines(decode_unicode=True):
+                        chunk, done, data = self._parse_stream_line(line)
+                        if chunk:
+                            parts.append(chunk)
+                            yield chunk
+                        if done:
+                            final_data = data
+                            break
+
+                if not final_data:
+                    status_label = "error:incomplete_stream"
+                    raise ValueError("Ollama chat stream ended before completion")
+
+                self._log_success(
+                    model=model,
+                    endpoint=endpoint,
+                    scenario_label=scenario_label,
+                    call_identifier=call_identifier,
+                    prompt_hash=prompt_hash,
+                    prompt_text=prompt_text,
+                    content="".join(parts),
+                    data=final_data,
+                    start_ms=start_ms,
+                    status_label=status_label,
+                    notes=notes,
+                    cache_key=cache_key,
+                )
+            except Exception as exc:
+                self._log_failure(
+                    model=model,
+                    endpoint=endpoint,
+                    scenario_label=scenario_label,
+                    call_identifier=call_identifier,
+                    prompt_hash=prompt_hash,
+                    prompt_text=prompt_text,
+                    start_ms=start_ms,
+                    status_label=status_label,
+                    exc=exc,
+                    notes=notes,
+                )
+                self._raise_if_deadline(exc)
+                raise
+
+    async def achat(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.2,
+        stream: bool = False,
+        extra_options: Optional[Dict[str, Any]] = None,
+        scenario_id: Optional[str] = None,
+        call_id: Optional[str] = None,
+        notes: str = "",
+        endpoint: str = "/api/chat",
+        on_token: Optional[Callable[[str], None]] = None,
+    ) -> str:
+        """Asyncio counterpart of `chat`, sharing a pooled keep-alive httpx client."""
+        if stream or on_token is not None:
+            parts: List[str] = []
+            async for chunk in self.achat_stream(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                extra_options=extra_options,
+                scenario_id=scenario_id,
+                call_id=call_id,
+                notes=notes,
+                endpoint=endpoint,
+            ):
+                parts.append(chunk)
+                self._forward_token(on_token, chunk)
+            return "".join(parts)
+
+        payload = self._build_payload(model, messages, temperature, False, extra_options)
+        call_identifier, scenario_label, prompt_hash, prompt_text = self._prepare_call(
+            model, messages, scenario_id, call_id
+        )
+        start_ms = utc_ms()
+        status_label = "success"
+        cache_key = self._cache_key(model, payload, prompt_hash)
+        cached = await self._acache_lookup(
+            cache_key, model, endpoint, scenario_label, call_identifier, prompt_hash, prompt_text, start_ms, notes
+        )
+        if cached is not None:
+            return cached
+
+        async with self._amodel_slot(model, notes):
+            start_ms = utc_ms()
+            try:
+                response = await self._async_client().post(
+                    f"{self.base_url}{endpoint}", json=payload, timeout=self._call_timeout()
+                )
+                response.raise_for_status()
+                data = response.json()
+
+                content = data.get("message", {}).get("content")
+                if content is None:
+                    status_label = "error:missing_content"
+                    raise ValueError("Ollama chat response missing message content")
+
+                self._log_success(
+                    model=model,
+                    endpoint=endpoint,
+                    scenario_label=scenario_label,
+                    call_identifier=call_identifier,
+                    prompt_hash=prompt_hash,
+                    prompt_text=prompt_text,
+                    content=content,
+                    data=data,
+                    start_ms=start_ms,
+                    status_label=status_label,
+                    notes=notes,
+                    cache_key=cache_key,
+                    offload_cache=True,
+                )
+                return content
+            except (Exception, asyncio.CancelledError) as exc:
+                # Cancelled calls (run cancelled or past its deadline) are logged too.
+                self._log_failure(
+                    model=model,
+                    endpoint=endpoint,
+                    scenario_label=scenario_label,
+                    call_identifier=call_identifier,
+                    prompt_hash=prompt_hash,
+                    prompt_text=prompt_text,
+                    start_ms=start_ms,
+                    status_label=status_label,
+                    exc=exc,
+                    notes=notes,
+                )
+                self._raise_if_deadline(exc)
+                raise
+
+    async def achat_stream(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.2,
+        extra_options: Optional[Dict[str, Any]] = None,
+        scenario_id: Optional[str] = None,
+        call_id: Optional[str] = None,
+        notes: str = "",
+        endpoint: str = "/api/chat",
+    ) -> AsyncIterator[str]:
+        """Asyncio counterpart of `chat_stream`."""
+        payload = self._build_payload(model, messages, temperature, True, extra_options)
+        call_identifier, scenario_label, prompt_hash, prompt_text = self._prepare_call(
+            model, messages, scenario_id, call_id
+        )
+        start_ms = utc_ms()
+        status_label = "success"
+        parts: List[str] = []
+        final_data: Dict[str, Any] = {}
+        cache_key = self._cache_key(model, payload, prompt_hash)
+        cached = await self._acache_lookup(
+            cache_key, model, endpoint, scenario_label, call_identifier, prompt_hash, prompt_text, start_ms, notes
+        )
+        if cached is not None:
+            if cached:
+                yield cached
+            return
+
+        async with self._amodel_slot(model, notes):
+            start_ms = utc_ms()
+            try:
+                async with self._async_client().stream(
+                    "POST", f"{self.base_url}{endpoint}", json=payload, timeout=self._call_timeout()
+                ) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        chunk, done, data = self._parse_stream_line(line)
+                        if chunk:
+                            parts.append(chunk)
+                            yield chunk
+                        if done:
+                            final_data = data
+                            break
+
+                if not final_data:
+                    status_label = "error:incomplete_stream"
+                    raise ValueError("Ollama chat stream ended before completion")
+
+                self._log_success(
                     model=model,
-                    endpoint=f"{self.base_url}{endpoint}",
+                    endpoint=endpoint,
+                    scenario_label=scenario_label,
+                    call_identifier=call_identifier,
                     prompt_hash=prompt_hash,
-                    prompt_tokens=prompt_tokens,
-                    completion_tokens=completion_tokens,
-                    latency_ms=latency_ms,
-                    status=status_label,
+                    prompt_text=prompt_text,
+                    content="".join(parts),
+                    data=final_data,
+                    start_ms=start_ms,
+                    status_label=status_label,
                     notes=notes,
+                    cache_key=cache_key,
+                    offload_cache=True,
                 )
-            return content
-        except Exception as exc:
-            latency_ms = max(0, utc_ms() - start_ms)
-            status_label = status_label if status_label.startswith("error:") else f"error:{exc.__class__.__name__}"
-            if self.cost_logger:
-                self.cost_logger.log_failure(
-                    scenario_id=scenario_label,
-                    call_id=call_identifier,
+            except (Exception, asyncio.CancelledError) as exc:
+                # Cancelled calls (run cancelled or past its deadline) are logged too.
+                self._log_failure(
                     model=model,
-                    endpoint=f"{self.base_url}{endpoint}",
+                    endpoint=endpoint,
+                    scenario_label=scenario_label,
+                    call_identifier=call_identifier,
                     prompt_hash=prompt_hash,
-                    prompt_tokens=prompt_tokens,
-                    latency_ms=latency_ms,
-                    error=exc,
-                    notes=notes or status_label,
+                    prompt_text=prompt_text,
+                    start_ms=start_ms,
+                    status_label=status_label,
+                    exc=exc,
+                    notes=notes,
                 )
-            raise
+                self._raise_if_deadline(exc)
+                raise
 
-    def set_default_scenario(self, scenario_id: Optional[str]) -> None:
-        self.default_scenario_id = (scenario_id or "").strip() or None
+    def embed(
+        self,
+        model: str,
+        text: str,
+        scenario_id: Optional[str] = None,
+        notes: str = "memory.embed",
+        endpoint: str = "/api/embeddings",
+    ) -> List[float]:
+        """Return the embedding of `text` from Ollama's embeddings endpoint."""
+        messages = [{"role": "user", "content": text}]
+        call_identifier, scenario_label, prompt_hash, prompt_text = self._prepare_call(
+            model, messages, scenario_id, None
+        )
+        start_ms = utc_ms()
+        status_label = "success"
+        with self._model_slot(model, notes):
+            start_ms = utc_ms()
+            try:
+                response = self.session.post(
+                    f"{self.base_url}{endpoint}",
+                    json={"model": model, "prompt": text},
+                    timeout=self._call_timeout(),
+                )
+                response.raise_for_status()
+                data = response.json()
+                embedding = data.get("embedding")
+                if not embedding:
+                    status_label = "error:missing_embedding"
+                    raise ValueError("Ollama embeddings response missing embedding")
+                self._log_success(
+                    model=model,
+                    endpoint=endpoint,
+                    scenario_label=scenario_label,
+                    call_identifier=call_identifier,
+                    prompt_hash=prompt_hash,
+                    prompt_text=prompt_text,
+                    content="",
+                    data=data,
+                    start_ms=start_ms,
+                    status_label=status_label,
+                    notes=notes,
+                )
+                return [float(value) for value in embedding]
+            except Exception as exc:
+                self._log_failure(
+                    model=model,
+                    endpoint=endpoint,
+                    scenario_label=scenario_label,
+                    call_identifier=call_identifier,
+                    prompt_hash=prompt_hash,
+                    prompt_text=prompt_text,
+                    start_ms=start_ms,
+                    status_label=status_label,
+                    exc=exc,
+                    notes=notes,
+                )
+                self._raise_if_deadline(exc)
+                raise
+
+    async def aclose(self) -> None:
+        """Close the httpx pool bound to the running event loop (call on shutdown)."""
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    def close(self) -> None:
+        self.session.close()
+
+    def _async_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+            self._async_clients[loop] = client
+        return client
+
+    @contextlib.contextmanager
+    def _model_slot(self, model: str, notes: str = "") -> Iterator[None]:
+        """Scheduler slot for `model`, traced as an `llm` span with its queue wait as a child span."""
+        with span("llm", model=model, call=notes.split(" ", 1)[0]):
+            queued_ns = time.time_ns()
+            with self.scheduler.slot(model) if self.scheduler is not None else contextlib.nullcontext():
+                if self.scheduler is not None:
+                    granted_ns = time.time_ns()
+                    record_span("queue.scheduler", queued_ns, granted_ns, model=model)
+                    LLM_QUEUE_WAIT.observe((granted_ns - queued_ns) / 1e9, model=model)
+                yield
+
+    @contextlib.asynccontextmanager
+    async def _amodel_slot(self, model: str, notes: str = "") -> AsyncIterator[None]:
+        with span("llm", model=model, call=notes.split(" ", 1)[0]):
+            queued_ns = time.time_ns()
+            async with self.scheduler.aslot(model) if self.scheduler is not None else contextlib.nullcontext():
+                if self.scheduler is not None:
+                    granted_ns = time.time_ns()
+                    record_span("queue.scheduler", queued_ns, granted_ns, model=model)
+                    LLM_QUEUE_WAIT.observe((granted_ns - queued_ns) / 1e9, model=model)
+                yield
 
     def _flatten_messages(self, messages: List[Dict[str, str]]) -> str:
         return "\n".join(f"{msg.get('role', '')}: {msg.get('content', '')}" for msg in messages if isinstance(msg, dict))
+
+    def _prepare_call(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        scenario_id: Optional[str],
+        call_id: Optional[str],
+    ) -> Tuple[str, str, str, str]:
+        """
+        Return (call id, scenario, prompt hash, flattened prompt). Tokens are counted at log time.
+        The scenario defaults to the current run's; raises when the run's deadline or token budget
+        is exceeded (see utils.run_context).
+        """
+        run = current_run()
+        if run is not None:
+            run.check()
+        call_identifier = call_id or str(uuid.uuid4())
+        scenario_label = (scenario_id or (run.scenario_id if run is not None else "") or "").strip() or "unknown"
+        prompt_text = self._flatten_messages(messages)
+        prompt_hash = self.cost_logger.hash_prompt(prompt_text) if self.cost_logger else ""
+        return call_identifier, scenario_label, prompt_hash, prompt_text
+
+    def _call_timeout(self) -> float:
+        """Request timeout: `timeout`, capped by the time left before the current run's deadline."""
+        run = current_run()
+        return run.call_timeout(self.timeout) if run is not None else self.timeout
+
+    def _raise_if_deadline(self, exc: BaseException) -> None:
+        """
+        Report a timeout caused by the run's deadline (see `_call_timeout`) as RunDeadlineExceeded,
+        for both transports (httpx on the async path, requests on the sync one).
+        """
+        run = current_run()
+        if run is not None and isinstance(exc, (httpx.TimeoutException, requests.exceptions.Timeout)):
+            run.check()
+
+    def _parse_stream_line(self, line: str) -> Tuple[str, bool, Dict[str, Any]]:
+        """Return (content chunk, done flag, decoded line) for one NDJSON line of an Ollama stream."""
+        if not line:
+            return "", False, {}
+        data = json.loads(line)
+        if data.get("error"):
+            raise ValueError(f"Ollama stream error: {data['error']}")
+        chunk = (data.get("message") or {}).get("content") or ""
+        return chunk, bool(data.get("done")), data
+
+    def _forward_token(self, on_token: Optional[Callable[[str], None]], chunk: str) -> None:
+        if on_token is None:
+            return
+        try:
+            on_token(chunk)
+        except Exception:
+            # A failing consumer must not abort the model call.
+            return
+
+    def _build_payload(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        stream: bool,
+        extra_options: Optional[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        options = {"temperature": temperature}
+        if extra_options:
+            options.update(extra_options)
+        return {
+            "model": model,
+            "messages": messages,
+            "stream": stream,
+            "options": options,
+        }
+
+    def _log_success(
+        self,
+        model: str,
+        endpoint: str,
+        scenario_label: str,
+        call_identifier: str,
+        prompt_hash: str,
+        prompt_text: str,
+        content: str,
+        data: Dict[str, Any],
+        start_ms: int,
+        status_label: str,
+        notes: str,
+        cache_key: Optional[str] = None,
+        offload_cache: bool = False,
+    ) -> None:
+        """`offload_cache`: called on the event loop, so a disk-backed cache is written from a worker thread."""
+        completion_tokens = int(data.get("eval_count") or 0)
+        latency_ms = max(0, utc_ms() - start_ms)
+        self._record_metrics(model, status_label, latency_ms, data)
+        run = current_run()
+        if run is not None:
+            run.add_tokens(int(data.get("prompt_eval_count") or 0) + completion_tokens)
+        if cache_key and self.response_cache is not None:
+            if offload_cache and self.response_cache.on_disk:
+                # Not awaited: put() never raises and the caller should not wait for the write.
+                asyncio.get_running_loop().run_in_executor(
+                    None, self.response_cache.put, cache_key, content, completion_tokens
+                )
+            else:
+                self.response_cache.put(cache_key, content, completion_tokens)
+        if not self.cost_logger:
+            return
+        # Ollama reports exact counts; tokenizing ourselves is only the fallback (done off-thread).
+        prompt_tokens_api = data.get("prompt_eval_count")
+        self.cost_logger.log_success(
+            scenario_id=scenario_label,
+            call_id=call_identifier,
+            model=model,
+            endpoint=f"{self.base_url}{endpoint}",
+            prompt_hash=prompt_hash,
+            prompt_tokens=int(prompt_tokens_api) if prompt_tokens_api is not None else None,
+            completion_tokens=completion_tokens or None,
+            latency_ms=latency_ms,
+            status=status_label,
+            notes=notes,
+            prompt_text=prompt_text,
+            completion_text=content,
+        )
+
+    def _record_metrics(self, model: str, status_label: str, latency_ms: int, data: Dict[str, Any]) -> None:
+        LLM_REQUESTS.inc(model=model, status=status_label)
+        LLM_LATENCY.observe(latency_ms / 1000, model=model)
+        prompt_tokens = data.get("prompt_eval_count")
+        completion_tokens = data.get("eval_count")
+        if prompt_tokens:
+            LLM_TOKENS.inc(int(prompt_tokens), model=model, kind="prompt")
+        if completion_tokens:
+            LLM_TOKENS.inc(int(completion_tokens), model=model, kind="completion")
+            # eval_duration (ns) is the generation time alone; fall back to the call latency.
+            eval_ns = data.get("eval_duration")
+            LLM_GENERATION_SECONDS.inc(int(eval_ns) / 1e9 if eval_ns else latency_ms / 1000, model=model)
+
+    def _cache_key(self, model: str, payload: Dict[str, Any], prompt_hash: str) -> Optional[str]:
+        if self.response_cache is None or not prompt_hash:
+            return None
+        return self.response_cache.make_key(model, payload.get("options") or {}, prompt_hash)
+
+    def _cache_lookup(
+        self,
+        cache_key: Optional[str],
+        model: str,
+        endpoint: str,
+        scenario_label: str,
+        call_identifier: str,
+        prompt_hash: str,
+        prompt_text: str,
+        start_ms: int,
+        notes: str,
+    ) -> Optional[str]:
+        """Return the cached completion (logged with status `cache_hit`) or None on a miss."""
+        if not cache_key or self.response_cache is None:
+            return None
+        cached = self.response_cache.get(cache_key)
+        return self._cache_result(
+            cached, model, endpoint, scenario_label, call_identifier, prompt_hash, prompt_text, start_ms, notes
+        )
+
+    async def _acache_lookup(
+        self,
+        cache_key: Optional[str],
+        model: str,
+        endpoint: str,
+        scenario_label: str,
+        call_identifier: str,
+        prompt_hash: str,
+        prompt_text: str,
+        start_ms: int,
+        notes: str,
+    ) -> Optional[str]:
+        """`_cache_lookup` for the event loop: with a disk tier, the lookup runs in a worker thread."""
+        if not cache_key or self.response_cache is None:
+            return None
+        cache = self.response_cache
+        cached = await asyncio.to_thread(cache.get, cache_key) if cache.on_disk else cache.get(cache_key)
+        return self._cache_result(
+            cached, model, endpoint, scenario_label, call_identifier, prompt_hash, prompt_text, start_ms, notes
+        )
+
+    def _cache_result(
+        self,
+        cached: Optional[CachedResponse],
+        model: str,
+        endpoint: str,
+        scenario_label: str,
+        call_identifier: str,
+        prompt_hash: str,
+        prompt_text: str,
+        start_ms: int,
+        notes: str,
+    ) -> Optional[str]:
+        RESPONSE_CACHE_REQUESTS.inc(result="miss" if cached is None else "hit")
+        if cached is None:
+            return None
+        LLM_REQUESTS.inc(model=model, status="cache_hit")
+        if self.cost_logger:
+            # Tokens are those the hit avoided, so savings can be summed per status.
+            self.cost_logger.log_success(
+                scenario_id=scenario_label,
+                call_id=call_identifier,
+                model=model,
+                endpoint=f"{self.base_url}{endpoint}",
+                prompt_hash=prompt_hash,
+                prompt_tokens=None,
+                completion_tokens=cached.completion_tokens,
+                latency_ms=max(0, utc_ms() - start_ms),
+                status="cache_hit",
+                notes=notes,
+                prompt_text=prompt_text,
+            )
+        return cached.content
+
+    def _log_failure(
+        self,
+        model: str,
+        endpoint: str,
+        scenario_label: str,
+        call_identifier: str,
+        prompt_hash: str,
+        prompt_text: str,
+        start_ms: int,
+        status_label: str,
+        exc: BaseException,
+        notes: str,
+    ) -> None:
+        status_label = status_label if status_label.startswith("error:") else f"error:{exc.__class__.__name__}"
+        LLM_REQUESTS.inc(model=model, status=status_label)
+        if not self.cost_logger:
+            return
+        self.cost_logger.log_failure(
+            scenario_id=scenario_label,
+            call_id=call_identifier,
+            model=model,
+            endpoint=f"{self.base_url}{endpoint}",
+            prompt_hash=prompt_hash,
+            prompt_tokens=None,
+            latency_ms=max(0, utc_ms() - start_ms),
+            error=exc,
+            notes=notes or status_label,
+            prompt_text=prompt_text,
+        )
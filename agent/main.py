@@ -1,15 +1,27 @@
 import argparse
+import asyncio
 import json
-from typing import Any, Dict, List, Optional
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
 
 import uvicorn
-from fastapi import FastAPI, HTTPException
-from fastapi.concurrency import run_in_threadpool
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from agents.memory_summarizer import MemorySummarizer
+from clients.model_scheduler import ModelScheduler, parse_model_limits
+from models.tasks import SEVERITY_LEVELS
+from utils.cost_store import COST_BACKENDS
+from utils.jobs import Job, JobManager, JobQueueFull, SqliteJobStore
 from orchestrator import Orchestrator
 from utils.memory import MemoryStore
+from utils.metrics import HTTP_REQUESTS, REGISTRY
+from utils.response_cache import ResponseCache
+from utils.run_context import RunBudgetExceeded, RunCancelled, RunDeadlineExceeded, RunIdInUse
 
 DEFAULT_OLLAMA_URL = "http://localhost:11434"
 DEFAULT_PLANNER_MODEL = "qwen2.5"
@@ -20,9 +32,32 @@ DEFAULT_SELF_CORRECTION_MODEL = DEFAULT_EXECUTOR_MODEL
 DEFAULT_OPTIMIZER_MODEL = "gemma3:4b"
 DEFAULT_RESPONSE_MODEL = "gemma3:4b"
 DEFAULT_MAX_WORKERS = 2
+DEFAULT_CORRECTION_MIN_SEVERITY = "low"
+DEFAULT_CONTEXT_TEXT_TOKENS = 1500
+DEFAULT_CONTEXT_CODE_TOKENS = 3000
 DEFAULT_API_HOST = "0.0.0.0"
 DEFAULT_API_PORT = 5000
 DEFAULT_OLLAMA_TIMEOUT = 600
+DEFAULT_OLLAMA_MAX_CONNECTIONS = 8
+DEFAULT_RESPONSE_CACHE_PATH = "response_cache.sqlite"
+DEFAULT_RESPONSE_CACHE_TTL = 24 * 3600
+DEFAULT_RESPONSE_CACHE_ENTRIES = 256
+DEFAULT_RESPONSE_CACHE_MAX_MB = 256
+DEFAULT_MODEL_CONCURRENCY = 2
+DEFAULT_MAX_LOADED_MODELS = 0
+DEFAULT_MODEL_BATCH_SIZE = 8
+DEFAULT_COSTS_BATCH_SIZE = 64
+DEFAULT_COSTS_FLUSH_INTERVAL = 1.0
+DEFAULT_TRACE_HISTORY = 20
+DEFAULT_MEMORY_PATH = "memory_store.sqlite"
+DEFAULT_MEMORY_HOT_SESSIONS = 64
+DEFAULT_MEMORY_COMPACT_INTERVAL = 600.0
+DEFAULT_MEMORY_KEEP_RECENT = 20
+DEFAULT_JOB_WORKERS = 2
+DEFAULT_JOB_QUEUE_SIZE = 100
+DEFAULT_JOB_HISTORY = 200
+# Seconds between two checks that the client of /api/run is still connected.
+DISCONNECT_POLL_INTERVAL = 0.5
 
 
 class MessageModel(BaseModel):
@@ -44,6 +79,20 @@ class RunPayload(BaseModel):
         default=None,
         description="Identifiant de discussion pour isoler la memoire par chat. Absent => memoire desactivee.",
     )
+    use_responder: Optional[bool] = Field(
+        default=None,
+        description="false => reponse Markdown deterministe sans appel au responder. Absent => reglage serveur.",
+    )
+    timeout_seconds: Optional[float] = Field(
+        default=None, description="Delai maximal du run en secondes (0 = aucun). Absent => reglage serveur."
+    )
+    token_budget: Optional[int] = Field(
+        default=None, description="Budget de tokens (prompt + completion) du run (0 = illimite). Absent => reglage serveur."
+    )
+    run_id: Optional[str] = Field(
+        default=None,
+        description="Identifiant choisi par le client pour annuler le run (DELETE /api/run/{run_id}). Absent => genere.",
+    )
 
 
 class FileEditModel(BaseModel):
@@ -92,6 +141,9 @@ class RunResponse(BaseModel):
     context_used: str = Field("", exclude=True)
     memory_context: str = Field("", exclude=True)
     scenario_id: str = ""
+    trace_id: str = ""
+    run_id: str = ""
+    tokens_used: int = 0
     search_results: List[Dict[str, str]] = Field(default_factory=list)
     completed_tasks: int
     tasks: List[TaskResultModel]
@@ -111,6 +163,20 @@ class MemoryEntryModel(BaseModel):
     timestamp: float
 
 
+class JobModel(BaseModel):
+    job_id: str
+    status: str = Field(..., description="queued, running, succeeded, failed ou cancelled.")
+    scenario_id: str
+    conversation_id: str
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    stage: str = Field("", description="Derniere etape demarree (optimizer, planner, executor...).")
+    events: int = Field(0, description="Nombre d'evenements de progression enregistres.")
+    error: str = ""
+    result: Optional[Dict[str, Any]] = Field(default=None, description="RunResponse une fois le job reussi.")
+
+
 class OptimizePayload(BaseModel):
     prompt: str = Field(..., description="Prompt a optimiser.")
     context: str = ""
@@ -123,7 +189,28 @@ class OptimizeResponse(BaseModel):
 
 def build_orchestrator(config: Optional[argparse.Namespace] = None) -> Orchestrator:
     disable_memory = bool(getattr(config, "disable_memory", False))
-    memory_store = None if disable_memory else MemoryStore(path=getattr(config, "memory_path", "memory_store.json"))
+    memory_store = None
+    if not disable_memory:
+        memory_store = MemoryStore(
+            path=getattr(config, "memory_path", DEFAULT_MEMORY_PATH),
+            max_hot_sessions=int(getattr(config, "memory_hot_sessions", DEFAULT_MEMORY_HOT_SESSIONS)),
+            ttl_days=float(getattr(config, "memory_ttl_days", 0.0)),
+            compact_keep_recent=int(getattr(config, "memory_keep_recent", DEFAULT_MEMORY_KEEP_RECENT)),
+        )
+    response_cache = None
+    if bool(getattr(config, "response_cache", False)):
+        response_cache = ResponseCache(
+            path=getattr(config, "response_cache_path", DEFAULT_RESPONSE_CACHE_PATH) or None,
+            max_memory_entries=int(getattr(config, "response_cache_entries", DEFAULT_RESPONSE_CACHE_ENTRIES)),
+            max_disk_bytes=int(getattr(config, "response_cache_max_mb", DEFAULT_RESPONSE_CACHE_MAX_MB)) * 1024 * 1024,
+            ttl_seconds=float(getattr(config, "response_cache_ttl", DEFAULT_RESPONSE_CACHE_TTL)),
+        )
+    model_scheduler = ModelScheduler(
+        default_limit=int(getattr(config, "model_concurrency", DEFAULT_MODEL_CONCURRENCY)),
+        limits=parse_model_limits(getattr(config, "model_limits", "") or ""),
+        max_loaded_models=int(getattr(config, "max_loaded_models", DEFAULT_MAX_LOADED_MODELS)),
+        max_batch=int(getattr(config, "model_batch_size", DEFAULT_MODEL_BATCH_SIZE)),
+    )
     orchestrator = Orchestrator(
         ollama_base_url=getattr(config, "ollama_url", DEFAULT_OLLAMA_URL),
         planner_model=getattr(config, "planner_model", DEFAULT_PLANNER_MODEL),
@@ -135,23 +222,154 @@ def build_orchestrator(config: Optional[argparse.Namespace] = None) -> Orchestra
         optimizer_enabled=not bool(getattr(config, "disable_optimizer", False)),
         response_model=getattr(config, "response_model", DEFAULT_RESPONSE_MODEL),
         max_workers=max(1, int(getattr(config, "max_workers", DEFAULT_MAX_WORKERS))),
+        correction_min_severity=getattr(config, "correction_min_severity", DEFAULT_CORRECTION_MIN_SEVERITY),
+        incremental_critic=not bool(getattr(config, "full_final_critic", False)),
+        optimizer_min_chars=int(getattr(config, "optimizer_min_chars", 0)),
+        skip_correction_score=int(getattr(config, "skip_correction_score", 0)),
+        use_responder=not bool(getattr(config, "no_responder", False)),
+        context_text_tokens=int(getattr(config, "context_text_tokens", DEFAULT_CONTEXT_TEXT_TOKENS)),
+        context_code_tokens=int(getattr(config, "context_code_tokens", DEFAULT_CONTEXT_CODE_TOKENS)),
         verbose=not bool(getattr(config, "no_verbose", False)),
         memory_store=memory_store,
         memory_enabled=not disable_memory,
         enable_search=bool(getattr(config, "enable_search", False)),
         search_timeout=int(getattr(config, "search_timeout", 30)),
         costs_path=getattr(config, "costs_path", "costs.csv"),
+        async_cost_accounting=not bool(getattr(config, "sync_cost_accounting", False)),
+        costs_batch_size=max(1, int(getattr(config, "costs_batch_size", DEFAULT_COSTS_BATCH_SIZE))),
+        costs_flush_interval=float(getattr(config, "costs_flush_interval", DEFAULT_COSTS_FLUSH_INTERVAL)),
+        costs_rotate_bytes=int(float(getattr(config, "costs_rotate_mb", 0)) * 1024 * 1024),
+        costs_rotate_daily=bool(getattr(config, "costs_rotate_daily", False)),
+        costs_backend=getattr(config, "costs_backend", "csv"),
         ollama_timeout=int(getattr(config, "ollama_timeout", DEFAULT_OLLAMA_TIMEOUT)),
+        ollama_max_connections=max(
+            1, int(getattr(config, "ollama_max_connections", DEFAULT_OLLAMA_MAX_CONNECTIONS))
+        ),
+        response_cache=response_cache,
+        model_scheduler=model_scheduler,
+        trace_history=max(0, int(getattr(config, "trace_history", DEFAULT_TRACE_HISTORY))),
+        run_timeout=float(getattr(config, "run_timeout", 0.0)),
+        run_token_budget=int(getattr(config, "run_token_budget", 0)),
     )
     orchestrator.memory_disabled = disable_memory
+    embedding_model = str(getattr(config, "memory_embedding_model", "") or "")
+    if memory_store is not None and embedding_model:
+        try:
+            memory_store.enable_semantic(
+                lambda text: orchestrator.client.embed(embedding_model, text), embedding_model
+            )
+        except RuntimeError as exc:
+            print(f"[Memory] Rappel semantique desactive: {exc}", flush=True)
+    summary_model = str(getattr(config, "memory_summary_model", "") or "")
+    if memory_store is not None and (summary_model or memory_store.ttl_seconds > 0):
+        summarizer = (
+            MemorySummarizer(
+                client=orchestrator.client, model=summary_model, max_input_chars=memory_store.compact_max_chars
+            )
+            if summary_model
+            else None
+        )
+        memory_store.start_compaction(
+            float(getattr(config, "memory_compact_interval", DEFAULT_MEMORY_COMPACT_INTERVAL)),
+            summarizer.summarize if summarizer is not None else None,
+        )
     return orchestrator
 
 
-def create_app(orchestrator: Optional[Orchestrator] = None) -> FastAPI:
+def build_job_manager(config: Optional[argparse.Namespace] = None) -> JobManager:
+    jobs_path = getattr(config, "jobs_path", "")
+    return JobManager(
+        workers=int(getattr(config, "job_workers", DEFAULT_JOB_WORKERS)),
+        max_queued=int(getattr(config, "job_queue_size", DEFAULT_JOB_QUEUE_SIZE)),
+        history=int(getattr(config, "job_history", DEFAULT_JOB_HISTORY)),
+        store=SqliteJobStore(jobs_path) if jobs_path else None,
+    )
+
+
+def register_scheduler_metrics(app: FastAPI) -> None:
+    """Model scheduler gauges, read from the scheduler snapshot at scrape time only."""
+
+    def collector(field: str) -> Any:
+        def collect() -> List[tuple]:
+            orchestrator = app.state.orchestrator
+            scheduler = orchestrator.client.scheduler if orchestrator is not None else None
+            if scheduler is None:
+                return []
+            samples = []
+            for model, stats in scheduler.snapshot().items():
+                if field == "saturation":
+                    value = stats["in_flight"] / stats["limit"] if stats["limit"] else 0.0
+                else:
+                    value = stats[field]
+                samples.append(((model,), value))
+            return samples
+
+        return collect
+
+    for name, field, documentation in (
+        ("mycodex_model_in_flight", "in_flight", "Model calls holding a scheduler slot."),
+        ("mycodex_model_queue_depth", "queue_depth", "Model calls waiting for a scheduler slot."),
+        ("mycodex_model_saturation", "saturation", "Scheduler slots in use / per-model limit."),
+    ):
+        REGISTRY.gauge(name, documentation, ["model"]).collect = collector(field)
+
+
+class RequestCountMiddleware:
+    """
+    Count HTTP requests by route and status code. Plain ASGI rather than `@app.middleware("http")`,
+    whose receive wrapper hides client disconnects from `Request.is_disconnected`.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUESTS.inc(route=getattr(route, "path", "unmatched"), status=str(status))
+
+
+def create_app(orchestrator: Optional[Orchestrator] = None, config: Optional[argparse.Namespace] = None) -> FastAPI:
+    """
+    Build the API. The orchestrator (cost writer thread, memory and cache databases) and the job
+    manager are created at server start-up from `app.state.config`, so importing this module
+    opens no file and `main()` only has to set the CLI configuration.
+    """
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+        if app.state.orchestrator is None:
+            app.state.orchestrator = build_orchestrator(app.state.config)
+        if app.state.jobs is None:
+            app.state.jobs = build_job_manager(app.state.config)
+        yield
+        # Jobs first: they still use the HTTP client and log costs until they have unwound.
+        await app.state.jobs.close()
+        # Close the pooled keep-alive connections to Ollama bound to the server loop.
+        await app.state.orchestrator.client.aclose()
+        # Write the cost rows still queued on the accounting thread.
+        await asyncio.to_thread(app.state.orchestrator.cost_logger.close)
+        if app.state.orchestrator.memory:
+            await asyncio.to_thread(app.state.orchestrator.memory.stop_compaction)
+
     app = FastAPI(
         title="MyCodex Agent API",
         version="0.1.0",
         description="API FastAPI pour piloter l'agent MyCodex via l'extension VS Code.",
+        lifespan=lifespan,
     )
     app.add_middleware(
         CORSMiddleware,
@@ -161,62 +379,297 @@ def create_app(orchestrator: Optional[Orchestrator] = None) -> FastAPI:
         allow_headers=["*"],
     )
 
-    app.state.orchestrator = orchestrator or build_orchestrator()
+    app.state.config = config
+    app.state.orchestrator = orchestrator
+    app.state.jobs = None
+    register_scheduler_metrics(app)
+
+    app.add_middleware(RequestCountMiddleware)
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics() -> PlainTextResponse:
+        """Prometheus text exposition of the in-process metrics registry."""
+        return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
     @app.get("/health")
     async def health() -> Dict[str, str]:
         return {"status": "ok"}
 
-    @app.post("/api/run", response_model=RunResponse)
-    async def run_endpoint(payload: RunPayload) -> RunResponse:
-        current = app.state.orchestrator
-        goal_to_use = payload.goal
-        scenario_id = payload.scenario_id or payload.session_id or "default"
+    async def resolve_goal(current: Orchestrator, payload: RunPayload, scenario_id: str) -> str:
         # Optimize when requested; frontend sends prior history so we no longer block on history length.
-        should_optimize = payload.optimize and current.optimizer_enabled
-        if should_optimize:
-            try:
-                optimized = await run_in_threadpool(
-                    current.optimize_prompt,
-                    payload.goal,
-                    payload.context,
-                    scenario_id,
-                )
-                goal_to_use = optimized.get("optimized_prompt", goal_to_use)
-                if current.verbose:
-                    print("[Optimizer] Prompt optimise applique (API).", flush=True)
-            except Exception as exc:  # pragma: no cover - resilience
-                if current.verbose:
-                    print(f"[Optimizer] Echec optimisation du prompt: {exc}", flush=True)
-                goal_to_use = payload.goal
+        if not (payload.optimize and current.should_optimize(payload.goal)):
+            return payload.goal
+        try:
+            optimized = await current.aoptimize_prompt(payload.goal, payload.context, scenario_id)
+            if current.verbose:
+                print("[Optimizer] Prompt optimise applique (API).", flush=True)
+            return optimized.get("optimized_prompt", payload.goal)
+        except Exception as exc:  # pragma: no cover - resilience
+            if current.verbose:
+                print(f"[Optimizer] Echec optimisation du prompt: {exc}", flush=True)
+            return payload.goal
+
+    def run_arguments(current: Orchestrator, payload: RunPayload, goal: str) -> tuple:
         # Pas d'ID de session => memoire desactivee pour eviter le mode global implicite.
         use_memory = payload.use_memory and bool(payload.session_id)
+        return (
+            goal,
+            payload.context,
+            payload.constraints,
+            use_memory and not getattr(current, "memory_disabled", False),
+            payload.history,
+            payload.session_id,
+            payload.enable_search,
+            payload.search_query,
+        )
+
+    def ensure_new_run_id(current: Orchestrator, payload: RunPayload) -> None:
+        if payload.run_id and payload.run_id in current.active_runs:
+            raise HTTPException(status_code=409, detail=f"Run {payload.run_id} deja en cours.")
+
+    async def until_disconnected(request: Request, work: Awaitable[Any]) -> Any:
+        """
+        Await `work`, cancelling it as soon as the client disconnects: a run nobody waits for
+        stops issuing model calls instead of finishing in the background.
+        """
+        task = asyncio.ensure_future(work)
         try:
-            result = await run_in_threadpool(
-                current.run,
-                goal_to_use,
-                payload.context,
-                payload.constraints,
-                use_memory and not getattr(current, "memory_disabled", False),
-                payload.history,
-                payload.session_id,
-                payload.enable_search,
-                payload.search_query,
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+                if done:
+                    return task.result()
+                if await request.is_disconnected():
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+                    raise HTTPException(status_code=499, detail="Client deconnecte, run annule.")
+        finally:
+            if not task.done():
+                task.cancel()
+
+    @app.post("/api/run", response_model=RunResponse)
+    async def run_endpoint(payload: RunPayload, request: Request) -> RunResponse:
+        current = app.state.orchestrator
+        scenario_id = payload.scenario_id or payload.session_id or "default"
+        ensure_new_run_id(current, payload)
+
+        async def work() -> Dict[str, Any]:
+            goal_to_use = await resolve_goal(current, payload, scenario_id)
+            return await current.arun(
+                *run_arguments(current, payload, goal_to_use),
                 scenario_id=scenario_id,
+                use_responder=payload.use_responder,
+                timeout=payload.timeout_seconds,
+                token_budget=payload.token_budget,
+                run_id=payload.run_id,
             )
+
+        try:
+            result = await until_disconnected(request, work())
             return RunResponse(**result)
+        except HTTPException:
+            raise
+        except RunIdInUse as exc:
+            raise HTTPException(status_code=409, detail=str(exc)) from exc
+        except RunDeadlineExceeded as exc:
+            raise HTTPException(status_code=504, detail=str(exc)) from exc
+        except RunBudgetExceeded as exc:
+            raise HTTPException(status_code=429, detail=str(exc)) from exc
+        except RunCancelled as exc:
+            raise HTTPException(status_code=499, detail=str(exc)) from exc
         except Exception as exc:  # pragma: no cover - API safety
             raise HTTPException(status_code=500, detail=f"Echec de l'agent: {exc}") from exc
 
+    @app.delete("/api/run/{run_id}")
+    async def cancel_run(run_id: str) -> Dict[str, bool]:
+        """Cancel a run in progress (any endpoint) by the `run_id` sent in its payload or events."""
+        if not app.state.orchestrator.cancel_run(run_id):
+            raise HTTPException(status_code=404, detail="Aucun run en cours avec cet identifiant.")
+        return {"cancelled": True}
+
+    async def execute_run(
+        current: Orchestrator, payload: RunPayload, scenario_id: str, emit: Callable[[Dict[str, Any]], None]
+    ) -> Dict[str, Any]:
+        # Shared by /api/run/stream and /api/jobs: progress goes to `emit`, the result is returned.
+        emit({"type": "stage", "stage": "optimizer", "status": "start"})
+        goal_to_use = await resolve_goal(current, payload, scenario_id)
+        emit({"type": "stage", "stage": "optimizer", "status": "end"})
+        try:
+            result = await current.arun(
+                *run_arguments(current, payload, goal_to_use),
+                scenario_id=scenario_id,
+                on_event=emit,
+                use_responder=payload.use_responder,
+                timeout=payload.timeout_seconds,
+                token_budget=payload.token_budget,
+                run_id=payload.run_id,
+            )
+        except RunIdInUse as exc:
+            # Same run_id started since the request was accepted (e.g. while the job was queued).
+            raise HTTPException(status_code=409, detail=str(exc)) from exc
+        return jsonable_encoder(RunResponse(**result))
+
+    @app.post("/api/run/stream")
+    async def run_stream_endpoint(payload: RunPayload) -> StreamingResponse:
+        """
+        Same pipeline as /api/run, streamed as NDJSON: one JSON event per line (stages and model
+        tokens as they arrive), then a final `{"type": "result", "data": ...}` or `{"type": "error", ...}`.
+        """
+        current = app.state.orchestrator
+        scenario_id = payload.scenario_id or payload.session_id or "default"
+        ensure_new_run_id(current, payload)
+        events: asyncio.Queue = asyncio.Queue()
+
+        def emit(event: Optional[Dict[str, Any]]) -> None:
+            events.put_nowait(event)
+
+        async def produce() -> None:
+            try:
+                result = await execute_run(current, payload, scenario_id, emit)
+                emit({"type": "result", "data": result})
+            except Exception as exc:  # pragma: no cover - API safety
+                emit({"type": "error", "detail": f"Echec de l'agent: {exc}"})
+            finally:
+                emit(None)
+
+        async def body():
+            producer = asyncio.create_task(produce())
+            try:
+                while True:
+                    event = await events.get()
+                    if event is None:
+                        break
+                    yield json.dumps(event, ensure_ascii=False) + "\n"
+            finally:
+                if not producer.done():
+                    # Stream closed before the end (client gone): stop the run.
+                    producer.cancel()
+                await asyncio.gather(producer, return_exceptions=True)
+
+        return StreamingResponse(body(), media_type="application/x-ndjson")
+
+    async def get_job_or_404(job_id: str) -> Job:
+        job = await app.state.jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job introuvable.")
+        return job
+
+    @app.post("/api/jobs", response_model=JobModel, status_code=202)
+    async def submit_job(payload: RunPayload) -> JobModel:
+        """
+        Queue the same pipeline as /api/run on the server's background workers and return at once.
+        Follow it with GET /api/jobs/{job_id} (polling) or /api/jobs/{job_id}/events (SSE).
+        """
+        current = app.state.orchestrator
+        scenario_id = payload.scenario_id or payload.session_id or "default"
+        ensure_new_run_id(current, payload)
+
+        async def runner(emit: Callable[[Dict[str, Any]], None]) -> Dict[str, Any]:
+            return await execute_run(current, payload, scenario_id, emit)
+
+        try:
+            job = app.state.jobs.submit(runner, scenario_id=scenario_id, conversation_id=payload.session_id or "")
+        except JobQueueFull as exc:
+            raise HTTPException(status_code=429, detail=str(exc)) from exc
+        return JobModel(**job.summary())
+
+    @app.get("/api/jobs", response_model=List[JobModel])
+    async def list_jobs(limit: int = 50) -> List[JobModel]:
+        """Most recent jobs first, without their results."""
+        jobs = await app.state.jobs.list(max(1, limit))
+        return [JobModel(**job) for job in jobs]
+
+    @app.get("/api/jobs/{job_id}", response_model=JobModel)
+    async def get_job(job_id: str) -> JobModel:
+        """Status and progress of a job, with its RunResponse once it succeeded."""
+        job = await get_job_or_404(job_id)
+        return JobModel(**job.summary(with_result=True))
+
+    @app.get("/api/jobs/{job_id}/events")
+    async def job_events(job_id: str, request: Request, after: int = 0) -> StreamingResponse:
+        """
+        Server-Sent Events of a job: recorded progress from `after` (or the Last-Event-ID header
+        on reconnection), then live stages and tokens until the job ends with `result`/`error`
+        and a terminal `status` event. Comment lines keep idle connections open.
+        """
+        job = await get_job_or_404(job_id)
+        last_event_id = request.headers.get("last-event-id", "")
+        if last_event_id.isdigit():
+            after = max(after, int(last_event_id) + 1)
+
+        async def body():
+            async for event in app.state.jobs.events(job, after=after):
+                if event is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                lines = f"id: {event['seq']}\n" if "seq" in event else ""
+                yield f"{lines}event: {event.get('type', 'message')}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+        return StreamingResponse(
+            body(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @app.delete("/api/jobs/{job_id}")
+    async def cancel_job(job_id: str) -> Dict[str, bool]:
+        """Cancel a queued or running job (False if it had already finished)."""
+        await get_job_or_404(job_id)
+        return {"cancelled": app.state.jobs.cancel(job_id)}
+
+    @app.get("/api/scheduler")
+    async def scheduler_stats() -> Dict[str, Dict[str, float]]:
+        """Per-model queue depth, in-flight calls and queue wait times of the model scheduler."""
+        scheduler = app.state.orchestrator.client.scheduler
+        return scheduler.snapshot() if scheduler is not None else {}
+
+    @app.get("/api/costs/templates")
+    async def template_costs() -> Dict[str, Dict[str, float]]:
+        """Prompt/completion tokens per prompt template since the server started."""
+        return app.state.orchestrator.cost_logger.template_stats()
+
+    @app.get("/api/traces")
+    async def list_traces() -> List[Dict[str, Any]]:
+        """Recent run traces (duration and time per span name), most recent first."""
+        return app.state.orchestrator.list_traces()
+
+    @app.get("/api/traces/{trace_id}")
+    async def get_trace(trace_id: str, format: str = "otel") -> Dict[str, Any]:
+        """Spans of a run as OpenTelemetry JSON (`format=otel`) or Chrome trace events (`format=chrome`)."""
+        if format not in ("otel", "chrome"):
+            raise HTTPException(status_code=400, detail="Format inconnu (otel ou chrome).")
+        tracer = app.state.orchestrator.get_trace(trace_id)
+        if tracer is None:
+            raise HTTPException(status_code=404, detail="Trace introuvable.")
+        return tracer.export(format)
+
+    @app.get("/api/costs")
+    async def cost_aggregates(
+        scenario_id: Optional[str] = None,
+        model: Optional[str] = None,
+        since: Optional[str] = None,
+        max_scenarios: int = 50,
+    ) -> Dict[str, Any]:
+        """Latency p50/p95, tokens per second and tokens per scenario from the cost store."""
+        try:
+            return await asyncio.to_thread(
+                app.state.orchestrator.cost_logger.aggregates,
+                scenario_id=scenario_id,
+                model=model,
+                since=since,
+                max_scenarios=max_scenarios,
+            )
+        except Exception as exc:
+            raise HTTPException(status_code=500, detail=f"Lecture des couts impossible: {exc}") from exc
+
     @app.get("/api/memory", response_model=List[MemoryEntryModel])
     async def list_memory(conversation_id: Optional[str] = None) -> List[MemoryEntryModel]:
         current = app.state.orchestrator
         if not current.memory_enabled or not current.memory:
             raise HTTPException(status_code=400, detail="Memoire desactivee.")
-        entries = current.memory.list_entries(conversation_id)
+        entries = await asyncio.to_thread(current.memory.list_entries, conversation_id)
         return [
             MemoryEntryModel(
-                id=str(entry.timestamp),
+                id=entry.entry_id,
                 goal=entry.goal,
                 context=entry.context,
                 constraints=entry.constraints,
@@ -233,7 +686,7 @@ def create_app(orchestrator: Optional[Orchestrator] = None) -> FastAPI:
         current = app.state.orchestrator
         if not current.memory_enabled or not current.memory:
             raise HTTPException(status_code=400, detail="Memoire desactivee.")
-        removed = current.memory.delete_entry(entry_id)
+        removed = await asyncio.to_thread(current.memory.delete_entry, entry_id)
         if not removed:
             raise HTTPException(status_code=404, detail="Entree non trouvee.")
         return {"ok": True}
@@ -244,11 +697,7 @@ def create_app(orchestrator: Optional[Orchestrator] = None) -> FastAPI:
         if not current.optimizer_enabled:
             raise HTTPException(status_code=400, detail="L'optimisation de prompt est desactivee sur ce serveur.")
         try:
-            result = await run_in_threadpool(
-                current.optimize_prompt,
-                payload.prompt,
-                payload.context,
-            )
+            result = await current.aoptimize_prompt(payload.prompt, payload.context)
             return OptimizeResponse(**result)
         except Exception as exc:  # pragma: no cover - API safety
             raise HTTPException(status_code=500, detail=f"Echec de l'optimizer: {exc}") from exc
@@ -280,6 +729,35 @@ def parse_args() -> argparse.Namespace:
         default=DEFAULT_OLLAMA_TIMEOUT,
         help="Timeout en secondes pour les appels Ollama (par defaut 300).",
     )
+    parser.add_argument(
+        "--ollama-max-connections",
+        type=int,
+        default=DEFAULT_OLLAMA_MAX_CONNECTIONS,
+        help="Taille du pool de connexions keep-alive vers Ollama.",
+    )
+    parser.add_argument(
+        "--model-concurrency",
+        type=int,
+        default=DEFAULT_MODEL_CONCURRENCY,
+        help="Nombre maximal d'appels simultanes par modele (aligne sur OLLAMA_NUM_PARALLEL).",
+    )
+    parser.add_argument(
+        "--model-limits",
+        default="",
+        help="Limites par modele, ex: \"codellama:13b=1,qwen2.5=2\" (prioritaires sur --model-concurrency).",
+    )
+    parser.add_argument(
+        "--max-loaded-models",
+        type=int,
+        default=DEFAULT_MAX_LOADED_MODELS,
+        help="Nombre de modeles distincts sollicites en meme temps (0 = sans limite, cf. OLLAMA_MAX_LOADED_MODELS).",
+    )
+    parser.add_argument(
+        "--model-batch-size",
+        type=int,
+        default=DEFAULT_MODEL_BATCH_SIZE,
+        help="Appels consecutifs accordes a un modele charge avant de laisser passer un autre modele en attente.",
+    )
     parser.add_argument("--planner-model", default=DEFAULT_PLANNER_MODEL, help="Modele utilise pour la planification.")
     parser.add_argument("--executor-model", default=DEFAULT_EXECUTOR_MODEL, help="Modele utilise pour l'execution.")
     parser.add_argument("--critic-model", default=DEFAULT_CRITIC_MODEL, help="Modele utilise pour la critique.")
@@ -297,6 +775,46 @@ def parse_args() -> argparse.Namespace:
         default=DEFAULT_MAX_WORKERS,
         help="Nombre de taches sans dependances traitees en parallele.",
     )
+    parser.add_argument(
+        "--context-text-tokens",
+        type=int,
+        default=DEFAULT_CONTEXT_TEXT_TOKENS,
+        help="Budget en tokens de la partie texte du contexte envoyee a l'executor (0 = sans limite).",
+    )
+    parser.add_argument(
+        "--context-code-tokens",
+        type=int,
+        default=DEFAULT_CONTEXT_CODE_TOKENS,
+        help="Budget en tokens du code existant envoye a l'executor (0 = sans limite).",
+    )
+    parser.add_argument(
+        "--correction-min-severity",
+        choices=list(SEVERITY_LEVELS),
+        default=DEFAULT_CORRECTION_MIN_SEVERITY,
+        help="Severite minimale (attribuee par le critic a une tache) pour declencher sa self-correction.",
+    )
+    parser.add_argument(
+        "--full-final-critic",
+        action="store_true",
+        help="Critique finale complete apres corrections (par defaut: critique incrementale sur les diffs).",
+    )
+    parser.add_argument(
+        "--optimizer-min-chars",
+        type=int,
+        default=0,
+        help="Fast path : pas d'optimisation de prompt pour les objectifs plus courts (en caracteres, 0 = toujours).",
+    )
+    parser.add_argument(
+        "--skip-correction-score",
+        type=int,
+        default=0,
+        help="Fast path : pas de self-correction si le score initial du critic atteint ce seuil (0 = desactive).",
+    )
+    parser.add_argument(
+        "--no-responder",
+        action="store_true",
+        help="Fast path : reponse Markdown deterministe sans appel au modele responder.",
+    )
     parser.add_argument(
         "--no-verbose",
         action="store_true",
@@ -315,10 +833,158 @@ def parse_args() -> argparse.Namespace:
     )
     parser.add_argument(
         "--memory-path",
-        default="memory_store.json",
-        help="Chemin du fichier JSON de memoire persistante.",
+        default=DEFAULT_MEMORY_PATH,
+        help="Base SQLite de memoire persistante (un chemin .json est importe une fois dans le .sqlite voisin).",
+    )
+    parser.add_argument(
+        "--memory-hot-sessions",
+        type=int,
+        default=DEFAULT_MEMORY_HOT_SESSIONS,
+        help="Nombre de conversations gardees en memoire (LRU); les autres sont rechargees depuis la base a la demande.",
+    )
+    parser.add_argument(
+        "--memory-summary-model",
+        default="",
+        help="Petit modele Ollama qui resume les anciennes entrees de chaque conversation (vide = pas de resume).",
+    )
+    parser.add_argument(
+        "--memory-keep-recent",
+        type=int,
+        default=DEFAULT_MEMORY_KEEP_RECENT,
+        help="Entrees brutes les plus recentes conservees par conversation; les plus anciennes sont resumees.",
+    )
+    parser.add_argument(
+        "--memory-ttl-days",
+        type=float,
+        default=0.0,
+        help="Duree de retention des entrees memoire en jours (0 = illimitee).",
+    )
+    parser.add_argument(
+        "--memory-compact-interval",
+        type=float,
+        default=DEFAULT_MEMORY_COMPACT_INTERVAL,
+        help="Intervalle en secondes entre deux compactions de la memoire en arriere-plan (0 = desactive).",
+    )
+    parser.add_argument(
+        "--memory-embedding-model",
+        default="",
+        help="Modele d'embeddings Ollama pour le rappel semantique de la memoire (vide = BM25 seul, necessite numpy).",
     )
     parser.add_argument("--costs-path", default="costs.csv", help="Chemin du fichier CSV de suivi des couts/tokens.")
+    parser.add_argument(
+        "--sync-cost-accounting",
+        action="store_true",
+        help="Compte les tokens et ecrit costs.csv dans le fil de l'appel (par defaut: en arriere-plan).",
+    )
+    parser.add_argument(
+        "--run-timeout",
+        type=float,
+        default=0.0,
+        help="Delai maximal d'un run en secondes, au-dela les appels modele sont refuses (0 = aucun).",
+    )
+    parser.add_argument(
+        "--run-token-budget",
+        type=int,
+        default=0,
+        help="Budget de tokens (prompt + completion) par run, au-dela les appels modele sont refuses (0 = illimite).",
+    )
+    parser.add_argument(
+        "--job-workers",
+        type=int,
+        default=DEFAULT_JOB_WORKERS,
+        help="Nombre de jobs (/api/jobs) executes en parallele par le serveur.",
+    )
+    parser.add_argument(
+        "--job-queue-size",
+        type=int,
+        default=DEFAULT_JOB_QUEUE_SIZE,
+        help="Nombre maximal de jobs en attente d'un worker (au-dela: HTTP 429).",
+    )
+    parser.add_argument(
+        "--job-history",
+        type=int,
+        default=DEFAULT_JOB_HISTORY,
+        help="Nombre de jobs termines gardes en memoire (statut, progression, resultat).",
+    )
+    parser.add_argument(
+        "--jobs-path",
+        default="",
+        help="Fichier SQLite conservant les resultats des jobs termines (vide = memoire uniquement).",
+    )
+    parser.add_argument(
+        "--trace-history",
+        type=int,
+        default=DEFAULT_TRACE_HISTORY,
+        help="Nombre de traces de runs conservees pour /api/traces (0 = tracing desactive).",
+    )
+    parser.add_argument(
+        "--trace-output",
+        default="",
+        help="Mode CLI: fichier JSON ou ecrire la trace du run.",
+    )
+    parser.add_argument(
+        "--trace-format",
+        choices=("otel", "chrome"),
+        default="chrome",
+        help="Format de --trace-output: chrome (chrome://tracing, Perfetto) ou otel (JSON OpenTelemetry).",
+    )
+    parser.add_argument(
+        "--costs-backend",
+        choices=COST_BACKENDS,
+        default="csv",
+        help="Stockage des couts: csv, sqlite (indexe) ou parquet (segments, necessite pyarrow).",
+    )
+    parser.add_argument(
+        "--costs-batch-size",
+        type=int,
+        default=DEFAULT_COSTS_BATCH_SIZE,
+        help="Nombre de lignes de couts en attente declenchant une ecriture groupee de costs.csv.",
+    )
+    parser.add_argument(
+        "--costs-flush-interval",
+        type=float,
+        default=DEFAULT_COSTS_FLUSH_INTERVAL,
+        help="Delai maximal (secondes) avant l'ecriture des lignes de couts en attente.",
+    )
+    parser.add_argument(
+        "--costs-rotate-mb",
+        type=float,
+        default=0,
+        help="Rotation de costs.csv au-dela de cette taille en Mo (0 = pas de rotation).",
+    )
+    parser.add_argument(
+        "--costs-rotate-daily",
+        action="store_true",
+        help="Rotation quotidienne de costs.csv (costs-AAAAMMJJ.csv).",
+    )
+    parser.add_argument(
+        "--response-cache",
+        action="store_true",
+        help="Active le cache des reponses LLM (cle: modele, options, hash du prompt).",
+    )
+    parser.add_argument(
+        "--response-cache-path",
+        default=DEFAULT_RESPONSE_CACHE_PATH,
+        help="Fichier SQLite du cache de reponses (vide = cache memoire uniquement).",
+    )
+    parser.add_argument(
+        "--response-cache-ttl",
+        type=float,
+        default=DEFAULT_RESPONSE_CACHE_TTL,
+        help="Duree de vie en secondes d'une reponse en cache (0 = illimitee).",
+    )
+    parser.add_argument(
+        "--response-cache-entries",
+        type=int,
+        default=DEFAULT_RESPONSE_CACHE_ENTRIES,
+        help="Nombre d'entrees gardees dans le cache memoire (LRU).",
+    )
+    parser.add_argument(
+        "--response-cache-max-mb",
+        type=int,
+        default=DEFAULT_RESPONSE_CACHE_MAX_MB,
+        help="Taille maximale du cache disque en Mo (0 = illimitee).",
+    )
     parser.add_argument("--scenario-id", default=None, help="Identifiant scenario pour logger les couts/tokens.")
     parser.add_argument(
         "--enable-search",
@@ -343,7 +1009,7 @@ def main() -> None:
         orchestrator = build_orchestrator(args)
         goal = args.goal
         scenario_id = args.scenario_id or "cli"
-        if orchestrator.optimizer_enabled:
+        if orchestrator.should_optimize(goal):
             try:
                 optimized = orchestrator.optimize_prompt(
                     prompt=args.goal,
@@ -372,6 +1038,12 @@ def main() -> None:
             print(result["response"])
             print("")
         print(json.dumps(result, ensure_ascii=False, indent=2))
+        if args.trace_output and result.get("trace_id"):
+            tracer = orchestrator.get_trace(str(result["trace_id"]))
+            if tracer is not None:
+                with open(args.trace_output, "w", encoding="utf-8") as fp:
+                    json.dump(tracer.export(args.trace_format), fp)
+                print(f"[Trace] {args.trace_output} ({args.trace_format})", flush=True)
 
         """
         tasks = result["tasks"]
@@ -413,7 +1085,7 @@ def main() -> None:
         print(optimized["optimized_prompt"])
         return
 
-    app.state.orchestrator = build_orchestrator(args)
+    app.state.config = args
     uvicorn.run(app, host=args.host, port=args.port, reload=args.reload)
 
 
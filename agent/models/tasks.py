@@ -1,6 +1,6 @@
 import re
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 
 @dataclass
@@ -27,12 +27,27 @@ class ExecutionOutput:
     review: Optional["TaskReview"] = None
 
 
+SEVERITY_LEVELS = ("low", "medium", "high", "critical")
+
+
+@dataclass
+class TaskIssue:
+    """Critic findings attributed to one task (by id or by one of its file paths)."""
+
+    task_id: int
+    severity: str = "medium"
+    files: List[str] = field(default_factory=list)
+    problems: List[str] = field(default_factory=list)
+    recommendations: List[str] = field(default_factory=list)
+
+
 @dataclass
 class CriticFeedback:
     score: int
     problems: List[str] = field(default_factory=list)
     recommendations: List[str] = field(default_factory=list)
     raw: Dict[str, Any] = field(default_factory=dict)
+    task_issues: List[TaskIssue] = field(default_factory=list)
 
 
 @dataclass
@@ -126,7 +141,172 @@ def parse_critic_feedback(raw: Dict[str, Any]) -> CriticFeedback:
     recommendations = raw.get("recommendations") or raw.get("suggestions") or []
     problems_list = [str(item) for item in problems] if isinstance(problems, list) else [str(problems)]
     rec_list = [str(item) for item in recommendations] if isinstance(recommendations, list) else [str(recommendations)]
-    return CriticFeedback(score=score, problems=problems_list, recommendations=rec_list, raw=raw)
+    return CriticFeedback(
+        score=score,
+        problems=problems_list,
+        recommendations=rec_list,
+        raw=raw,
+        task_issues=_parse_task_issues(raw.get("tasks") or raw.get("task_issues")),
+    )
+
+
+def normalize_severity(value: Any, default: str = "medium") -> str:
+    label = str(value or "").strip().lower()
+    aliases = {
+        "faible": "low",
+        "mineur": "low",
+        "minor": "low",
+        "moyen": "medium",
+        "moyenne": "medium",
+        "moderate": "medium",
+        "haute": "high",
+        "elevee": "high",
+        "majeur": "high",
+        "major": "high",
+        "critique": "critical",
+        "bloquant": "critical",
+        "blocker": "critical",
+    }
+    label = aliases.get(label, label)
+    return label if label in SEVERITY_LEVELS else default
+
+
+def severity_rank(severity: str) -> int:
+    return SEVERITY_LEVELS.index(normalize_severity(severity))
+
+
+def _parse_task_issues(raw_issues: Any) -> List[TaskIssue]:
+    issues: List[TaskIssue] = []
+    if not isinstance(raw_issues, list):
+        return issues
+    for item in raw_issues:
+        if not isinstance(item, dict):
+            continue
+        try:
+            task_id = int(item.get("task_id", item.get("id")))
+        except Exception:
+            continue
+        files = item.get("files") or []
+        problems = item.get("problems") or []
+        recommendations = item.get("recommendations") or []
+        issues.append(
+            TaskIssue(
+                task_id=task_id,
+                severity=normalize_severity(item.get("severity"), "high" if problems else "medium"),
+                files=[str(path) for path in files] if isinstance(files, list) else [str(files)],
+                problems=[str(p) for p in problems] if isinstance(problems, list) else [str(problems)],
+                recommendations=(
+                    [str(r) for r in recommendations] if isinstance(recommendations, list) else [str(recommendations)]
+                ),
+            )
+        )
+    return issues
+
+
+_TASK_REFERENCE = re.compile(r"(?:\bt[aâ]che|\btask)\s*(?:n[°o]\s*)?#?\s*(\d+)|#(\d+)\b", re.IGNORECASE)
+
+
+def attribute_feedback(
+    feedback: CriticFeedback,
+    task_results: List[Dict[str, Any]],
+) -> Tuple[Dict[int, TaskIssue], List[str], List[str]]:
+    """
+    Map critic findings to tasks. Structured `task_issues` from the critic are used as-is;
+    free-form problems/recommendations are attributed to every task whose id ("tache 2", "#2")
+    or file path (full path or file name) they mention.
+    Returns (issues by task id, unattributed problems, unattributed recommendations).
+    """
+    files_by_task: Dict[int, List[str]] = {}
+    for item in task_results:
+        task_data = item.get("task") or {}
+        try:
+            task_id = int(task_data.get("id"))
+        except Exception:
+            continue
+        execution = item.get("execution") or {}
+        files_by_task[task_id] = [
+            str(f.get("path")) for f in execution.get("files") or [] if isinstance(f, dict) and f.get("path")
+        ]
+
+    issues: Dict[int, TaskIssue] = {}
+
+    def issue_for(task_id: int) -> TaskIssue:
+        if task_id not in issues:
+            issues[task_id] = TaskIssue(task_id=task_id, severity="low", files=[])
+        return issues[task_id]
+
+    for structured in feedback.task_issues:
+        if structured.task_id not in files_by_task:
+            continue
+        issue = issue_for(structured.task_id)
+        issue.problems.extend(structured.problems)
+        issue.recommendations.extend(structured.recommendations)
+        issue.files.extend(path for path in structured.files if path not in issue.files)
+        if severity_rank(structured.severity) > severity_rank(issue.severity):
+            issue.severity = structured.severity
+
+    def mentioned_tasks(text: str) -> Dict[int, List[str]]:
+        found: Dict[int, List[str]] = {}
+        for match in _TASK_REFERENCE.finditer(text):
+            task_id = int(match.group(1) or match.group(2))
+            if task_id in files_by_task:
+                found.setdefault(task_id, [])
+        for task_id, paths in files_by_task.items():
+            for path in paths:
+                name = path.replace("\\", "/").rsplit("/", 1)[-1]
+                candidates = {path, name} if "." in name and len(name) >= 3 else {path}
+                if any(re.search(rf"(?<![\w/.-]){re.escape(c)}(?![\w-])", text) for c in candidates):
+                    found.setdefault(task_id, []).append(path)
+        return found
+
+    unattributed_problems: List[str] = []
+    unattributed_recommendations: List[str] = []
+    for kind, items, leftovers, severity in (
+        ("problems", feedback.problems, unattributed_problems, "high"),
+        ("recommendations", feedback.recommendations, unattributed_recommendations, "medium"),
+    ):
+        for text in items:
+            targets = mentioned_tasks(text)
+            if not targets:
+                leftovers.append(text)
+                continue
+            for task_id, paths in targets.items():
+                issue = issue_for(task_id)
+                entries = issue.problems if kind == "problems" else issue.recommendations
+                if text not in entries:
+                    entries.append(text)
+                issue.files.extend(path for path in paths if path not in issue.files)
+                if severity_rank(severity) > severity_rank(issue.severity):
+                    issue.severity = severity
+
+    return issues, unattributed_problems, unattributed_recommendations
+
+
+def feedback_for_task(
+    feedback: CriticFeedback,
+    issue: TaskIssue,
+    extra_problems: Optional[List[str]] = None,
+    extra_recommendations: Optional[List[str]] = None,
+) -> CriticFeedback:
+    """Critic feedback narrowed to one task, as sent to the self-correction agent."""
+    problems = issue.problems + [p for p in extra_problems or [] if p not in issue.problems]
+    recommendations = issue.recommendations + [
+        r for r in extra_recommendations or [] if r not in issue.recommendations
+    ]
+    raw = {
+        "score": feedback.score,
+        "severity": issue.severity,
+        "files": issue.files,
+        "problems": problems,
+        "recommendations": recommendations,
+    }
+    return CriticFeedback(
+        score=feedback.score,
+        problems=problems,
+        recommendations=recommendations,
+        raw=raw,
+        task_issues=[issue],
+    )
 
 
 def parse_task_review(raw: Any) -> Optional[TaskReview]:
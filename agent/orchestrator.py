@@ -1,5 +1,8 @@
-import concurrent.futures
-from typing import Dict, List, Optional, Set
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
 
 from agents.critic import Critic
 from agents.executor import Executor
@@ -9,11 +12,40 @@ from agents.prompt_optimizer import PromptOptimizer
 from agents.responder import Responder
 from agents.searcher import Searcher
 from agents.self_correction import SelfCorrection
+from clients.model_scheduler import ModelScheduler
 from clients.ollama_client import OllamaClient
 from clients.search_client import WebSearchClient
-from models.tasks import CriticFeedback, ExecutionOutput, FileEdit, Task, TaskReview, parse_task_review
+from models.tasks import (
+    CriticFeedback,
+    ExecutionOutput,
+    FileEdit,
+    Task,
+    TaskReview,
+    attribute_feedback,
+    feedback_for_task,
+    parse_task_review,
+    severity_rank,
+)
+from utils.context_assembly import ContextAssembler, PreparedContext
 from utils.cost_logger import CostLogger
+from utils.file_diff import diff_task_results
 from utils.memory import MemoryStore
+from utils.metrics import RUN_DURATION, RUNS_IN_FLIGHT, RUNS_TOTAL, STAGE_POOL_IN_USE, STAGE_POOL_WAITING
+from utils.response_cache import ResponseCache
+from utils.run_context import (
+    RUN_ABORTED,
+    RunBudgetExceeded,
+    RunCancelled,
+    RunContext,
+    RunDeadlineExceeded,
+    RunIdInUse,
+    current_run,
+    current_scenario_id,
+    run_scope,
+)
+from utils.tracing import Tracer, activate, deactivate, record_span, span
+
+RunEventHandler = Callable[[Dict[str, object]], None]
 
 
 def _serialize_execution_output(output: ExecutionOutput) -> Dict[str, object]:
@@ -58,20 +90,50 @@ class Orchestrator:
         optimizer_enabled: bool = True,
         response_model: str = "gemma3:4b",
         max_workers: int = 2,
+        correction_min_severity: str = "low",
+        incremental_critic: bool = True,
+        optimizer_min_chars: int = 0,
+        skip_correction_score: int = 0,
+        use_responder: bool = True,
+        context_text_tokens: int = 1500,
+        context_code_tokens: int = 3000,
         verbose: bool = True,
         memory_store: MemoryStore | None = None,
         memory_enabled: bool = True,
         enable_search: bool = False,
         search_timeout: int = 30,
         costs_path: str = "costs.csv",
+        async_cost_accounting: bool = True,
+        costs_batch_size: int = 64,
+        costs_flush_interval: float = 1.0,
+        costs_rotate_bytes: int = 0,
+        costs_rotate_daily: bool = False,
+        costs_backend: str = "csv",
         ollama_timeout: int = 300,
+        ollama_max_connections: int = 8,
+        response_cache: ResponseCache | None = None,
+        model_scheduler: ModelScheduler | None = None,
+        trace_history: int = 20,
+        run_timeout: float = 0.0,
+        run_token_budget: int = 0,
     ) -> None:
-        self.cost_logger = CostLogger(path=costs_path)
+        self.cost_logger = CostLogger(
+            path=costs_path,
+            async_accounting=async_cost_accounting,
+            batch_size=costs_batch_size,
+            flush_interval=costs_flush_interval,
+            rotate_bytes=costs_rotate_bytes,
+            rotate_daily=costs_rotate_daily,
+            backend=costs_backend,
+        )
         client = OllamaClient(
             base_url=ollama_base_url,
             timeout=ollama_timeout,
             cost_logger=self.cost_logger,
             costs_path=costs_path,
+            max_connections=ollama_max_connections,
+            response_cache=response_cache,
+            scheduler=model_scheduler,
         )
         self.client = client
         self.planner = Planner(client=client, model=planner_model)
@@ -83,11 +145,30 @@ class Orchestrator:
         self.prompt_optimizer = PromptOptimizer(client=client, model=optimizer_model) if optimizer_enabled else None
         self.responder = Responder(client=client, model=response_model)
         self.max_workers = max(1, max_workers)
+        # Executor prompt budget, measured with the tokenizer used for cost tracking.
+        self.context_assembler = ContextAssembler(
+            count_tokens=lambda text: self.cost_logger.count_tokens(self.executor.model, text),
+            text_budget=context_text_tokens,
+            code_budget=context_code_tokens,
+        )
+        self.correction_min_severity = correction_min_severity
+        self.incremental_critic = incremental_critic
+        # Fast path: each short circuit is disabled at its default value.
+        self.optimizer_min_chars = max(0, optimizer_min_chars)
+        self.skip_correction_score = skip_correction_score
+        self.use_responder = use_responder
         self.verbose = verbose
         self.memory_enabled = memory_enabled
         self.memory = memory_store or (MemoryStore() if memory_enabled else None)
         self.searcher = Searcher(client=WebSearchClient(timeout=search_timeout)) if enable_search else None
-        self.current_scenario_id = "unknown"
+        # Per-run defaults; the run state itself lives in a RunContext (utils.run_context).
+        self.run_timeout = max(0.0, run_timeout)
+        self.run_token_budget = max(0, run_token_budget)
+        # Traces of the most recent runs (0 disables tracing).
+        self.trace_history = max(0, trace_history)
+        self.traces: "OrderedDict[str, Tracer]" = OrderedDict()
+        # Runs in progress by run_id, for `cancel_run`.
+        self.active_runs: Dict[str, RunContext] = {}
 
     def run(
         self,
@@ -101,10 +182,184 @@ class Orchestrator:
         search_query: str | None = None,
         search_results_limit: int = 5,
         scenario_id: Optional[str] = None,
+        on_event: Optional[RunEventHandler] = None,
+        use_responder: Optional[bool] = None,
+        timeout: Optional[float] = None,
+        token_budget: Optional[int] = None,
+        run_id: Optional[str] = None,
+    ) -> Dict[str, object]:
+        """
+        Synchronous entry point (CLI, scripts): runs `arun` on a private event loop.
+        Must not be called from a running event loop; use `await arun(...)` there.
+        """
+
+        async def _main() -> Dict[str, object]:
+            try:
+                return await self.arun(
+                    goal=goal,
+                    context=context,
+                    constraints=constraints,
+                    use_memory=use_memory,
+                    history=history,
+                    conversation_id=conversation_id,
+                    enable_search=enable_search,
+                    search_query=search_query,
+                    search_results_limit=search_results_limit,
+                    scenario_id=scenario_id,
+                    on_event=on_event,
+                    use_responder=use_responder,
+                    timeout=timeout,
+                    token_budget=token_budget,
+                    run_id=run_id,
+                )
+            finally:
+                await self.client.aclose()
+
+        return asyncio.run(_main())
+
+    async def arun(
+        self,
+        goal: str,
+        context: str = "",
+        constraints: str = "",
+        use_memory: bool = True,
+        history: List[dict] | None = None,
+        conversation_id: str | None = None,
+        enable_search: bool = False,
+        search_query: str | None = None,
+        search_results_limit: int = 5,
+        scenario_id: Optional[str] = None,
+        on_event: Optional[RunEventHandler] = None,
+        use_responder: Optional[bool] = None,
+        timeout: Optional[float] = None,
+        token_budget: Optional[int] = None,
+        run_id: Optional[str] = None,
+    ) -> Dict[str, object]:
+        """
+        Run the full pipeline on the current event loop. Model calls go through the pooled async
+        Ollama client, so concurrent runs multiplex on one loop instead of holding threads.
+        When `on_event` is given it receives progress events as they happen:
+        `{"type": "stage", "stage": ..., "status": "start" | "end"}` and, for the planner, executor
+        and responder, `{"type": "token", "stage": ..., "text": ...}` chunks streamed from Ollama.
+        `use_responder=False` (or the server default) builds the final Markdown deterministically
+        instead of calling the Responder model.
+        Each run is traced (see `trace_history`): the result carries its `trace_id`, and the spans
+        are available through `get_trace`.
+        The run's scenario, trace, deadline (`timeout` seconds) and token budget are held in a
+        RunContext scoped to this call, never on the shared orchestrator or client; model calls
+        are refused once the deadline or the budget is exceeded (defaults: `run_timeout`,
+        `run_token_budget`, 0 = none).
+        The pipeline runs in a child task bound to the RunContext: when the deadline passes or
+        `cancel_run(run_id)` is called, that task is cancelled, in-flight Ollama requests
+        included, and RunDeadlineExceeded / RunCancelled is raised. Cancelling the caller's task
+        cancels the pipeline as well. The first event sent to `on_event` carries the `run_id`.
+        """
+        if run_id and run_id in self.active_runs:
+            # Before the tracer is created and stored: a refused call leaves no trace behind.
+            raise RunIdInUse(f"Un run avec l'identifiant {run_id} est deja en cours.")
+        scenario_label = self._normalize_scenario_id(scenario_id or conversation_id)
+        tracer: Optional[Tracer] = None
+        if self.trace_history:
+            tracer = Tracer("run", scenario_id=scenario_label, conversation_id=conversation_id or "")
+            self._store_trace(tracer)
+        run = RunContext.create(
+            scenario_id=scenario_label,
+            conversation_id=conversation_id or "",
+            tracer=tracer,
+            timeout=self.run_timeout if timeout is None else timeout,
+            token_budget=self.run_token_budget if token_budget is None else token_budget,
+            run_id=run_id,
+        )
+        self.active_runs[run.run_id] = run
+        token = activate(tracer)
+        RUNS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        status = "error"
+        watchdog: Optional[asyncio.TimerHandle] = None
+        try:
+            with run_scope(run), span("run", goal_chars=len(goal or "")):
+                self._emit(on_event, {"type": "run", "run_id": run.run_id})
+                # Child task (inherits the run scope and the span) so the deadline and
+                # `cancel_run` can abort it without cancelling the caller.
+                pipeline = asyncio.ensure_future(
+                    self._arun(
+                        goal, context, constraints, use_memory, history, conversation_id, enable_search,
+                        search_query, search_results_limit, scenario_label, on_event, use_responder,
+                    )
+                )
+                run.bind(pipeline)
+                remaining = run.remaining()
+                if remaining is not None:
+                    watchdog = asyncio.get_running_loop().call_later(remaining, run.cancel, "deadline")
+                try:
+                    result = await pipeline
+                except asyncio.CancelledError:
+                    if run.cancel_reason and not self._caller_cancelled():
+                        raise run.abort_error() from None
+                    # The caller went away: refuse the model calls of threads still running.
+                    run.cancel()
+                    raise
+            if tracer is not None:
+                result["trace_id"] = tracer.trace_id
+            result["run_id"] = run.run_id
+            result["tokens_used"] = run.tokens_used
+            status = "success"
+            return result
+        except RunDeadlineExceeded:
+            status = "deadline"
+            raise
+        except RunBudgetExceeded:
+            status = "budget"
+            raise
+        except (asyncio.CancelledError, RunCancelled):
+            status = "cancelled"
+            raise
+        finally:
+            if watchdog is not None:
+                watchdog.cancel()
+            self.active_runs.pop(run.run_id, None)
+            RUNS_IN_FLIGHT.dec()
+            RUNS_TOTAL.inc(status=status)
+            RUN_DURATION.observe(time.perf_counter() - started)
+            deactivate(token)
+
+    def cancel_run(self, run_id: str) -> bool:
+        """Cancel a run in progress (thread-safe); False when no such run is running."""
+        run = self.active_runs.get(run_id)
+        if run is None:
+            return False
+        run.cancel()
+        return True
+
+    @staticmethod
+    def _caller_cancelled() -> bool:
+        """True when the task awaiting the run was itself cancelled (not only the pipeline)."""
+        task = asyncio.current_task()
+        cancelling = getattr(task, "cancelling", None)
+        return bool(cancelling and cancelling())
+
+    def _checkpoint(self) -> None:
+        """Between stages: stop once the run is cancelled, past its deadline or out of budget."""
+        run = current_run()
+        if run is not None:
+            run.check()
+
+    async def _arun(
+        self,
+        goal: str,
+        context: str,
+        constraints: str,
+        use_memory: bool,
+        history: List[dict] | None,
+        conversation_id: str | None,
+        enable_search: bool,
+        search_query: str | None,
+        search_results_limit: int,
+        scenario_id: Optional[str],
+        on_event: Optional[RunEventHandler],
+        use_responder: Optional[bool],
     ) -> Dict[str, object]:
         scenario_label = self._normalize_scenario_id(scenario_id or conversation_id)
-        self.current_scenario_id = scenario_label
-        self.client.set_default_scenario(scenario_label)
         base_context = context or ""
         formatted_history = ""
         if history:
@@ -129,174 +384,203 @@ class Orchestrator:
         search_results: list[dict] = []
 
         if enable_search and self.searcher:
-            search_text = search_query or goal
-            try:
-                search_payload = self.searcher.search(search_text, max_results=search_results_limit)
-                search_results = search_payload["results"]
-                if search_payload["context"]:
-                    context_used = "\n\n".join(
-                        part for part in [context_used, f"Resultats de recherche Web:\n{search_payload['context']}"] if part
-                    ).strip()
-            except Exception as exc:  # pragma: no cover - defensive
-                self._log(f"[Search] Echec recherche web: {exc}")
+            with span("search"):
+                search_text = search_query or goal
+                try:
+                    search_payload = await asyncio.to_thread(
+                        self.searcher.search,
+                        search_text,
+                        max_results=search_results_limit,
+                    )
+                    search_results = search_payload["results"]
+                    if search_payload["context"]:
+                        context_used = "\n\n".join(
+                            part for part in [context_used, f"Resultats de recherche Web:\n{search_payload['context']}"] if part
+                        ).strip()
+                except Exception as exc:  # pragma: no cover - defensive
+                    self._log(f"[Search] Echec recherche web: {exc}")
 
         if use_memory and self.memory_enabled and self.memory:
-            try:
-                context_used, memory_context, memory_entries = self.memory.build_context(
-                    goal=goal,
-                    context=context_used,
-                    history=history or [],
-                    conversation_id=conversation_id,
-                )
+            with span("memory.recall"):
+                try:
+                    # Off the event loop: semantic recall embeds the query through Ollama.
+                    context_used, memory_context, memory_entries = await asyncio.to_thread(
+                        self.memory.build_context,
+                        goal=goal,
+                        context=context_used,
+                        history=history or [],
+                        conversation_id=conversation_id,
+                    )
 
-                if memory_entries:
-                    self._log(f"[Memory] {len(memory_entries)} rappel(s) ajoutes au contexte.")
-            except Exception as exc:  # pragma: no cover - defensive
-                self._log(f"[Memory] Echec enrichissement contexte: {exc}")
-                context_used = base_context
-                memory_context = ""
+                    if memory_entries:
+                        self._log(f"[Memory] {len(memory_entries)} rappel(s) ajoutes au contexte.")
+                except Exception as exc:  # pragma: no cover - defensive
+                    self._log(f"[Memory] Echec enrichissement contexte: {exc}")
+                    context_used = base_context
+                    memory_context = ""
         else:
             # Pas de memoire active -> ne pas polluer la reponse finale avec des traces de memoire.
             context_used = response_context
 
+        self._checkpoint()
         self._log(f"[Planner] Goal: {goal}")
-        tasks = self.planner.plan(
-            goal=goal,
-            context=context_used,
-            constraints=constraints,
-            scenario_id=scenario_label,
-        )
-        self._log(f"[Planner] {len(tasks)} task(s) generated.")
+        with span("planner"):
+            self._emit(on_event, {"type": "stage", "stage": "planner", "status": "start"})
+            tasks = await self.planner.aplan(
+                goal=goal,
+                context=context_used,
+                constraints=constraints,
+                scenario_id=scenario_label,
+                on_token=self._token_handler(on_event, "planner"),
+            )
+            self._log(f"[Planner] {len(tasks)} task(s) generated.")
+            self._emit(on_event, {"type": "stage", "stage": "planner", "status": "end", "tasks": len(tasks)})
         tasks_by_id: Dict[int, Task] = {task.id: task for task in tasks}
-        remaining_ids: Set[int] = set(tasks_by_id.keys())
-        completed: Set[int] = set()
-        results: List[Dict[str, object]] = []
-        futures: Dict[concurrent.futures.Future, int] = {}
+        stage_pools = self._build_stage_pools()
+        with span("context.prepare"):
+            prepared_context = await asyncio.to_thread(self.context_assembler.prepare, context_used)
 
-        def ready_ids() -> List[int]:
-            return [
-                tid
-                for tid in remaining_ids
-                if set(tasks_by_id[tid].dependencies or []).issubset(completed)
-            ]
-
-        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as pool:
-            while remaining_ids or futures:
-                for tid in ready_ids():
-                    if len(futures) >= self.max_workers:
-                        break
-                    task = tasks_by_id[tid]
-                    future = pool.submit(
-                        self._run_single_task,
-                        task,
-                        context_used,
-                        constraints,
-                        scenario_label,
-                    )
-                    futures[future] = tid
-                    remaining_ids.remove(tid)
-                    self._log(f"[Executor] Scheduled task {tid} ({task.title})")
-
-                if not futures:
-                    break
-
-                done, _ = concurrent.futures.wait(
-                    futures.keys(),
-                    return_when=concurrent.futures.FIRST_COMPLETED,
-                )
+        def execution_failure(task: Task, exc: Exception) -> Dict[str, object]:
+            self._log(f"[Executor] Task {task.id} raised an exception: {exc}")
+            return {
+                "task": task.__dict__,
+                "execution": {
+                    "status": "failure",
+                    "notes": f"Exception during execution: {exc}",
+                    "files": [],
+                },
+            }
 
-                for finished in done:
-                    task_id = futures.pop(finished)
-                    try:
-                        result = finished.result()
-                    except Exception as exc:  # pragma: no cover - defensive
-                        self._log(f"[Executor] Task {task_id} raised an exception: {exc}")
-                        result = {
-                            "task": tasks_by_id[task_id].__dict__,
-                            "execution": {
-                                "status": "failure",
-                                "notes": f"Exception during execution: {exc}",
-                                "files": [],
-                            },
-                        }
-
-                    results.append(result)
-                    completed.add(task_id)
+        with span("executor", tasks=len(tasks_by_id)):
+            results, remaining_ids = await self._run_task_graph(
+                tasks_by_id,
+                lambda task: self._run_single_task(
+                    task, context_used, constraints, scenario_label, on_event, stage_pools, prepared_context
+                ),
+                execution_failure,
+                stage="Executor",
+            )
+        completed = set(tasks_by_id) - remaining_ids
+        self._checkpoint()
 
         results.sort(key=lambda item: item.get("task", {}).get("id", 0))
         unresolved = [tasks_by_id[tid].__dict__ for tid in remaining_ids]
 
-        initial_feedback = self.critic.evaluate_final(
-            goal=goal,
-            context=context_used,
-            constraints=constraints,
-            task_results=results,
-            unresolved_tasks=unresolved,
-            scenario_id=scenario_label,
-        )
-        self._log(f"[Critic] Score initial {initial_feedback.score}")
+        with span("critic"):
+            self._emit(on_event, {"type": "stage", "stage": "critic", "status": "start"})
+            initial_feedback = await self.critic.aevaluate_final(
+                goal=goal,
+                context=context_used,
+                constraints=constraints,
+                task_results=results,
+                unresolved_tasks=unresolved,
+                scenario_id=scenario_label,
+            )
+            self._log(f"[Critic] Score initial {initial_feedback.score}")
+            self._emit(on_event, {"type": "stage", "stage": "critic", "status": "end", "score": initial_feedback.score})
         baseline_feedback = initial_feedback.raw or initial_feedback.__dict__
+        self._checkpoint()
 
         results_corrected = results
         corrections_applied = False
-        if initial_feedback.recommendations or initial_feedback.problems:
+        corrections: Dict[int, CriticFeedback] = {}
+        if self.skip_correction_score and initial_feedback.score >= self.skip_correction_score:
+            self._log(
+                f"[SelfCorrection] Score initial {initial_feedback.score} >= {self.skip_correction_score}, "
+                "corrections ignorees."
+            )
+        elif initial_feedback.recommendations or initial_feedback.problems or initial_feedback.task_issues:
             try:
-                results_corrected, corrections_applied = self._apply_self_corrections(
-                    results,
-                    initial_feedback,
+                corrections = self._plan_corrections(results, initial_feedback)
+                self._log(f"[SelfCorrection] {len(corrections)}/{len(results)} tache(s) ciblee(s) par le critic.")
+            except Exception as exc:  # pragma: no cover - defensive
+                self._log(f"[SelfCorrection] Echec du ciblage des corrections: {exc}")
+        if corrections:
+            with span("self_correction", tasks=len(corrections)):
+                self._emit(
+                    on_event,
+                    {"type": "stage", "stage": "self_correction", "status": "start", "tasks": sorted(corrections)},
+                )
+                try:
+                    results_corrected, corrections_applied = await self._apply_self_corrections(
+                        results,
+                        corrections,
+                        context_used,
+                        constraints,
+                        scenario_label,
+                        on_event,
+                        stage_pools,
+                    )
+                    if corrections_applied:
+                        results_corrected.sort(key=lambda item: item.get("task", {}).get("id", 0))
+                        self._log("[SelfCorrection] Corrections appliquees suite aux recommandations du critic.")
+                except RUN_ABORTED:
+                    raise
+                except Exception as exc:  # pragma: no cover - defensive
+                    self._log(f"[SelfCorrection] Echec des corrections: {exc}")
+                self._emit(
+                    on_event,
+                    {"type": "stage", "stage": "self_correction", "status": "end", "applied": corrections_applied},
+                )
+
+        final_feedback = initial_feedback
+        if corrections_applied:
+            with span("critic.final", incremental=self.incremental_critic):
+                final_feedback = await self._reevaluate(
+                    goal,
                     context_used,
                     constraints,
+                    results,
+                    results_corrected,
+                    unresolved,
+                    initial_feedback,
+                    baseline_feedback,
                     scenario_label,
                 )
-                if corrections_applied:
-                    results_corrected.sort(key=lambda item: item.get("task", {}).get("id", 0))
-                    self._log("[SelfCorrection] Corrections appliquees suite aux recommandations du critic.")
-            except Exception as exc:  # pragma: no cover - defensive
-                self._log(f"[SelfCorrection] Echec des corrections: {exc}")
-
-        final_feedback = (
-            initial_feedback
-            if not corrections_applied
-            else self.critic.evaluate_final(
-                goal=goal,
-                context=context_used,
-                constraints=constraints,
-                task_results=results_corrected,
-                unresolved_tasks=unresolved,
-                baseline_feedback=baseline_feedback,
-                scenario_id=scenario_label,
-            )
-        )
         self._log(f"[Critic] Score final {final_feedback.score}")
         final_feedback_data = _serialize_feedback(final_feedback)
 
-        response = self._build_final_response(
-            goal=goal,
-            # Le contexte pour la reponse finale ne doit pas inclure le texte d'enrichissement memoire,
-            # sinon le modele a tendance a dupliquer ou paraphraser ces traces.
-            context=response_context,
-            tasks=results_corrected,
-            unresolved_tasks=unresolved,
-            final_critic=final_feedback_data,
-            scenario_id=scenario_label,
-        )
-
-        if use_memory and self.memory_enabled and self.memory:
-            try:
-                self.memory.remember_run(
+        self._checkpoint()
+        responder_enabled = self.use_responder if use_responder is None else use_responder
+        with span("responder", model_call=bool(responder_enabled)):
+            self._emit(on_event, {"type": "stage", "stage": "responder", "status": "start"})
+            if responder_enabled:
+                response = await self._build_final_response(
                     goal=goal,
-                    context=base_context,
-                    context_used=context_used,
-                    constraints=constraints,
+                    # Le contexte pour la reponse finale ne doit pas inclure le texte d'enrichissement memoire,
+                    # sinon le modele a tendance a dupliquer ou paraphraser ces traces.
+                    context=response_context,
                     tasks=results_corrected,
-                    unresolved=unresolved,
+                    unresolved_tasks=unresolved,
                     final_critic=final_feedback_data,
-                    response=response,
-                    history=history or [],
-                    conversation_id=conversation_id,
+                    scenario_id=scenario_label,
+                    on_token=self._token_handler(on_event, "responder"),
                 )
-            except Exception as exc:  # pragma: no cover - defensive
-                self._log(f"[Memory] Echec enregistrement memoire: {exc}")
+            else:
+                self._log("[Responder] Reponse deterministe (fast path), pas d'appel au modele.")
+                response = self._fallback_response(
+                    goal, response_context, results_corrected, unresolved, final_feedback_data
+                )
+            self._emit(on_event, {"type": "stage", "stage": "responder", "status": "end"})
+
+        if use_memory and self.memory_enabled and self.memory:
+            with span("memory.persist"):
+                try:
+                    await asyncio.to_thread(
+                        self.memory.remember_run,
+                        goal=goal,
+                        context=base_context,
+                        context_used=context_used,
+                        constraints=constraints,
+                        tasks=results_corrected,
+                        unresolved=unresolved,
+                        final_critic=final_feedback_data,
+                        response=response,
+                        history=history or [],
+                        conversation_id=conversation_id,
+                    )
+                except Exception as exc:  # pragma: no cover - defensive
+                    self._log(f"[Memory] Echec enregistrement memoire: {exc}")
 
         return {
             "goal": goal,
@@ -312,95 +596,370 @@ class Orchestrator:
             "response": response,
         }
 
+    async def _reevaluate(
+        self,
+        goal: str,
+        context: str,
+        constraints: str,
+        results_before: List[Dict[str, object]],
+        results_after: List[Dict[str, object]],
+        unresolved: List[Dict[str, object]],
+        initial_feedback: CriticFeedback,
+        baseline_feedback: Dict[str, object],
+        scenario_id: str,
+    ) -> CriticFeedback:
+        """
+        Second critic pass after self-correction. In incremental mode the critic only receives
+        its baseline feedback and the diffs of the corrected files, so the prompt grows with the
+        size of the change rather than with the whole run.
+        """
+        if not self.incremental_critic:
+            return await self.critic.aevaluate_final(
+                goal=goal,
+                context=context,
+                constraints=constraints,
+                task_results=results_after,
+                unresolved_tasks=unresolved,
+                baseline_feedback=baseline_feedback,
+                scenario_id=scenario_id,
+            )
+        changes = diff_task_results(results_before, results_after)
+        if not changes:
+            # Seules les revues ont change : le code evalue est identique.
+            return initial_feedback
+        self._log(f"[Critic] Re-evaluation incrementale sur {len(changes)} tache(s) corrigee(s).")
+        return await self.critic.aevaluate_incremental(
+            goal=goal,
+            constraints=constraints,
+            baseline_feedback=baseline_feedback,
+            changes=changes,
+            scenario_id=scenario_id,
+        )
+
+    def get_trace(self, trace_id: str) -> Optional[Tracer]:
+        return self.traces.get(trace_id)
+
+    def list_traces(self) -> List[Dict[str, object]]:
+        """Summaries of the retained traces, most recent first."""
+        return [tracer.summary() for tracer in reversed(list(self.traces.values()))]
+
+    def _store_trace(self, tracer: Tracer) -> None:
+        self.traces[tracer.trace_id] = tracer
+        while len(self.traces) > self.trace_history:
+            self.traces.popitem(last=False)
+
+    def should_optimize(self, goal: str) -> bool:
+        """Whether the prompt optimizer should run for this goal (fast path skips short goals)."""
+        return self.optimizer_enabled and len((goal or "").strip()) >= self.optimizer_min_chars
+
     def optimize_prompt(self, prompt: str, context: str = "", scenario_id: Optional[str] = None) -> Dict[str, str]:
         if not self.optimizer_enabled or not self.prompt_optimizer:
             return {"optimized_prompt": prompt, "raw": prompt}
-        scenario_label = self._normalize_scenario_id(scenario_id or self.current_scenario_id)
+        scenario_label = self._normalize_scenario_id(scenario_id or current_scenario_id())
         optimized, raw = self.prompt_optimizer.optimize(prompt=prompt, context=context, scenario_id=scenario_label)
         return {"optimized_prompt": optimized, "raw": raw}
 
-    def _run_single_task(self, task: Task, context: str, constraints: str, scenario_id: str) -> Dict[str, object]:
-        self._log(f"[Executor] Running task {task.id}: {task.title}")
-        exec_output = self.executor.execute(
-            task=task,
-            project_context=context,
-            existing_code=context,
-            constraints=constraints,
-            scenario_id=scenario_id,
-        )
-        exec_output.review = self.reviewer.review(
-            task=task,
-            execution=exec_output,
-            context=context,
-            constraints=constraints,
-            scenario_id=scenario_id,
-        )
+    async def aoptimize_prompt(
+        self,
+        prompt: str,
+        context: str = "",
+        scenario_id: Optional[str] = None,
+    ) -> Dict[str, str]:
+        if not self.optimizer_enabled or not self.prompt_optimizer:
+            return {"optimized_prompt": prompt, "raw": prompt}
+        scenario_label = self._normalize_scenario_id(scenario_id or current_scenario_id())
+        optimized, raw = await self.prompt_optimizer.aoptimize(prompt=prompt, context=context, scenario_id=scenario_label)
+        return {"optimized_prompt": optimized, "raw": raw}
+
+    async def _run_task_graph(
+        self,
+        tasks_by_id: Dict[int, Task],
+        run_task: Callable[[Task], Awaitable[Dict[str, object]]],
+        on_error: Callable[[Task, Exception], Dict[str, object]],
+        stage: str,
+        external_done: Set[int] | None = None,
+        span_name: str = "",
+    ) -> Tuple[List[Dict[str, object]], Set[int]]:
+        """
+        Start `run_task` for every task as soon as its dependencies have finished and return
+        (results, ids never started). Dependencies listed in `external_done` count as satisfied.
+        Every ready task is started at once: the per-model stage pools acquired inside `run_task`
+        bound how many model calls actually run, so a task whose execution finished goes straight
+        to review while the next task's executor takes the freed slot.
+        Each task runs in a `<span_name>.task` span whose `queue.task` child is the delay between
+        scheduling and start.
+        """
+        remaining_ids: Set[int] = set(tasks_by_id.keys())
+        completed: Set[int] = set(external_done or ())
+        results: List[Dict[str, object]] = []
+        running: Dict[asyncio.Task, int] = {}
+
+        async def traced(task: Task, scheduled_ns: int) -> Dict[str, object]:
+            with span(f"{span_name or stage.lower()}.task", task_id=task.id, title=task.title):
+                record_span("queue.task", scheduled_ns, time.time_ns(), task_id=task.id)
+                return await run_task(task)
+
+        def ready_ids() -> List[int]:
+            return [
+                tid
+                for tid in sorted(remaining_ids)
+                if set(tasks_by_id[tid].dependencies or []).issubset(completed)
+            ]
+
+        try:
+            while remaining_ids or running:
+                for tid in ready_ids():
+                    task = tasks_by_id[tid]
+                    running[asyncio.create_task(traced(task, time.time_ns()))] = tid
+                    remaining_ids.remove(tid)
+                    self._log(f"[{stage}] Scheduled task {tid} ({task.title})")
+
+                if not running:
+                    break
+
+                done, _ = await asyncio.wait(running.keys(), return_when=asyncio.FIRST_COMPLETED)
+
+                for finished in done:
+                    task_id = running.pop(finished)
+                    try:
+                        results.append(finished.result())
+                    except RUN_ABORTED:
+                        # The run is over: do not start dependent tasks only to have them refused.
+                        raise
+                    except Exception as exc:  # pragma: no cover - defensive
+                        results.append(on_error(tasks_by_id[task_id], exc))
+                    completed.add(task_id)
+        finally:
+            for job in running:
+                job.cancel()
+
+        return results, remaining_ids
+
+    async def _run_single_task(
+        self,
+        task: Task,
+        context: str,
+        constraints: str,
+        scenario_id: str,
+        on_event: Optional[RunEventHandler] = None,
+        stage_pools: Optional[Dict[str, asyncio.Semaphore]] = None,
+        prepared_context: Optional[PreparedContext] = None,
+    ) -> Dict[str, object]:
+        pools = stage_pools or self._build_stage_pools()
+        prepared = prepared_context or self.context_assembler.prepare(context)
+        # Prose and code parts of the context each get their own token budget.
+        assembled = self.context_assembler.assemble(prepared, task)
+        if assembled.dropped_blocks or assembled.truncated:
+            self._log(
+                f"[Executor] Contexte de la tache {task.id} reduit: {assembled.text_tokens} tokens texte, "
+                f"{assembled.code_tokens} tokens code, {assembled.dropped_blocks} bloc(s) ecarte(s)."
+            )
+        async with self._stage_slot(pools, self.executor.model):
+            self._log(f"[Executor] Running task {task.id}: {task.title}")
+            self._emit(on_event, {"type": "stage", "stage": "executor", "status": "start", "task_id": task.id})
+            exec_output = await self.executor.aexecute(
+                task=task,
+                project_context=assembled.project_context,
+                existing_code=assembled.existing_code,
+                constraints=constraints,
+                scenario_id=scenario_id,
+                on_token=self._token_handler(on_event, "executor", task_id=task.id),
+            )
+            self._emit(
+                on_event,
+                {"type": "stage", "stage": "executor", "status": "end", "task_id": task.id, "result": exec_output.status},
+            )
+        async with self._stage_slot(pools, self.reviewer.model):
+            self._emit(on_event, {"type": "stage", "stage": "reviewer", "status": "start", "task_id": task.id})
+            exec_output.review = await self.reviewer.areview(
+                task=task,
+                execution=exec_output,
+                context=context,
+                constraints=constraints,
+                scenario_id=scenario_id,
+            )
+            self._emit(on_event, {"type": "stage", "stage": "reviewer", "status": "end", "task_id": task.id})
 
         return {
             "task": task.__dict__,
             "execution": _serialize_execution_output(exec_output),
         }
 
-    def _apply_self_corrections(
+    def _build_stage_pools(self) -> Dict[str, asyncio.Semaphore]:
+        """
+        One worker pool of `max_workers` slots per model used by the execution and correction
+        stages. Stages share a pool only when they run on the same model, so with
+        distinct models both stay busy instead of one task holding a slot for both calls.
+        """
+        pools: Dict[str, asyncio.Semaphore] = {}
+        for model in (self.executor.model, self.reviewer.model, self.self_correction.model):
+            pools.setdefault(model, asyncio.Semaphore(self.max_workers))
+        return pools
+
+    @asynccontextmanager
+    async def _stage_slot(self, pools: Dict[str, asyncio.Semaphore], model: str) -> AsyncIterator[None]:
+        """Acquire the stage pool of `model`, tracing the time spent waiting for a slot."""
+        queued_ns = time.time_ns()
+        STAGE_POOL_WAITING.inc(model=model)
+        try:
+            await pools[model].acquire()
+        finally:
+            STAGE_POOL_WAITING.dec(model=model)
+        STAGE_POOL_IN_USE.inc(model=model)
+        try:
+            record_span("queue.stage_pool", queued_ns, time.time_ns(), model=model)
+            yield
+        finally:
+            STAGE_POOL_IN_USE.dec(model=model)
+            pools[model].release()
+
+    async def _apply_self_corrections(
         self,
         results: List[Dict[str, object]],
-        critic_feedback: CriticFeedback,
+        corrections: Dict[int, CriticFeedback],
         context: str,
         constraints: str,
         scenario_id: str,
+        on_event: Optional[RunEventHandler] = None,
+        stage_pools: Optional[Dict[str, asyncio.Semaphore]] = None,
     ) -> tuple[List[Dict[str, object]], bool]:
-        corrected_results: List[Dict[str, object]] = []
-        changed = False
-
+        """
+        Correct the tasks listed in `corrections` (task id -> feedback narrowed to that task)
+        through the same dependency-aware scheduler as the first pass: independent corrections
+        run concurrently (bounded by the per-model stage pools) and a task is only corrected once
+        the tasks it depends on have been. Other tasks are kept as-is, without re-review.
+        """
+        pools = stage_pools or self._build_stage_pools()
+        items_by_id: Dict[int, Dict[str, object]] = {}
+        tasks_by_id: Dict[int, Task] = {}
+        passthrough: List[Dict[str, object]] = []
         for item in results:
-            task_data = item.get("task") or {}
-            execution_data = item.get("execution") or {}
             try:
-                task_obj = Task(
-                    id=int(task_data.get("id", 0)),
-                    title=str(task_data.get("title", "")),
-                    description=str(task_data.get("description", "")),
-                    input=str(task_data.get("input", "")),
-                    output=str(task_data.get("output", "")),
-                    dependencies=list(task_data.get("dependencies") or []),
-                )
-                exec_output = ExecutionOutput(
-                    status=str(execution_data.get("status", "failure")),
-                    notes=str(execution_data.get("notes", "")),
-                    files=[
-                        FileEdit(path=str(f["path"]), content=str(f["content"]))
-                        for f in execution_data.get("files", [])
-                        if isinstance(f, dict) and "path" in f and "content" in f
-                    ],
-                    review=parse_task_review(execution_data.get("review")) if execution_data.get("review") else None,
-                )
-                corrected_output = self.self_correction.correct(
-                    task_obj,
-                    exec_output,
-                    critic_feedback,
-                    scenario_id=scenario_id,
-                )
-                if corrected_output.status == "success" and corrected_output.files:
-                    corrected_output.review = self.reviewer.review(
-                        task=task_obj,
-                        execution=corrected_output,
-                        context=context,
-                        constraints=constraints,
-                        scenario_id=scenario_id,
-                    )
-                    corrected_serialized = _serialize_execution_output(corrected_output)
-                    changed = changed or corrected_serialized != execution_data
-                    corrected_results.append({"task": task_data, "execution": corrected_serialized})
-                else:
-                    # Ignore empty/failed corrections to keep prior result stable.
-                    corrected_results.append(item)
+                task_obj = self._task_from_result(item)
             except Exception as exc:  # pragma: no cover - defensive
-                self._log(f"[SelfCorrection] Erreur sur la tache {task_data.get('id')}: {exc}")
-                corrected_results.append(item)
+                self._log(f"[SelfCorrection] Tache invalide ignoree: {exc}")
+                passthrough.append(item)
+                continue
+            if task_obj.id in tasks_by_id or task_obj.id not in corrections:
+                passthrough.append(item)
+                continue
+            items_by_id[task_obj.id] = item
+            tasks_by_id[task_obj.id] = task_obj
+
+        external_done = {
+            dep for task in tasks_by_id.values() for dep in (task.dependencies or []) if dep not in tasks_by_id
+        }
+        changed_ids: Set[int] = set()
 
-        return corrected_results, changed
+        async def correct(task: Task) -> Dict[str, object]:
+            corrected, changed = await self._correct_single_task(
+                task, items_by_id[task.id], corrections[task.id], context, constraints, scenario_id, on_event, pools
+            )
+            if changed:
+                changed_ids.add(task.id)
+            return corrected
+
+        def keep_previous(task: Task, exc: Exception) -> Dict[str, object]:
+            self._log(f"[SelfCorrection] Erreur sur la tache {task.id}: {exc}")
+            return items_by_id[task.id]
+
+        corrected_results, skipped = await self._run_task_graph(
+            tasks_by_id,
+            correct,
+            keep_previous,
+            stage="SelfCorrection",
+            external_done=external_done,
+            span_name="self_correction",
+        )
+        corrected_results.extend(items_by_id[tid] for tid in sorted(skipped))
+        corrected_results.extend(passthrough)
+        return corrected_results, bool(changed_ids)
+
+    def _plan_corrections(
+        self,
+        results: List[Dict[str, object]],
+        feedback: CriticFeedback,
+    ) -> Dict[int, CriticFeedback]:
+        """
+        Select the tasks the critic implicates, with feedback narrowed to each of them.
+        Findings that name no task nor file are appended to every selected task; when nothing can
+        be attributed at all, every task is corrected with the full feedback (previous behaviour).
+        """
+        issues, loose_problems, loose_recommendations = attribute_feedback(feedback, results)
+        if not issues:
+            corrections: Dict[int, CriticFeedback] = {}
+            for item in results:
+                try:
+                    corrections[int((item.get("task") or {}).get("id"))] = feedback
+                except Exception:
+                    continue
+            return corrections
+        threshold = severity_rank(self.correction_min_severity)
+        return {
+            task_id: feedback_for_task(feedback, issue, loose_problems, loose_recommendations)
+            for task_id, issue in issues.items()
+            if severity_rank(issue.severity) >= threshold
+        }
 
-    def _build_final_response(
+    async def _correct_single_task(
+        self,
+        task: Task,
+        item: Dict[str, object],
+        critic_feedback: CriticFeedback,
+        context: str,
+        constraints: str,
+        scenario_id: str,
+        on_event: Optional[RunEventHandler],
+        pools: Dict[str, asyncio.Semaphore],
+    ) -> tuple[Dict[str, object], bool]:
+        execution_data = item.get("execution") or {}
+        exec_output = ExecutionOutput(
+            status=str(execution_data.get("status", "failure")),
+            notes=str(execution_data.get("notes", "")),
+            files=[
+                FileEdit(path=str(f["path"]), content=str(f["content"]))
+                for f in execution_data.get("files", [])
+                if isinstance(f, dict) and "path" in f and "content" in f
+            ],
+            review=parse_task_review(execution_data.get("review")) if execution_data.get("review") else None,
+        )
+        async with self._stage_slot(pools, self.self_correction.model):
+            self._emit(on_event, {"type": "stage", "stage": "self_correction", "status": "start", "task_id": task.id})
+            corrected_output = await self.self_correction.acorrect(
+                task,
+                exec_output,
+                critic_feedback,
+                scenario_id=scenario_id,
+            )
+            self._emit(on_event, {"type": "stage", "stage": "self_correction", "status": "end", "task_id": task.id})
+        if corrected_output.status != "success" or not corrected_output.files:
+            # Ignore empty/failed corrections to keep prior result stable.
+            return item, False
+        async with self._stage_slot(pools, self.reviewer.model):
+            self._emit(on_event, {"type": "stage", "stage": "reviewer", "status": "start", "task_id": task.id})
+            corrected_output.review = await self.reviewer.areview(
+                task=task,
+                execution=corrected_output,
+                context=context,
+                constraints=constraints,
+                scenario_id=scenario_id,
+            )
+            self._emit(on_event, {"type": "stage", "stage": "reviewer", "status": "end", "task_id": task.id})
+        corrected_serialized = _serialize_execution_output(corrected_output)
+        return {"task": item.get("task") or {}, "execution": corrected_serialized}, corrected_serialized != execution_data
+
+    def _task_from_result(self, item: Dict[str, object]) -> Task:
+        task_data = item.get("task") or {}
+        return Task(
+            id=int(task_data.get("id", 0)),
+            title=str(task_data.get("title", "")),
+            description=str(task_data.get("description", "")),
+            input=str(task_data.get("input", "")),
+            output=str(task_data.get("output", "")),
+            dependencies=list(task_data.get("dependencies") or []),
+        )
+
+    async def _build_final_response(
         self,
         goal: str,
         context: str,
@@ -408,20 +967,24 @@ class Orchestrator:
         unresolved_tasks: List[Dict[str, object]],
         final_critic: Dict[str, object],
         scenario_id: str,
+        on_token: Optional[Callable[[str], None]] = None,
     ) -> str:
         try:
-            draft = self.responder.build_markdown_response(
+            draft = await self.responder.abuild_markdown_response(
                 goal=goal,
                 context=context,
                 tasks=tasks,
                 unresolved_tasks=unresolved_tasks,
                 final_critic=final_critic,
                 scenario_id=scenario_id,
+                on_token=on_token,
             )
             if draft.strip():
                 return draft.strip()
             self._log("[Responder] Reponse vide recue, utilisation du fallback.")
             return self._fallback_response(goal, context, tasks, unresolved_tasks, final_critic)
+        except RUN_ABORTED:
+            raise
         except Exception as exc:  # pragma: no cover - defensive
             self._log(f"[Responder] Echec generation Markdown: {exc}")
             return self._fallback_response(goal, context, tasks, unresolved_tasks, final_critic)
@@ -510,6 +1073,29 @@ class Orchestrator:
             formatted.append(f"{label}: {snippet}")
         return "\n".join(formatted)
 
+    def _emit(self, on_event: Optional[RunEventHandler], event: Dict[str, object]) -> None:
+        if on_event is None:
+            return
+        try:
+            on_event(event)
+        except Exception:
+            # Progress reporting must never break the pipeline.
+            return
+
+    def _token_handler(
+        self,
+        on_event: Optional[RunEventHandler],
+        stage: str,
+        **extra: object,
+    ) -> Optional[Callable[[str], None]]:
+        if on_event is None:
+            return None
+
+        def _forward(text: str) -> None:
+            self._emit(on_event, {"type": "token", "stage": stage, "text": text, **extra})
+
+        return _forward
+
     def _normalize_scenario_id(self, scenario_id: Optional[str]) -> str:
         label = (scenario_id or "").strip()
         return label or "default"
@@ -150,3 +150,16 @@ Contraintes :
 - Termine par une section "Recommandations" : liste les recommandations essentielles et indique le score global si disponible, sans mentionner "Critique finale".
 - Pas de texte commercial ou verbeux, garde moins de 200 mots hors blocs de code.
 """
+
+
+MEMORY_SUMMARY = """
+Tu condenses la memoire d'une conversation entre un developpeur et un agent de code.
+
+Contraintes :
+- Conserve les faits utiles pour la suite : objectifs, decisions, fichiers, noms, erreurs rencontrees et solutions.
+- Supprime les repetitions, les formules de politesse et le code complet (garde seulement les signatures ou noms utiles).
+- Liste a puces concise, 150 mots maximum.
+
+Sortie :
+- Uniquement le resume, rien d'autre.
+"""
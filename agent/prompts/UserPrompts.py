@@ -108,12 +108,46 @@ Critique precedente (si disponible) :
 
 Fournis une critique FINALE (une seule fois) sur l'ensemble du resultat genere.
 Donne un score global sur 100, la liste des problemes observes et des recommandations concretes.
+Dans `tasks`, rattache chaque probleme/recommandation a la tache concernee (id) et a ses fichiers,
+avec une severite parmi low, medium, high, critical. N'y liste que les taches a corriger.
 
 Format de sortie STRICT (JSON uniquement) :
 {
   "score": 0-100,
   "problems": [],
-  "recommendations": []
+  "recommendations": [],
+  "tasks": [
+    {"task_id": 1, "files": [], "severity": "medium", "problems": [], "recommendations": []}
+  ]
+}
+"""
+
+
+CRITIC_INCREMENTAL = """
+Objectif global :
+{{GOAL}}
+
+Contraintes :
+{{CONSTRAINTS}}
+
+Critique precedente :
+{{BASELINE_FEEDBACK}}
+
+Corrections appliquees depuis cette critique (diffs unifies des seuls fichiers modifies, par tache) :
+{{CHANGES}}
+
+Re-evalue le livrable apres corrections avec le meme bareme que la critique precedente.
+Le code non present dans les diffs n'a pas change : conserve les problemes de la critique precedente
+qui le concernent, retire ceux que les diffs corrigent et signale les problemes introduits par les diffs.
+
+Format de sortie STRICT (JSON uniquement) :
+{
+  "score": 0-100,
+  "problems": [],
+  "recommendations": [],
+  "tasks": [
+    {"task_id": 1, "files": [], "severity": "medium", "problems": [], "recommendations": []}
+  ]
 }
 """
 
@@ -190,3 +224,14 @@ Genere un Markdown court et esthetique qui sert de reponse finale a l'utilisateu
 - Section "Recommandations" listant uniquement les recommandations clefs (pas de titre "Critique finale").
 - Termine par 2 a 3 prochaines etapes si elles sont pertinentes, sinon omets la section.
 """
+
+
+MEMORY_SUMMARY = """
+Resume existant (peut etre vide) :
+{{PREVIOUS_SUMMARY}}
+
+Reponses plus anciennes a integrer (ordre chronologique) :
+{{RESPONSES}}
+
+Produis un resume unique qui remplace le resume existant et ces reponses.
+"""
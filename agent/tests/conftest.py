@@ -0,0 +1,42 @@
+import sys
+import threading
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+# Modules import each other as top-level packages (`from utils...`), as when run from agent/.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+@pytest.fixture
+def serve():
+    """Start a local HTTP server for a request handler class and return its base URL."""
+    servers = []
+
+    def start(handler):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+@pytest.fixture
+def costs_path(tmp_path):
+    return tmp_path / "costs.csv"
+
+
+@pytest.fixture
+def make_memory_store(tmp_path):
+    """MemoryStore factory; every store of a test shares one database, so a new one reopens it."""
+    from utils.memory import MemoryStore
+
+    def make(**options):
+        return MemoryStore(path=str(tmp_path / "memory.sqlite"), **options)
+
+    return make
@@ -0,0 +1,91 @@
+import argparse
+import importlib
+import inspect
+import threading
+
+from fastapi.testclient import TestClient
+
+from orchestrator import Orchestrator
+
+
+def test_metrics_endpoint_exposes_the_registry(tmp_path, costs_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    main = importlib.import_module("main")
+    orchestrator = Orchestrator(costs_path=str(costs_path), verbose=False, memory_enabled=False)
+    client = TestClient(main.create_app(orchestrator))
+
+    assert client.get("/health").status_code == 200
+    response = client.get("/metrics")
+    orchestrator.cost_logger.close()
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE mycodex_runs_in_flight gauge" in response.text
+    assert 'mycodex_http_requests_total{route="/health",status="200"}' in response.text
+
+
+def test_import_opens_no_file_nor_thread(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    threads = set(threading.enumerate())
+
+    main = importlib.reload(importlib.import_module("main"))
+
+    assert list(tmp_path.iterdir()) == []
+    assert set(threading.enumerate()) == threads
+    assert main.app.state.orchestrator is None and main.app.state.jobs is None
+
+
+def test_lifespan_builds_from_the_cli_configuration(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    main = importlib.import_module("main")
+    config = argparse.Namespace(
+        costs_path=str(tmp_path / "data" / "costs.csv"),
+        memory_path=str(tmp_path / "data" / "memory.sqlite"),
+        jobs_path=str(tmp_path / "data" / "jobs.sqlite"),
+    )
+    app = main.create_app(config=config)
+
+    with TestClient(app) as client:
+        assert client.get("/api/jobs").status_code == 200
+        assert app.state.jobs.store is not None
+
+    # Only the configured paths were used.
+    assert not [path for path in tmp_path.iterdir() if path.name != "data"]
+    assert {"costs.csv", "memory.sqlite", "jobs.sqlite"} <= {path.name for path in (tmp_path / "data").iterdir()}
+
+
+def test_shutdown_stops_jobs_before_their_resources(tmp_path, costs_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    main = importlib.import_module("main")
+    config = argparse.Namespace(
+        costs_path=str(costs_path),
+        memory_path=str(tmp_path / "memory.sqlite"),
+        jobs_path=str(tmp_path / "jobs.sqlite"),
+    )
+    app = main.create_app(config=config)
+    calls = []
+
+    def record(owner, name, label):
+        method = getattr(owner, name)
+        if inspect.iscoroutinefunction(method):
+
+            async def wrapper(*args, **kwargs):
+                calls.append(label)
+                return await method(*args, **kwargs)
+
+        else:
+
+            def wrapper(*args, **kwargs):
+                calls.append(label)
+                return method(*args, **kwargs)
+
+        monkeypatch.setattr(owner, name, wrapper)
+
+    with TestClient(app):
+        orchestrator = app.state.orchestrator
+        record(app.state.jobs, "close", "jobs")
+        record(orchestrator.client, "aclose", "client")
+        record(orchestrator.cost_logger, "close", "costs")
+        record(orchestrator.memory, "stop_compaction", "compaction")
+
+    assert calls == ["jobs", "client", "costs", "compaction"]
@@ -0,0 +1,116 @@
+import csv
+import threading
+
+from utils.cost_logger import CostLogger
+
+
+def _log(logger, call_id, prompt_tokens=3, prompt_text=""):
+    logger.log_success(
+        scenario_id="s1",
+        call_id=call_id,
+        model="m1",
+        endpoint="/api/chat",
+        prompt_hash="h",
+        latency_ms=5,
+        prompt_tokens=prompt_tokens,
+        completion_tokens=4,
+        prompt_text=prompt_text,
+    )
+
+
+def _rows(path):
+    with open(path, newline="", encoding="utf-8") as fp:
+        return list(csv.DictReader(fp))
+
+
+def _writers():
+    return [thread for thread in threading.enumerate() if thread.name == "cost-logger"]
+
+
+def test_encoder_is_looked_up_once_per_model(costs_path, monkeypatch):
+    logger = CostLogger(costs_path)
+    lookups = []
+    monkeypatch.setattr(logger, "_load_encoding", lambda model: lookups.append(model))
+
+    for _ in range(3):
+        assert logger.count_tokens("codellama:13b", "two words") == 2
+    logger.count_tokens("qwen2.5", "text")
+
+    assert lookups == ["codellama:13b", "qwen2.5"]
+
+
+def test_tokens_are_counted_off_the_calling_thread(costs_path, monkeypatch):
+    logger = CostLogger(costs_path)
+    threads = []
+
+    def count_tokens(model, text):
+        threads.append(threading.get_ident())
+        return 42
+
+    monkeypatch.setattr(logger, "count_tokens", count_tokens)
+    _log(logger, "c1", prompt_tokens=None, prompt_text="a prompt")
+    logger.flush()
+
+    assert threads and threading.get_ident() not in threads
+    assert [(row["call_id"], row["prompt_tokens"]) for row in _rows(costs_path)] == [("c1", "42")]
+    logger.close()
+
+
+def test_sync_accounting_writes_inline(costs_path):
+    logger = CostLogger(costs_path, async_accounting=False)
+    _log(logger, "c1")
+
+    assert [row["call_id"] for row in _rows(costs_path)] == ["c1"]
+
+
+def test_close_is_idempotent_and_later_rows_are_dropped(costs_path, capsys):
+    logger = CostLogger(costs_path)
+    _log(logger, "c1")
+    logger.close()
+    logger.close()
+    size = costs_path.stat().st_size
+
+    _log(logger, "c2")
+    _log(logger, "c3")
+
+    assert not _writers()
+    assert costs_path.stat().st_size == size
+    assert "c2" not in costs_path.read_text(encoding="utf-8")
+    assert capsys.readouterr().out.count("[Costs]") == 1
+
+
+def test_sync_accounting_drops_rows_after_close(costs_path):
+    logger = CostLogger(costs_path, async_accounting=False)
+    _log(logger, "c1")
+    logger.close()
+
+    _log(logger, "c2")
+
+    assert [row["call_id"] for row in _rows(costs_path)] == ["c1"]
+
+
+def test_row_logged_while_closing_is_not_lost(costs_path, monkeypatch):
+    logger = CostLogger(costs_path)
+    _log(logger, "c1")
+    inner = logger._queue
+    closed = threading.Event()
+
+    class RacingQueue:
+        """Closes the logger between the dispatcher's checks and its `put`."""
+
+        def put(self, item):
+            if item[0] == "row":
+                closer = threading.Thread(target=lambda: (logger.close(), closed.set()))
+                closer.start()
+                # Unblocked by close() when the row is queued unguarded, else times out.
+                closed.wait(0.3)
+            inner.put(item)
+
+        def get(self, *args, **kwargs):
+            return inner.get(*args, **kwargs)
+
+    monkeypatch.setattr(logger, "_queue", RacingQueue())
+    _log(logger, "c2")
+    assert closed.wait(5)
+
+    assert [row["call_id"] for row in _rows(costs_path)] == ["c1", "c2"]
@@ -0,0 +1,195 @@
+import random
+
+import pytest
+
+from utils.cost_logger import CostLogger
+from utils.cost_store import COST_FIELDS, CsvCostBackend, SqliteCostBackend, aggregate_costs, create_cost_backend
+
+
+def _row(index, scenario_id="s1", model="m1"):
+    return {
+        "timestamp": f"2026-10-17T10:00:{index % 60:02d}.{index:06d}Z",
+        "scenario_id": scenario_id,
+        "call_id": f"c{index}",
+        "model": model,
+        "endpoint": "/api/chat",
+        "prompt_hash": "h",
+        "prompt_tokens": index,
+        "completion_tokens": 2 * index,
+        "total_tokens": 3 * index,
+        "latency_ms": 10,
+        "status": "ok",
+        "notes": "",
+    }
+
+
+def _call_ids(rows):
+    return sorted(int(row["call_id"][1:]) for row in rows)
+
+
+def _backend(kind, costs_path):
+    if kind == "parquet":
+        pytest.importorskip("pyarrow")
+    return create_cost_backend(kind, costs_path)
+
+
+def test_aggregates_count_model_calls_apart_from_hits_and_errors():
+    rows = [{**_row(index), "latency_ms": 100 * index} for index in range(1, 11)]
+    rows.append({**_row(11), "status": "cache_hit"})
+    rows.append({**_row(12, scenario_id="s2"), "status": "error:Timeout"})
+
+    stats = aggregate_costs(rows)
+
+    assert (stats["calls"], stats["cache_hits"], stats["errors"]) == (10, 1, 1)
+    assert stats["latency_p50_ms"] == 550.0 and stats["latency_p95_ms"] == 955.0
+    # 110 completion tokens over 5.5 s of model time.
+    assert stats["tokens_per_second"] == 20.0
+    assert stats["by_model"]["m1"]["calls"] == 10
+    assert stats["by_scenario"]["s1"]["total_tokens"] == 165
+    assert stats["by_scenario"]["s2"]["calls"] == 0
+
+
+@pytest.mark.parametrize("kind", ["csv", "sqlite", "parquet"])
+def test_backends_filter_rows(costs_path, kind):
+    backend = _backend(kind, costs_path)
+    backend.write([_row(index, scenario_id=f"s{index % 2}", model="m2" if index % 3 else "m1") for index in range(12)])
+
+    assert _call_ids(backend.rows()) == list(range(12))
+    assert _call_ids(backend.rows(scenario_id="s1")) == list(range(1, 12, 2))
+    assert _call_ids(backend.rows(model="m1")) == [0, 3, 6, 9]
+    assert _call_ids(backend.rows(since="2026-10-17T10:00:08")) == [8, 9, 10, 11]
+    assert set(backend.rows()[0]) == set(COST_FIELDS)
+    backend.close()
+
+
+def test_cost_logger_aggregates_its_backend(costs_path):
+    logger = CostLogger(costs_path, backend="sqlite")
+    for index in range(3):
+        logger.log_success(
+            scenario_id="s1",
+            call_id=f"c{index}",
+            model="m1",
+            endpoint="/api/chat",
+            prompt_hash="h",
+            prompt_tokens=10,
+            completion_tokens=20,
+            latency_ms=100,
+        )
+
+    stats = logger.aggregates(model="m1")
+    logger.close()
+
+    assert stats["calls"] == 3
+    assert stats["by_scenario"]["s1"]["total_tokens"] == 90
+    assert costs_path.with_suffix(".sqlite").exists()
+
+
+def test_rotation_to_a_larger_file_is_read_from_its_start(costs_path):
+    backend = CsvCostBackend(costs_path)
+    backend.write([_row(i) for i in range(5)])
+    assert _call_ids(backend.rows()) == list(range(5))
+
+    # Rotate by hand, then grow the new file well past the old read offset.
+    backend.close()
+    costs_path.rename(costs_path.with_name("costs-20261017-100000.csv"))
+    backend.write([_row(i) for i in range(5, 40)])
+
+    rows = backend.rows()
+    assert _call_ids(rows) == list(range(40))
+    assert all(set(row) == set(COST_FIELDS) and row["scenario_id"] == "s1" for row in rows)
+
+
+def test_rows_of_rotated_files_are_included(costs_path):
+    backend = CsvCostBackend(costs_path, rotate_bytes=600)
+    for index in range(30):
+        backend.write([_row(index, model="m2" if index % 2 else "m1")])
+        if index % 7 == 0:
+            backend.rows()
+
+    assert len(list(costs_path.parent.glob("costs-*.csv"))) > 1
+    assert _call_ids(backend.rows()) == list(range(30))
+    assert _call_ids(backend.rows(model="m2")) == list(range(1, 30, 2))
+    # A fresh reader (e.g. after a restart) sees the same history.
+    assert _call_ids(CsvCostBackend(costs_path).rows()) == list(range(30))
+
+
+def test_cache_is_bounded(costs_path):
+    backend = CsvCostBackend(costs_path, rotate_bytes=2000, max_cached_rows=10)
+    for index in range(60):
+        backend.write([_row(index)])
+        backend.rows()
+
+    assert _call_ids(backend.rows()) == list(range(60))
+    assert sum(len(segment.rows) for segment in backend._segments.values()) <= 10
+
+
+def test_truncated_file_is_read_again(costs_path):
+    backend = CsvCostBackend(costs_path)
+    backend.write([_row(i) for i in range(10)])
+    assert len(backend.rows()) == 10
+
+    backend.close()
+    costs_path.write_text(",".join(COST_FIELDS) + "\n", encoding="utf-8")
+    backend.write([_row(100)])
+
+    assert _call_ids(backend.rows()) == [100]
+
+
+def _mixed_rows(count):
+    rng = random.Random(7)
+    rows = []
+    for index in range(count):
+        row = _row(index, scenario_id=rng.choice(["s1", "s2", "s3", ""]), model=rng.choice(["m1", "m2", ""]))
+        row["latency_ms"] = rng.randint(1, 5000)
+        row["status"] = rng.choice(["ok", "ok", "ok", "cache_hit", "error:timeout"])
+        rows.append(row)
+    return rows
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [{}, {"scenario_id": "s2"}, {"model": "m1"}, {"since": "2026-10-17T10:00:30"}, {"scenario_id": "nope"}],
+)
+def test_sqlite_aggregates_match_python_aggregation(tmp_path, filters):
+    backend = SqliteCostBackend(tmp_path / "costs.sqlite")
+    backend.write(_mixed_rows(300))
+
+    expected = aggregate_costs(backend.rows(**filters), max_scenarios=2)
+    actual = backend.aggregates(**filters, max_scenarios=2)
+
+    assert actual == expected
+
+
+def test_parquet_segments_are_merged(tmp_path):
+    pytest.importorskip("pyarrow")
+    from utils.cost_store import ParquetCostBackend
+
+    backend = ParquetCostBackend(tmp_path / "costs_parquet", merge_segments=4)
+    for index in range(10):
+        backend.write([_row(index, model="m2" if index % 2 else "m1")])
+
+    files = list((tmp_path / "costs_parquet").glob("date=*/*.parquet"))
+    assert len(files) < 4
+    assert _call_ids(backend.rows()) == list(range(10))
+    assert _call_ids(backend.rows(model="m2")) == list(range(1, 10, 2))
+
+
+def test_parquet_source_left_by_a_merge_is_not_counted_twice(tmp_path):
+    pytest.importorskip("pyarrow")
+    from utils.cost_store import ParquetCostBackend
+
+    root = tmp_path / "costs_parquet"
+    backend = ParquetCostBackend(root, merge_segments=3)
+    backend.write([_row(0)])
+    backend.write([_row(1)])
+    kept = {path.name: path.read_bytes() for path in root.glob("date=*/*.parquet")}
+    backend.write([_row(2)])
+    # Simulate a crash between publishing the merged file and deleting its sources.
+    folder = next(root.glob("date=*"))
+    for name, data in kept.items():
+        (folder / name).write_bytes(data)
+
+    assert _call_ids(backend.rows()) == [0, 1, 2]
+    for index in range(3, 8):
+        backend.write([_row(index)])
+    assert _call_ids(backend.rows()) == list(range(8))
@@ -0,0 +1,141 @@
+import asyncio
+
+import pytest
+
+from utils.jobs import JobManager, JobQueueFull, SqliteJobStore
+from utils.metrics import JOBS_TOTAL
+
+
+@pytest.fixture
+def job_store(tmp_path):
+    return SqliteJobStore(tmp_path / "jobs.sqlite")
+
+
+def _blocking_runner(release):
+    async def runner(emit):
+        await release.wait()
+        return {"ok": True}
+
+    return runner
+
+
+def test_job_progress_is_replayed_and_its_result_stored(job_store):
+    async def runner(emit):
+        emit({"type": "stage", "stage": "planner", "status": "start"})
+        emit({"type": "token", "text": "..."})
+        return {"answer": 42}
+
+    async def scenario():
+        manager = JobManager(workers=1, store=job_store)
+        job = manager.submit(runner, scenario_id="s1")
+        assert job.status == "queued"
+        live = [event async for event in manager.events(job)]
+        replayed = [event async for event in manager.events(job, after=2)]
+        await manager.close()
+        return job, live, replayed
+
+    job, live, replayed = asyncio.run(scenario())
+    assert job.status == "succeeded" and job.stage == "planner"
+    # Token chunks are forwarded live but not stored for replay.
+    assert [event["type"] for event in live] == ["status", "status", "stage", "token", "result", "status"]
+    assert [event["seq"] for event in job.events] == list(range(5))
+    assert replayed == job.events[2:]
+    stored = SqliteJobStore(job_store.path).get(job.job_id)
+    assert (stored.status, stored.scenario_id, stored.result) == ("succeeded", "s1", {"answer": 42})
+
+
+def test_cancel_running_and_finished_jobs(job_store):
+    async def scenario():
+        manager = JobManager(workers=1, store=job_store)
+        release = asyncio.Event()
+        job = manager.submit(_blocking_runner(release))
+        await asyncio.sleep(0)
+        assert job.status == "running"
+
+        assert manager.cancel(job.job_id)
+        for _ in range(5):
+            await asyncio.sleep(0)
+        assert job.status == "cancelled"
+        assert not manager.cancel(job.job_id)
+        assert not manager.cancel("unknown")
+        stored = job_store.get(job.job_id)
+        await manager.close()
+        return stored
+
+    assert asyncio.run(scenario()).status == "cancelled"
+
+
+def test_cancelled_queued_jobs_free_their_queue_slot():
+    async def scenario():
+        manager = JobManager(workers=1, max_queued=2)
+        release = asyncio.Event()
+        running = manager.submit(_blocking_runner(release))
+        await asyncio.sleep(0)
+        assert running.status == "running"
+        first = manager.submit(_blocking_runner(release))
+        second = manager.submit(_blocking_runner(release))
+        with pytest.raises(JobQueueFull):
+            manager.submit(_blocking_runner(release))
+
+        assert manager.cancel(first.job_id) and manager.cancel(second.job_id)
+        assert first.status == second.status == "cancelled"
+        replacements = [manager.submit(_blocking_runner(release)) for _ in range(2)]
+        with pytest.raises(JobQueueFull):
+            manager.submit(_blocking_runner(release))
+
+        release.set()
+        for _ in range(20):
+            await asyncio.sleep(0)
+        statuses = [job.status for job in [running, *replacements]]
+        await manager.close()
+        return statuses
+
+    assert asyncio.run(scenario()) == ["succeeded"] * 3
+
+
+def test_close_records_the_jobs_it_cancels(job_store):
+    async def scenario():
+        manager = JobManager(workers=1, store=job_store)
+        release = asyncio.Event()
+        running = manager.submit(_blocking_runner(release))
+        queued = manager.submit(_blocking_runner(release))
+        await asyncio.sleep(0)
+        assert running.status == "running"
+        events = manager.events(running)
+        assert (await events.__anext__())["status"] == "queued"
+        cancelled_before = JOBS_TOTAL.value(status="cancelled")
+
+        await manager.close()
+
+        async def drain():
+            return [event async for event in events]
+
+        remaining = await asyncio.wait_for(drain(), 2)
+        return running, queued, remaining, JOBS_TOTAL.value(status="cancelled") - cancelled_before
+
+    running, queued, remaining, counted = asyncio.run(scenario())
+    assert running.status == queued.status == "cancelled"
+    assert remaining[-1] == {"type": "status", "status": "cancelled", "seq": 2}
+    assert counted == 2
+    reopened = SqliteJobStore(job_store.path)
+    assert {reopened.get(job.job_id).status for job in (running, queued)} == {"cancelled"}
+
+
+def test_list_and_get_merge_memory_and_store(job_store):
+    async def scenario():
+        manager = JobManager(workers=1, history=1, store=job_store)
+        release = asyncio.Event()
+        release.set()
+        old = manager.submit(_blocking_runner(release))
+        for _ in range(5):
+            await asyncio.sleep(0)
+        new = manager.submit(_blocking_runner(release))
+        assert old.job_id not in manager.jobs
+        listed = await manager.list(10)
+        fetched = await manager.get(old.job_id)
+        await manager.close()
+        return [job["job_id"] for job in listed], [new.job_id, old.job_id], fetched
+
+    listed, expected, fetched = asyncio.run(scenario())
+    assert listed == expected
+    assert fetched.status == "succeeded" and fetched.result == {"ok": True}
@@ -0,0 +1,99 @@
+import json
+import sqlite3
+import time
+
+import pytest
+
+from utils.memory_backend import SqliteMemoryBackend
+
+
+def _remember(store, response, conversation_id="chat"):
+    store.remember(goal="goal", context="", constraints="", notes="", response=response, conversation_id=conversation_id)
+
+
+def _fill(store, responses, conversation_id="chat"):
+    for response in responses:
+        _remember(store, response, conversation_id)
+        time.sleep(0.001)
+
+
+def test_entries_are_written_one_row_at_a_time(make_memory_store, tmp_path):
+    store = make_memory_store(long_term_limit=3)
+    _fill(store, ["r0", "r1"])
+    _fill(store, ["other"], conversation_id="other")
+    assert store.backend.count() == 3
+
+    _fill(store, ["r2", "r3"])
+
+    # The two oldest entries of "chat" were trimmed from the table, the other conversation kept.
+    assert store.backend.count() == 4
+    reopened = make_memory_store(long_term_limit=3)
+    assert [entry.response for entry in reopened.list_entries("chat")] == ["r1", "r2", "r3"]
+    assert [entry.response for entry in reopened.list_entries("other")] == ["other"]
+    with sqlite3.connect(str(tmp_path / "memory.sqlite")) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_delete_entry_removes_only_that_row(make_memory_store):
+    store = make_memory_store()
+    _fill(store, ["r0", "r1", "r2"])
+    target = next(item["id"] for item in store.backend.load() if item["response"] == "r1")
+
+    assert store.delete_entry(target)
+    assert not store.delete_entry(target)
+
+    assert [entry.response for entry in make_memory_store().list_entries("chat")] == ["r0", "r2"]
+
+
+def test_legacy_json_is_imported_once(tmp_path):
+    items = [{"goal": "g", "response": f"r{index}", "timestamp": 1000.0 + index, "conversation_id": "a"} for index in range(3)]
+    (tmp_path / "memory.json").write_text(json.dumps(items), encoding="utf-8")
+
+    backend = SqliteMemoryBackend(tmp_path / "memory.json")
+    assert backend.path == tmp_path / "memory.sqlite"
+    assert [item["response"] for item in backend.load()] == ["r0", "r1", "r2"]
+    backend.close()
+
+    (tmp_path / "memory.json").write_text(json.dumps(items[:1]), encoding="utf-8")
+    assert SqliteMemoryBackend(tmp_path / "memory.sqlite").count() == 3
+
+
+def test_entries_with_the_same_timestamp_are_all_kept(make_memory_store, monkeypatch):
+    store = make_memory_store()
+    monkeypatch.setattr(time, "time", lambda: 1000.0)
+    for conversation_id, response in [("a", "a1"), ("a", "a2"), ("b", "b1")]:
+        _remember(store, response, conversation_id)
+    monkeypatch.undo()
+
+    reopened = make_memory_store()
+    assert [entry.response for entry in reopened.list_entries("a")] == ["a1", "a2"]
+    assert [entry.response for entry in reopened.list_entries("b")] == ["b1"]
+    ids = [entry.entry_id for entry in reopened.list_entries()]
+    assert len(set(ids)) == 3
+
+    assert reopened.delete_entry(ids[0])
+    assert sorted(entry.response for entry in make_memory_store().list_entries()) == ["a2", "b1"]
+
+
+def test_legacy_json_entries_with_the_same_timestamp_are_all_imported(tmp_path):
+    items = [
+        {"goal": "g", "response": "first", "timestamp": 1000.0, "conversation_id": "a"},
+        {"goal": "g", "response": "second", "timestamp": 1000.0, "conversation_id": "a"},
+        {"goal": "g", "response": "other", "timestamp": 1000.0, "conversation_id": "b"},
+    ]
+    (tmp_path / "memory.json").write_text(json.dumps(items), encoding="utf-8")
+
+    backend = SqliteMemoryBackend(tmp_path / "memory.sqlite")
+
+    assert [item["response"] for item in backend.load()] == ["first", "second", "other"]
+
+
+def test_inserting_an_existing_id_fails(tmp_path):
+    backend = SqliteMemoryBackend(tmp_path / "memory.sqlite")
+    item = {"id": "e1", "conversation_id": "a", "timestamp": 1.0, "response": "kept"}
+    backend.write(inserts=[item])
+
+    with pytest.raises(sqlite3.IntegrityError):
+        backend.write(inserts=[{**item, "response": "replacement"}])
+
+    assert [row["response"] for row in backend.load()] == ["kept"]
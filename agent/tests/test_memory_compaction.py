@@ -0,0 +1,148 @@
+import itertools
+import time
+
+import pytest
+
+from agents.memory_summarizer import MemorySummarizer
+
+OPTIONS = dict(long_term_limit=500, compact_keep_recent=5, compact_batch=10, compact_max_chars=2000)
+
+
+@pytest.fixture
+def store(make_memory_store):
+    return make_memory_store(**OPTIONS)
+
+
+def _fill(store, count, size=500, conversation_id="chat"):
+    for index in range(count):
+        store.remember(
+            goal=f"goal {index}",
+            context="",
+            constraints="",
+            notes="",
+            response=f"r{index:03d} " + "x" * size,
+            conversation_id=conversation_id,
+        )
+        time.sleep(0.001)
+
+
+def _raw_responses(store, conversation_id="chat"):
+    return [entry.response for entry in store.list_entries(conversation_id) if entry.kind != "summary"]
+
+
+def test_old_entries_are_replaced_by_one_summary(store):
+    _fill(store, 30)
+    _fill(store, 3, conversation_id="short")
+    seen = []
+
+    def summarize(previous, responses):
+        seen.extend(responses)
+        return "summary of the old entries"
+
+    before = _raw_responses(store)
+    stats = store.compact(summarize)
+
+    assert stats == {"expired": 0, "summarized": 25}
+    assert _raw_responses(store) == before[-5:]
+    assert set(seen) == set(before[:-5])
+    summaries = [entry for entry in store.list_entries("chat") if entry.kind == "summary"]
+    assert [entry.response for entry in summaries] == ["summary of the old entries"]
+    # Sessions below keep_recent + batch are left alone.
+    assert len(_raw_responses(store, "short")) == 3
+
+
+def test_entries_past_the_ttl_are_deleted(make_memory_store, monkeypatch):
+    store = make_memory_store(**OPTIONS, ttl_days=1)
+    clock = itertools.count(time.time() - 2 * 24 * 3600)
+    with monkeypatch.context() as patch:
+        patch.setattr(time, "time", lambda: next(clock))
+        _fill(store, 3, size=0)
+    _fill(store, 2, size=0)
+
+    stats = store.compact()
+
+    assert stats == {"expired": 3, "summarized": 0}
+    assert len(_raw_responses(store)) == 2
+    # The deletion reached the database.
+    assert len(_raw_responses(make_memory_store(**OPTIONS))) == 2
+
+
+def test_background_compaction_runs_until_stopped(store):
+    _fill(store, 20, size=0)
+    calls = []
+
+    def summarize(previous, responses):
+        calls.append(len(responses))
+        return "summary"
+
+    store.start_compaction(0.01, summarize)
+    deadline = time.monotonic() + 5
+    while not calls and time.monotonic() < deadline:
+        time.sleep(0.01)
+    store.stop_compaction()
+
+    assert sum(calls) == 15
+    assert store._compaction_thread is None
+
+
+def test_summarizer_sees_every_deleted_entry(store):
+    _fill(store, 40)
+    seen = []
+
+    def summarize(previous, responses):
+        # Calls must fit the summarizer input budget.
+        assert sum(len(response) + 2 for response in responses) <= store.compact_max_chars
+        seen.extend(responses)
+        return f"summary of {len(seen)}"
+
+    before = set(_raw_responses(store))
+    stats = store.compact(summarize)
+
+    after = set(_raw_responses(store))
+    assert stats["summarized"] == 35
+    assert before - after == set(seen)
+    assert len(after) == store.compact_keep_recent
+    summaries = [entry for entry in store.list_entries("chat") if entry.kind == "summary"]
+    assert [entry.response for entry in summaries] == ["summary of 35"]
+
+
+def test_failed_call_keeps_unsummarized_entries(store):
+    _fill(store, 40)
+    seen = []
+
+    def summarize(previous, responses):
+        if seen:
+            raise RuntimeError("model unavailable")
+        seen.extend(responses)
+        return "first chunk"
+
+    before = set(_raw_responses(store))
+    stats = store.compact(summarize)
+
+    after = set(_raw_responses(store))
+    assert stats["summarized"] == len(seen) > 0
+    assert before - after == set(seen)
+
+
+def test_summary_rolls_forward_between_chunks(store):
+    _fill(store, 30)
+    previous_summaries = []
+
+    def summarize(previous, responses):
+        previous_summaries.append(previous)
+        return f"summary {len(previous_summaries)}"
+
+    store.compact(summarize)
+    assert previous_summaries[0] == ""
+    assert previous_summaries[1:] == [f"summary {index}" for index in range(1, len(previous_summaries))]
+
+
+def test_chunk_reaches_summarizer_untruncated(store):
+    _fill(store, 12)
+    entries = [entry for entry in store.list_entries("chat") if entry.kind != "summary"]
+    chunk = store._compaction_chunk(entries)
+    assert 0 < len(chunk) < len(entries)
+
+    summarizer = MemorySummarizer(client=None, max_input_chars=store.compact_max_chars)  # type: ignore[arg-type]
+    prompt = summarizer._build_messages("", [entry.response for entry in chunk])[1]["content"]
+    assert all(entry.response in prompt for entry in chunk)
@@ -0,0 +1,93 @@
+import threading
+
+import pytest
+
+from utils.memory_backend import SqliteMemoryBackend
+from utils.metrics import MEMORY_SESSIONS
+
+
+def _remember(store, conversation_id):
+    store.remember(goal="goal", context="", constraints="", notes="", response=conversation_id, conversation_id=conversation_id)
+
+
+def _recall(store, conversation_id):
+    return [entry.response for entry in store.recall("goal", "", conversation_id=conversation_id)]
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    """Conversations read from the database, in order (None: the whole table)."""
+    calls = []
+    original = SqliteMemoryBackend.load
+
+    def load(self, conversation_id=None):
+        calls.append(conversation_id)
+        return original(self, conversation_id)
+
+    monkeypatch.setattr(SqliteMemoryBackend, "load", load)
+    return calls
+
+
+def test_sessions_are_loaded_on_first_use(make_memory_store, loads):
+    store = make_memory_store()
+    for conversation_id in ("a", "b", "c"):
+        _remember(store, conversation_id)
+    loads.clear()
+
+    reopened = make_memory_store()
+    assert loads == []
+
+    assert _recall(reopened, "b") == _recall(reopened, "b") == ["b"]
+    assert loads == ["b"]
+
+
+def test_cold_sessions_are_evicted_and_reloaded(make_memory_store, loads):
+    store = make_memory_store(max_hot_sessions=2)
+    for conversation_id in ("a", "b", "c"):
+        _remember(store, conversation_id)
+    reopened = make_memory_store(max_hot_sessions=2)
+    loads.clear()
+
+    for conversation_id in ("a", "b", "c", "a", "c"):
+        assert _recall(reopened, conversation_id) == [conversation_id]
+
+    assert loads == ["a", "b", "c", "a"]
+    assert MEMORY_SESSIONS.value() == 2
+
+
+def test_concurrent_writers_lose_no_entry(make_memory_store):
+    store = make_memory_store(max_hot_sessions=2, long_term_limit=500)
+    start = threading.Barrier(6)
+
+    def writer(worker):
+        start.wait()
+        for index in range(20):
+            conversation_id = f"c{(worker + index) % 3}"
+            store.remember(goal="goal", context="", constraints="", notes="", response=f"{worker}-{index}", conversation_id=conversation_id)
+            _recall(store, conversation_id)
+
+    threads = [threading.Thread(target=writer, args=(worker,)) for worker in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    reopened = make_memory_store(long_term_limit=500)
+    stored = [entry.response for conversation_id in ("c0", "c1", "c2") for entry in reopened.list_entries(conversation_id)]
+    assert sorted(stored) == sorted(f"{worker}-{index}" for worker in range(6) for index in range(20))
+
+
+def test_deleting_from_a_cold_conversation_keeps_the_hot_ones(make_memory_store, loads):
+    store = make_memory_store(max_hot_sessions=2)
+    for conversation_id in ("cold", "warm", "hot"):
+        _remember(store, conversation_id)
+    cold_entry = store.list_entries()[0]
+    assert cold_entry.conversation_id == "cold"
+    loads.clear()
+
+    assert store.delete_entry(cold_entry.entry_id)
+
+    # The hot conversations were not evicted to make room for the cold one.
+    assert _recall(store, "warm") == ["warm"] and _recall(store, "hot") == ["hot"]
+    assert "warm" not in loads and "hot" not in loads
+    assert store.list_entries("cold") == []
@@ -0,0 +1,44 @@
+from utils.metrics import MetricsRegistry
+
+
+def test_registry_renders_the_prometheus_text_format():
+    registry = MetricsRegistry()
+    calls = registry.counter("calls_total", "Calls by status.", ["status"])
+    in_flight = registry.gauge("in_flight", "Calls in progress.")
+    latency = registry.histogram("latency_seconds", "Call latency.", buckets=(0.1, 1.0))
+    calls.inc(status="ok")
+    calls.inc(2, status="ok")
+    calls.inc(status='say "no"')
+    in_flight.inc()
+    in_flight.dec()
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value)
+
+    text = registry.render()
+
+    assert text.splitlines()[:2] == ["# HELP calls_total Calls by status.", "# TYPE calls_total counter"]
+    assert 'calls_total{status="ok"} 3' in text
+    assert 'calls_total{status="say \\"no\\""} 1' in text
+    assert "in_flight 0" in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "latency_seconds_sum 5.55" in text and "latency_seconds_count 3" in text
+
+
+def test_metrics_are_registered_once_by_name():
+    registry = MetricsRegistry()
+    first = registry.counter("calls_total", "Calls.")
+    assert registry.counter("calls_total", "Calls.") is first
+
+
+def test_failing_collector_does_not_break_the_scrape():
+    registry = MetricsRegistry()
+
+    def collect():
+        raise RuntimeError("scheduler gone")
+
+    registry.gauge("queue_depth", "Queued calls.", collect=collect)
+    registry.counter("calls_total", "Calls.").inc()
+
+    assert "calls_total 1" in registry.render()
@@ -0,0 +1,149 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from clients.model_scheduler import ModelScheduler, parse_model_limits
+from utils.run_context import RunCancelled, RunContext, RunDeadlineExceeded, run_scope
+
+
+def _in_thread(scheduler, model, order, hold=0.0):
+    def call():
+        with scheduler.slot(model):
+            order.append(model)
+            time.sleep(hold)
+
+    thread = threading.Thread(target=call)
+    thread.start()
+    return thread
+
+
+def _queue_on_closed_loop(scheduler, model):
+    """Leave an `aslot` waiter queued on an event loop that is then closed."""
+    loop = asyncio.new_event_loop()
+
+    async def wait_for_slot():
+        async with scheduler.aslot(model):
+            pass
+
+    loop.create_task(wait_for_slot())
+    loop.run_until_complete(asyncio.sleep(0.01))
+    loop.close()
+
+
+def test_calls_per_model_are_capped():
+    scheduler = ModelScheduler(default_limit=3, limits={"m": 2})
+    lock = threading.Lock()
+    active = []
+    peak = []
+
+    def call():
+        with scheduler.slot("m"):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.02)
+            with lock:
+                active.pop()
+
+    threads = [threading.Thread(target=call) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=2)
+
+    assert max(peak) == 2
+    stats = scheduler.snapshot()["m"]
+    assert (stats["limit"], stats["granted"], stats["queue_depth"], stats["in_flight"]) == (2, 6, 0, 0)
+
+
+def test_calls_for_the_loaded_model_are_batched_first():
+    scheduler = ModelScheduler(default_limit=2, max_loaded_models=1)
+    order = []
+    with scheduler.slot("a"):
+        other = _in_thread(scheduler, "b", order)
+        time.sleep(0.05)
+        same = _in_thread(scheduler, "a", order, hold=0.05)
+        same.join(timeout=2)
+        assert order == ["a"]
+    other.join(timeout=2)
+
+    assert order == ["a", "b"]
+
+
+def test_cancelled_async_waiter_leaves_the_queue():
+    scheduler = ModelScheduler(default_limit=1)
+
+    async def scenario():
+        async with scheduler.aslot("m"):
+            waiter = asyncio.ensure_future(scheduler.aslot("m").__aenter__())
+            await asyncio.sleep(0.01)
+            assert scheduler.snapshot()["m"]["queue_depth"] == 1
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+
+    asyncio.run(scenario())
+    stats = scheduler.snapshot()["m"]
+    assert stats["queue_depth"] == 0 and stats["in_flight"] == 0
+
+
+def test_parse_model_limits():
+    assert parse_model_limits("codellama:13b=1, qwen2.5=2,broken,x=y,=3") == {"codellama:13b": 1, "qwen2.5": 2}
+
+
+def test_waiter_of_a_closed_loop_is_skipped():
+    scheduler = ModelScheduler(default_limit=1)
+    with scheduler.slot("m"):
+        _queue_on_closed_loop(scheduler, "m")
+        granted = threading.Event()
+
+        def next_caller():
+            with scheduler.slot("m"):
+                granted.set()
+
+        thread = threading.Thread(target=next_caller)
+        thread.start()
+        time.sleep(0.05)
+        assert scheduler.snapshot()["m"]["queue_depth"] == 2
+
+    thread.join(timeout=2)
+    assert granted.is_set()
+    stats = scheduler.snapshot()["m"]
+    assert stats["queue_depth"] == 0 and stats["in_flight"] == 0
+
+
+def test_sync_slot_stops_at_the_run_deadline():
+    scheduler = ModelScheduler(default_limit=1)
+    with scheduler.slot("m"):
+        run = RunContext.create("s1", timeout=0.2)
+        started = time.monotonic()
+        with run_scope(run), pytest.raises(RunDeadlineExceeded):
+            with scheduler.slot("m"):
+                pass
+        assert time.monotonic() - started < 1.0
+        assert scheduler.snapshot()["m"]["queue_depth"] == 0
+    assert scheduler.snapshot()["m"]["in_flight"] == 0
+
+
+def test_sync_slot_stops_when_the_run_is_cancelled():
+    scheduler = ModelScheduler(default_limit=1)
+    errors = []
+    run = RunContext.create("s1")
+
+    def caller():
+        with run_scope(run):
+            try:
+                with scheduler.slot("m"):
+                    pass
+            except RunCancelled as exc:
+                errors.append(exc)
+
+    with scheduler.slot("m"):
+        thread = threading.Thread(target=caller)
+        thread.start()
+        time.sleep(0.05)
+        run.cancel()
+        thread.join(timeout=2)
+    assert len(errors) == 1
+    assert scheduler.snapshot()["m"] == {**scheduler.snapshot()["m"], "queue_depth": 0, "in_flight": 0}
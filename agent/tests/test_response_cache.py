@@ -0,0 +1,114 @@
+import asyncio
+import csv
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+from clients.ollama_client import OllamaClient
+from utils.response_cache import ResponseCache
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+class _ChatHandler(BaseHTTPRequestHandler):
+    calls = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        type(self).calls += 1
+        body = json.dumps({"message": {"content": "answer"}, "done": True, "eval_count": 3}).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _ThreadRecordingCache(ResponseCache):
+    """Disk-backed cache recording the threads its SQLite tier is used from."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threads = []
+
+    def get(self, key):
+        self.threads.append(threading.get_ident())
+        return super().get(key)
+
+    def put(self, key, content, completion_tokens=0):
+        self.threads.append(threading.get_ident())
+        super().put(key, content, completion_tokens)
+
+
+@pytest.fixture
+def server(serve):
+    _ChatHandler.calls = 0
+    return serve(_ChatHandler)
+
+
+def test_repeated_prompt_is_answered_from_the_cache(server, costs_path):
+    client = OllamaClient(base_url=server, costs_path=str(costs_path), response_cache=ResponseCache(path=None))
+
+    assert client.chat("m", MESSAGES) == client.chat("m", MESSAGES) == "answer"
+    # Other options, other key.
+    client.chat("m", MESSAGES, temperature=0.7)
+
+    assert _ChatHandler.calls == 2
+    client.cost_logger.close()
+    with open(costs_path, newline="", encoding="utf-8") as fp:
+        statuses = [row["status"] for row in csv.DictReader(fp)]
+    assert statuses.count("cache_hit") == 1 and len(statuses) == 3
+
+
+def test_disk_tier_survives_a_restart_until_the_ttl(tmp_path, monkeypatch):
+    path = tmp_path / "cache.sqlite"
+    cache = ResponseCache(path=path, ttl_seconds=60)
+    key = cache.make_key("m", {"temperature": 0.2}, "hash")
+    cache.put(key, "answer", completion_tokens=3)
+    cache.close()
+
+    cached = ResponseCache(path=path, ttl_seconds=60).get(key)
+    assert (cached.content, cached.completion_tokens) == ("answer", 3)
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 120)
+    assert ResponseCache(path=path, ttl_seconds=60).get(key) is None
+
+
+def test_disk_tier_evicts_least_recently_used_entries(tmp_path):
+    cache = ResponseCache(path=tmp_path / "cache.sqlite", max_memory_entries=1, max_disk_bytes=100)
+    keys = [cache.make_key("m", {}, str(index)) for index in range(5)]
+    for key in keys:
+        cache.put(key, "x" * 40)
+
+    assert cache.stats()["disk_bytes"] <= 100
+    assert cache.get(keys[0]) is None
+    assert cache.get(keys[-1]).content == "x" * 40
+
+
+def test_async_calls_keep_the_disk_tier_off_the_event_loop(server, costs_path, tmp_path):
+    cache = _ThreadRecordingCache(path=tmp_path / "cache.sqlite")
+    client = OllamaClient(base_url=server, costs_path=str(costs_path), response_cache=cache)
+
+    async def calls():
+        loop_thread = threading.get_ident()
+        first = await client.achat("m", MESSAGES)
+        # The store is not awaited; let the executor finish it.
+        await asyncio.sleep(0.1)
+        second = await client.achat("m", MESSAGES)
+        await client.aclose()
+        return loop_thread, first, second
+
+    loop_thread, first, second = asyncio.run(calls())
+    client.cost_logger.close()
+
+    assert first == second == "answer"
+    assert _ChatHandler.calls == 1
+    assert len(cache.threads) == 3 and loop_thread not in cache.threads
+    # The completion reached the SQLite file.
+    assert ResponseCache(path=tmp_path / "cache.sqlite").stats()["disk_bytes"] > 0
@@ -0,0 +1,164 @@
+import asyncio
+import time
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+from clients.ollama_client import OllamaClient
+from orchestrator import Orchestrator
+from utils.metrics import RUNS_TOTAL
+from utils.run_context import (
+    RunBudgetExceeded,
+    RunCancelled,
+    RunContext,
+    RunDeadlineExceeded,
+    RunIdInUse,
+    run_scope,
+)
+
+
+class _SlowHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        time.sleep(2)
+        body = b'{"message": {"content": "late"}, "done": true}'
+        try:
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except OSError:
+            pass
+
+
+@pytest.fixture
+def client(serve, costs_path):
+    ollama = OllamaClient(base_url=serve(_SlowHandler), costs_path=str(costs_path))
+    yield ollama
+    ollama.close()
+    ollama.cost_logger.close()
+
+
+@pytest.fixture
+def orchestrator(costs_path):
+    instance = Orchestrator(costs_path=str(costs_path), verbose=False, memory_enabled=False)
+    yield instance
+    instance.cost_logger.close()
+
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def _runs(status):
+    return RUNS_TOTAL.value(status=status)
+
+
+def test_check_refuses_calls_past_the_budget_or_after_cancel():
+    run = RunContext.create("test", token_budget=10)
+    run.check()
+    run.add_tokens(10)
+    with pytest.raises(RunBudgetExceeded):
+        run.check()
+
+    run = RunContext.create("test")
+    assert run.cancel() and not run.cancel()
+    with pytest.raises(RunCancelled):
+        run.check()
+    assert RunContext.create("test", timeout=5).call_timeout(120) <= 5
+
+
+def test_sync_timeout_capped_by_deadline_raises_run_deadline(client):
+    run = RunContext.create("test", timeout=0.3)
+    started = time.monotonic()
+    with run_scope(run), pytest.raises(RunDeadlineExceeded):
+        client.chat("m", MESSAGES)
+    assert time.monotonic() - started < 1.5
+
+
+def test_sync_stream_timeout_capped_by_deadline_raises_run_deadline(client):
+    run = RunContext.create("test", timeout=0.3)
+    with run_scope(run), pytest.raises(RunDeadlineExceeded):
+        client.chat("m", MESSAGES, stream=True)
+
+
+def test_async_timeout_capped_by_deadline_raises_run_deadline(client):
+    async def call():
+        run = RunContext.create("test", timeout=0.3)
+        with run_scope(run):
+            try:
+                return await client.achat("m", MESSAGES)
+            finally:
+                await client.aclose()
+
+    started = time.monotonic()
+    with pytest.raises(RunDeadlineExceeded):
+        asyncio.run(call())
+    assert time.monotonic() - started < 1.5
+
+
+def test_timeout_without_run_keeps_transport_error(client):
+    client.timeout = 0.3
+    with pytest.raises(Exception) as info:
+        client.chat("m", MESSAGES)
+    assert not isinstance(info.value, RunDeadlineExceeded)
+
+
+def test_cancel_run_aborts_the_pipeline(orchestrator, monkeypatch):
+    async def slow(*args):
+        await asyncio.sleep(5)
+
+    async def scenario():
+        monkeypatch.setattr(orchestrator, "_arun", slow)
+        asyncio.get_running_loop().call_later(0.1, orchestrator.cancel_run, "r1")
+        started = time.monotonic()
+        with pytest.raises(RunCancelled):
+            await orchestrator.arun("goal", run_id="r1")
+        assert time.monotonic() - started < 1.5
+        assert not orchestrator.active_runs
+        assert not orchestrator.cancel_run("r1")
+
+    asyncio.run(scenario())
+
+
+def test_deadline_and_budget_aborts_have_their_own_run_status(orchestrator, monkeypatch):
+    async def slow(*args):
+        await asyncio.sleep(5)
+
+    async def over_budget(*args):
+        raise RunBudgetExceeded("budget")
+
+    before = {status: _runs(status) for status in ("deadline", "budget", "error")}
+    monkeypatch.setattr(orchestrator, "_arun", slow)
+    with pytest.raises(RunDeadlineExceeded):
+        asyncio.run(orchestrator.arun("goal", timeout=0.1))
+    monkeypatch.setattr(orchestrator, "_arun", over_budget)
+    with pytest.raises(RunBudgetExceeded):
+        asyncio.run(orchestrator.arun("goal"))
+
+    assert _runs("deadline") == before["deadline"] + 1
+    assert _runs("budget") == before["budget"] + 1
+    assert _runs("error") == before["error"]
+
+
+def test_duplicate_run_id_is_refused_without_a_trace(orchestrator, monkeypatch):
+    async def scenario():
+        release = asyncio.Event()
+
+        async def blocked(*args):
+            await release.wait()
+            return {}
+
+        monkeypatch.setattr(orchestrator, "_arun", blocked)
+        first = asyncio.ensure_future(orchestrator.arun("goal", run_id="r1"))
+        await asyncio.sleep(0)
+        traces = list(orchestrator.traces)
+        with pytest.raises(RunIdInUse):
+            await orchestrator.arun("goal", run_id="r1")
+        assert list(orchestrator.traces) == traces
+        release.set()
+        return await first
+
+    assert asyncio.run(scenario())["run_id"] == "r1"
@@ -0,0 +1,78 @@
+import threading
+import time
+
+from utils.rwlock import ReadWriteLock
+
+
+def test_readers_share_the_lock():
+    lock = ReadWriteLock()
+    inside = threading.Barrier(3, timeout=2)
+
+    def reader():
+        with lock.read():
+            # Fails with BrokenBarrierError unless all three readers hold the lock together.
+            inside.wait()
+
+    threads = [threading.Thread(target=reader) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=3)
+    assert not inside.broken
+
+
+def test_waiting_writer_goes_before_new_readers():
+    lock = ReadWriteLock()
+    order = []
+    first_reader = threading.Event()
+    release_reader = threading.Event()
+
+    def long_reader():
+        with lock.read():
+            first_reader.set()
+            release_reader.wait(2)
+        order.append("reader-1 out")
+
+    def writer():
+        with lock.write():
+            order.append("writer")
+
+    def late_reader():
+        with lock.read():
+            order.append("reader-2")
+
+    threads = [threading.Thread(target=long_reader)]
+    threads[0].start()
+    first_reader.wait(2)
+    threads.append(threading.Thread(target=writer))
+    threads[1].start()
+    time.sleep(0.05)
+    threads.append(threading.Thread(target=late_reader))
+    threads[2].start()
+    time.sleep(0.05)
+    # The late reader queues behind the waiting writer instead of joining the first reader.
+    assert order == []
+    release_reader.set()
+    for thread in threads:
+        thread.join(timeout=2)
+    assert order.index("writer") < order.index("reader-2")
+
+
+def test_writers_are_exclusive():
+    lock = ReadWriteLock()
+    counter = {"value": 0, "max_inside": 0, "inside": 0}
+
+    def writer():
+        for _ in range(200):
+            with lock.write():
+                counter["inside"] += 1
+                counter["max_inside"] = max(counter["max_inside"], counter["inside"])
+                counter["value"] += 1
+                counter["inside"] -= 1
+
+    threads = [threading.Thread(target=writer) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert counter["value"] == 800 and counter["max_inside"] == 1
@@ -0,0 +1,162 @@
+import os
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from utils.vector_index import VectorIndex  # noqa: E402
+
+DIM = 8
+CONCEPTS = (("car", "automobile", "engine"), ("bread", "oven", "flour"))
+
+
+def _vector(seed):
+    return np.random.default_rng(seed).standard_normal(DIM).tolist()
+
+
+def _concept_embedder(calls):
+    def embed(text):
+        calls.append(text)
+        vector = [0.0] * DIM
+        for axis, words in enumerate(CONCEPTS):
+            vector[axis] = float(sum(word in text.lower() for word in words))
+        vector[-1] = 0.1
+        return vector
+
+    return embed
+
+
+def _matrix_bytes(path):
+    return sum(os.path.getsize(p) for p in path.parent.glob(f"{path.stem}*{path.suffix}"))
+
+
+def test_search_ranks_candidate_rows_by_cosine_similarity(tmp_path):
+    index = VectorIndex(tmp_path / "store.vectors.f32")
+    rows = [index.append(_vector(seed)) for seed in range(50)]
+
+    best = index.search(_vector(7), rows, 3)
+
+    assert best[0][0] == 7 and best[0][1] == pytest.approx(1.0, abs=1e-5)
+    assert [similarity for _, similarity in best] == sorted((similarity for _, similarity in best), reverse=True)
+    # Only the given rows are candidates.
+    assert 7 not in [row for row, _ in index.search(_vector(7), rows[10:], 3)]
+
+
+def test_vectors_are_read_back_from_disk(tmp_path):
+    path = tmp_path / "store.vectors.f32"
+    index = VectorIndex(path)
+    for seed in range(5):
+        index.append(_vector(seed))
+
+    reopened = VectorIndex(path, dim=DIM)
+
+    assert reopened.rows == 5
+    assert reopened.search(_vector(3), list(range(5)), 1)[0][0] == 3
+    with pytest.raises(ValueError):
+        reopened.append([1.0, 2.0])
+
+
+def test_semantic_recall_finds_a_paraphrase_without_re_embedding(make_memory_store):
+    calls = []
+    store = make_memory_store(embedder=_concept_embedder(calls), embedding_model="test")
+    store.remember(goal="Fix the car engine", context="", constraints="", notes="", response="garage", conversation_id="chat")
+    for index in range(6):
+        time.sleep(0.001)
+        store.remember(goal=f"Bake bread {index}", context="", constraints="", notes="", response=f"oven {index}", conversation_id="chat")
+    embedded = len(calls)
+
+    reopened = make_memory_store(embedder=_concept_embedder(calls), embedding_model="test")
+    recalled = reopened.recall("My automobile makes noise", "", limit=1, conversation_id="chat")
+
+    assert [entry.response for entry in recalled] == ["garage"]
+    # Only the query was embedded after the restart.
+    assert len(calls) == embedded + 1
+
+
+def test_compact_shrinks_file_and_keeps_row_numbers(tmp_path):
+    path = tmp_path / "store.vectors.f32"
+    index = VectorIndex(path)
+    rows = [index.append(_vector(seed)) for seed in range(100)]
+    keep = rows[::10]
+
+    assert index.compact(keep) == 90
+
+    assert _matrix_bytes(path) == len(keep) * DIM * 4
+    for seed in (0, 30, 90):
+        assert index.search(_vector(seed), rows, 1)[0][0] == seed
+    # Dropped rows are no longer candidates.
+    assert index.search(_vector(5), [5], 1) == []
+    assert not index.contains(5) and index.contains(50)
+    # New rows keep counting after the compacted ones.
+    assert index.append(_vector(100)) == 100
+
+
+def test_compacted_index_reopens_from_disk(tmp_path):
+    path = tmp_path / "store.vectors.f32"
+    index = VectorIndex(path)
+    rows = [index.append(_vector(seed)) for seed in range(20)]
+    index.compact([3, 7, 15])
+    index.compact([7, 15])
+    index.append(_vector(20))
+
+    reopened = VectorIndex(path, dim=DIM)
+
+    assert reopened.rows == 21
+    assert [reopened.contains(row) for row in (3, 7, 15, 20)] == [False, True, True, True]
+    assert reopened.search(_vector(15), [*rows, 20], 1)[0][0] == 15
+    assert reopened.search(_vector(20), [*rows, 20], 1)[0][0] == 20
+    # Only the current generation of the matrix is left on disk.
+    assert sorted(p.name for p in tmp_path.glob("store.vectors*.f32")) == ["store.vectors.2.f32"]
+
+
+def test_rows_appended_after_snapshot_survive_compaction(tmp_path):
+    index = VectorIndex(tmp_path / "store.vectors.f32")
+    for seed in range(10):
+        index.append(_vector(seed))
+    since = index.rows
+    late = index.append(_vector(10))
+
+    index.compact([], since=since)
+
+    assert index.contains(late)
+    assert index.search(_vector(10), [late], 1)[0][0] == late
+
+
+def test_legacy_file_without_mapping(tmp_path):
+    path = tmp_path / "store.vectors.f32"
+    vectors = np.asarray([_vector(seed) for seed in range(5)], dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    path.write_bytes(vectors.tobytes())
+
+    index = VectorIndex(path, dim=DIM)
+
+    assert index.rows == 5
+    assert index.search(_vector(3), list(range(5)), 1)[0][0] == 3
+    assert index.append(_vector(5)) == 5
+
+
+def test_memory_compaction_drops_vectors_of_removed_entries(make_memory_store, tmp_path):
+    store = make_memory_store(
+        long_term_limit=500,
+        compact_keep_recent=5,
+        compact_batch=10,
+        embedder=lambda text: _vector(abs(hash(text)) % 10_000),
+        embedding_model="test",
+    )
+    for index in range(30):
+        store.remember(goal=f"goal {index}", context="", constraints="", notes="", response=f"r{index}", conversation_id="chat")
+        time.sleep(0.001)
+    vector_path = tmp_path / "memory.vectors.f32"
+    assert _matrix_bytes(vector_path) == 30 * DIM * 4
+
+    stats = store.compact(lambda previous, responses: f"summary of {len(responses)}")
+
+    assert stats["summarized"] == 25
+    # Five raw entries and the last rolling summary still have a vector.
+    live = store.backend.live_vector_rows()
+    assert len(live) == 6
+    assert _matrix_bytes(vector_path) == len(live) * DIM * 4
+    assert all(store.vectors.contains(row) for row in live)
+    _, _, recalled = store.build_context("goal 29", "", conversation_id="chat")
+    assert "r29" in [entry.response for entry in recalled]
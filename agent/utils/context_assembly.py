@@ -0,0 +1,167 @@
+import re
+from dataclasses import dataclass, field
+from typing import Callable, List, Set
+
+from models.tasks import Task
+
+_FENCED_BLOCK = re.compile(r"```[^\n]*\n[\s\S]*?```")
+_CODE_LINE = re.compile(
+    r"^\s*(def |class |async def |import |from \S+ import |function |const |let |var |public |private |"
+    r"protected |#include|return\b|@\w+)|[;{}]\s*$|^\s{4,}\S"
+)
+_WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_]{2,}")
+TRUNCATION_MARK = "... (tronque)"
+
+
+@dataclass
+class ContextBlock:
+    kind: str  # "code" | "text"
+    text: str
+    tokens: int
+    position: int
+    words: Set[str] = field(default_factory=set)
+
+
+@dataclass
+class PreparedContext:
+    """Context split once per run into code and prose blocks, each measured in tokens."""
+
+    blocks: List[ContextBlock] = field(default_factory=list)
+
+    @property
+    def code_tokens(self) -> int:
+        return sum(block.tokens for block in self.blocks if block.kind == "code")
+
+    @property
+    def text_tokens(self) -> int:
+        return sum(block.tokens for block in self.blocks if block.kind == "text")
+
+
+@dataclass
+class AssembledContext:
+    project_context: str
+    existing_code: str
+    text_tokens: int
+    code_tokens: int
+    dropped_blocks: int = 0
+    truncated: bool = False
+
+
+class ContextAssembler:
+    """
+    Split a run context into prose (project context) and code (existing code) and fit each part
+    into its own token budget for the executor prompt, instead of sending the whole context twice.
+    Blocks are ranked by word overlap with the task and kept in their original order. A block
+    that does not fit in the remaining budget is dropped whole (a smaller one ranked after it may
+    still fit); only when the most relevant block alone exceeds the budget is it truncated to fit.
+    A budget of 0 disables the limit.
+    """
+
+    def __init__(self, count_tokens: Callable[[str], int], text_budget: int = 1500, code_budget: int = 3000) -> None:
+        self.count_tokens = count_tokens
+        self.text_budget = max(0, text_budget)
+        self.code_budget = max(0, code_budget)
+
+    def prepare(self, context: str) -> PreparedContext:
+        blocks: List[ContextBlock] = []
+        for kind, text in self._split(context or ""):
+            blocks.append(
+                ContextBlock(
+                    kind=kind,
+                    text=text,
+                    tokens=self.count_tokens(text),
+                    position=len(blocks),
+                    words={word.lower() for word in _WORD.findall(text)},
+                )
+            )
+        return PreparedContext(blocks=blocks)
+
+    def assemble(self, prepared: PreparedContext, task: Task | None = None) -> AssembledContext:
+        task_words: Set[str] = set()
+        if task is not None:
+            task_text = " ".join([task.title, task.description, task.input, task.output])
+            task_words = {word.lower() for word in _WORD.findall(task_text)}
+
+        text_parts, text_tokens, text_dropped, text_cut = self._fit(prepared, "text", self.text_budget, task_words)
+        code_parts, code_tokens, code_dropped, code_cut = self._fit(prepared, "code", self.code_budget, task_words)
+        return AssembledContext(
+            project_context="\n\n".join(text_parts),
+            existing_code="\n\n".join(code_parts),
+            text_tokens=text_tokens,
+            code_tokens=code_tokens,
+            dropped_blocks=text_dropped + code_dropped,
+            truncated=text_cut or code_cut,
+        )
+
+    # Internal helpers ----------------------------------------------------------
+    def _split(self, context: str) -> List[tuple[str, str]]:
+        parts: List[tuple[str, str]] = []
+        cursor = 0
+        for match in _FENCED_BLOCK.finditer(context):
+            parts.extend(self._split_paragraphs(context[cursor:match.start()]))
+            parts.append(("code", match.group(0).strip()))
+            cursor = match.end()
+        parts.extend(self._split_paragraphs(context[cursor:]))
+        return parts
+
+    def _split_paragraphs(self, text: str) -> List[tuple[str, str]]:
+        """Unfenced text: paragraphs whose lines mostly look like code are treated as code."""
+        parts: List[tuple[str, str]] = []
+        for paragraph in re.split(r"\n\s*\n", text):
+            paragraph = paragraph.strip("\n")
+            if not paragraph.strip():
+                continue
+            lines = [line for line in paragraph.splitlines() if line.strip()]
+            code_lines = sum(1 for line in lines if _CODE_LINE.search(line))
+            kind = "code" if len(lines) >= 2 and code_lines / len(lines) >= 0.6 else "text"
+            if parts and parts[-1][0] == kind:
+                # Merge consecutive paragraphs of the same kind to keep blocks meaningful.
+                parts[-1] = (kind, f"{parts[-1][1]}\n\n{paragraph}")
+            else:
+                parts.append((kind, paragraph))
+        return parts
+
+    def _fit(
+        self,
+        prepared: PreparedContext,
+        kind: str,
+        budget: int,
+        task_words: Set[str],
+    ) -> tuple[List[str], int, int, bool]:
+        candidates = [block for block in prepared.blocks if block.kind == kind]
+        if not budget:
+            return [block.text for block in candidates], sum(block.tokens for block in candidates), 0, False
+
+        ranked = sorted(candidates, key=lambda block: (-len(block.words & task_words), block.position))
+        selected: List[tuple[int, str]] = []
+        used = 0
+        truncated = False
+        for block in ranked:
+            remaining = budget - used
+            if remaining <= 0:
+                break
+            if block.tokens <= remaining:
+                selected.append((block.position, block.text))
+                used += block.tokens
+            elif not selected:
+                # The most relevant block alone is over budget: keep its head rather than nothing.
+                head, head_tokens = self._truncate(block, remaining)
+                if head:
+                    selected.append((block.position, head))
+                    used += head_tokens
+                    truncated = True
+        selected.sort()
+        return [text for _, text in selected], used, len(candidates) - len(selected), truncated
+
+    def _truncate(self, block: ContextBlock, budget: int) -> tuple[str, int]:
+        lines = block.text.splitlines()
+        keep = max(1, int(len(lines) * budget / max(1, block.tokens)))
+        while keep > 0:
+            head = "\n".join(lines[:keep] + [TRUNCATION_MARK])
+            if block.kind == "code" and block.text.startswith("```"):
+                head += "\n```"
+            tokens = self.count_tokens(head)
+            if tokens <= budget:
+                return head, tokens
+            keep = min(keep - 1, int(keep * 0.9))
+        return "", 0
@@ -1,13 +1,16 @@
-import csv
+import atexit
 import hashlib
+import queue
 import threading
 import time
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Dict, List, Optional
 
-import tiktoken
+from utils.cost_store import COST_FIELDS, CostBackend, create_cost_backend
+
+_DEFAULT_ENCODING_KEY = "__cl100k_base__"
 
 
 @dataclass
@@ -28,40 +31,50 @@ class CostLogEntry:
 
 class CostLogger:
     """
-    Thread-safe CSV logger for model call costs/tokens.
+    Thread-safe logger for model call costs/tokens, stored by a pluggable backend
+    (`backend`: "csv" by default, "sqlite" or "parquet", see utils.cost_store).
+    With `async_accounting` (default), token counting and writes run on a single background
+    writer thread after the model call returned, so accounting adds no latency to the call itself.
+    Rows are queued in memory and written in batches, once `batch_size` rows are pending or
+    `flush_interval` seconds after the oldest one; `close()` writes the rest and fsyncs.
+    The CSV can be rotated when it exceeds `rotate_bytes` and/or when the UTC day changes.
     """
 
-    HEADERS = [
-        "timestamp",
-        "scenario_id",
-        "call_id",
-        "model",
-        "endpoint",
-        "prompt_hash",
-        "prompt_tokens",
-        "completion_tokens",
-        "total_tokens",
-        "latency_ms",
-        "status",
-        "notes",
-    ]
-
-    def __init__(self, path: str | Path = "costs.csv") -> None:
+    HEADERS = COST_FIELDS
+
+    def __init__(
+        self,
+        path: str | Path = "costs.csv",
+        async_accounting: bool = True,
+        batch_size: int = 64,
+        flush_interval: float = 1.0,
+        rotate_bytes: int = 0,
+        rotate_daily: bool = False,
+        backend: str | CostBackend = "csv",
+    ) -> None:
         self.path = Path(path)
         self.lock = threading.Lock()
-        self._ensure_header()
-
-    def _ensure_header(self) -> None:
-        if self.path.exists():
-            return
-        try:
-            self.path.parent.mkdir(parents=True, exist_ok=True)
-            with self.path.open("w", newline="", encoding="utf-8") as fp:
-                writer = csv.DictWriter(fp, fieldnames=self.HEADERS)
-                writer.writeheader()
-        except Exception:
-            # Logging failures must never break the agent.
-            return
+        self.async_accounting = async_accounting
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0.01, flush_interval)
+        # tiktoken encoders memoized per model; None caches a failed lookup (unknown model, offline).
+        self._encoders: Dict[str, Any] = {}
+        self._encoders_lock = threading.Lock()
+        # Per-template prompt/completion token totals for this process (see template_stats).
+        self._templates: Dict[str, Dict[str, int]] = {}
+        self._stats_lock = threading.Lock()
+        self._queue: "queue.SimpleQueue[tuple]" = queue.SimpleQueue()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        self._atexit_registered = False
+        # Set by close(): later rows are dropped instead of reopening the backend.
+        self._closed = False
+        self._drop_warned = False
+        self.backend = (
+            backend
+            if isinstance(backend, CostBackend)
+            else create_cost_backend(backend, self.path, rotate_bytes=rotate_bytes, rotate_daily=rotate_daily)
+        )
 
     def hash_prompt(self, prompt_text: str) -> str:
         try:
@@ -75,44 +88,197 @@ class CostLogger:
         """
         if not text:
             return 0
+        encoding = self.encoding_for(model)
+        if encoding is None:
+            # Fallback to a simple approximation when encoding is unknown.
+            return len(text.split())
         try:
-            try:
-                encoding = tiktoken.encoding_for_model(model)
-            except Exception:
-                encoding = tiktoken.get_encoding("cl100k_base")
             return len(encoding.encode(text))
         except Exception:
-            # Fallback to a simple approximation when encoding is unknown.
             return len(text.split())
 
+    def encoding_for(self, model: str) -> Any:
+        """
+        Return the memoized tiktoken encoding for `model` (cl100k_base for models tiktoken does
+        not know, e.g. Ollama tags), or None when tiktoken is unavailable. tiktoken is imported
+        lazily and every lookup, failures included, is done once per model.
+        """
+        key = model or ""
+        if key in self._encoders:
+            return self._encoders[key]
+        with self._encoders_lock:
+            if key not in self._encoders:
+                self._encoders[key] = self._load_encoding(key)
+            return self._encoders[key]
+
+    def _load_encoding(self, model: str) -> Any:
+        try:
+            import tiktoken
+        except Exception:
+            return None
+        try:
+            return tiktoken.encoding_for_model(model)
+        except Exception:
+            pass
+        if _DEFAULT_ENCODING_KEY not in self._encoders:
+            try:
+                self._encoders[_DEFAULT_ENCODING_KEY] = tiktoken.get_encoding("cl100k_base")
+            except Exception:
+                # Encoding files missing (offline): keep the whitespace approximation.
+                self._encoders[_DEFAULT_ENCODING_KEY] = None
+        return self._encoders[_DEFAULT_ENCODING_KEY]
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Write every row queued so far (blocks until the writer thread has done it)."""
+        done = threading.Event()
+        with self._writer_lock:
+            # Same lock as `close`: a flush queued after the stop marker would never be answered.
+            if self._writer is None:
+                return
+            self._queue.put(("flush", done))
+        done.wait(timeout)
+
+    def close(self) -> None:
+        """
+        Write pending rows, sync the backend to disk and stop the writer thread. Idempotent;
+        rows logged afterwards are dropped.
+        """
+        with self._writer_lock:
+            if self._closed:
+                return
+            self._closed = True
+            writer, self._writer = self._writer, None
+            if self._atexit_registered:
+                atexit.unregister(self.close)
+                self._atexit_registered = False
+        if writer is not None:
+            done = threading.Event()
+            self._queue.put(("stop", done))
+            done.wait()
+            writer.join(timeout=5)
+        self.backend.close()
+
+    def aggregates(
+        self,
+        scenario_id: Optional[str] = None,
+        model: Optional[str] = None,
+        since: Optional[str] = None,
+        max_scenarios: int = 50,
+    ) -> Dict[str, Any]:
+        """Latency percentiles, tokens/s and tokens per scenario over the stored rows (see aggregate_costs)."""
+        self.flush(timeout=5)
+        return self.backend.aggregates(scenario_id=scenario_id, model=model, since=since, max_scenarios=max_scenarios)
+
     def log(self, entry: CostLogEntry) -> None:
-        payload = {
-            "timestamp": entry.timestamp,
-            "scenario_id": entry.scenario_id,
-            "call_id": entry.call_id,
-            "model": entry.model,
-            "endpoint": entry.endpoint,
-            "prompt_hash": entry.prompt_hash,
-            "prompt_tokens": entry.prompt_tokens,
-            "completion_tokens": entry.completion_tokens,
-            "total_tokens": entry.total_tokens,
-            "latency_ms": entry.latency_ms,
-            "status": entry.status,
-            "notes": entry.notes,
-        }
+        if self.async_accounting:
+            self._dispatch(lambda: entry)
+            return
+        if self._closed:
+            self._drop()
+            return
+        self._record_template(entry)
+        self._write_rows([entry])
+
+    def _dispatch(self, build: Callable[..., CostLogEntry], *args: Any) -> None:
+        """Run `build(*args)` (counting tokens if needed) and log its entry, inline or on the writer."""
+        if not self.async_accounting:
+            self.log(build(*args))
+            return
+        # Checked and queued under the lock `close` takes before queueing its stop marker, so a
+        # row is either written or dropped, never left behind the marker.
+        with self._writer_lock:
+            if self._ensure_writer():
+                self._queue.put(("row", build, args))
+                return
+        self._drop()
+
+    def _drop(self) -> None:
+        if not self._drop_warned:
+            self._drop_warned = True
+            print("[Costs] Journal des couts ferme: les appels suivants ne sont plus enregistres.", flush=True)
+
+    def _ensure_writer(self) -> bool:
+        """Start the writer thread if needed; False once the logger is closed. Caller holds `_writer_lock`."""
+        if self._closed:
+            return False
+        if self._writer is None:
+            # Daemon thread so it never blocks interpreter exit; atexit still drains the queue.
+            writer = threading.Thread(target=self._writer_loop, name="cost-logger", daemon=True)
+            writer.start()
+            self._writer = writer
+            if not self._atexit_registered:
+                atexit.register(self.close)
+                self._atexit_registered = True
+        return True
+
+    def _writer_loop(self) -> None:
+        pending: List[CostLogEntry] = []
+        oldest = 0.0
+        while True:
+            timeout = max(0.0, oldest + self.flush_interval - time.monotonic()) if pending else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = ("timeout",)
+            kind = item[0]
+            if kind == "row":
+                try:
+                    entry = item[1](*item[2])
+                except Exception:
+                    entry = None
+                if entry is not None:
+                    self._record_template(entry)
+                    if not pending:
+                        oldest = time.monotonic()
+                    pending.append(entry)
+                if len(pending) < self.batch_size:
+                    continue
+            if pending:
+                self._write_rows(pending)
+                pending = []
+            if kind in ("flush", "stop"):
+                item[1].set()
+            if kind == "stop":
+                return
+
+    def _write_rows(self, entries: List[CostLogEntry]) -> None:
         try:
-            with self.lock:
-                exists = self.path.exists()
-                self.path.parent.mkdir(parents=True, exist_ok=True)
-                with self.path.open("a", newline="", encoding="utf-8") as fp:
-                    writer = csv.DictWriter(fp, fieldnames=self.HEADERS)
-                    if not exists:
-                        writer.writeheader()
-                    writer.writerow(payload)
+            self.backend.write(entries)
         except Exception:
-            # CSV write must be non-blocking for the rest of the app.
+            # Cost logging must never break the agent.
             return
 
+    def template_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Token usage per prompt template since start-up. The template is the call label that
+        prefixes `notes` (e.g. "reviewer.review", "critic.evaluate_incremental").
+        Cache hits are counted apart since they cost no prompt evaluation.
+        """
+        with self._stats_lock:
+            return {
+                template: {
+                    **totals,
+                    "avg_prompt_tokens": round(totals["prompt_tokens"] / totals["calls"], 1) if totals["calls"] else 0.0,
+                }
+                for template, totals in self._templates.items()
+            }
+
+    def _record_template(self, entry: CostLogEntry) -> None:
+        template = (entry.notes or "").split(" ", 1)[0].strip() or "unknown"
+        with self._stats_lock:
+            totals = self._templates.setdefault(
+                template,
+                {"calls": 0, "cache_hits": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0},
+            )
+            if entry.status == "cache_hit":
+                totals["cache_hits"] += 1
+            elif entry.status.startswith("error"):
+                totals["errors"] += 1
+            else:
+                totals["calls"] += 1
+                totals["prompt_tokens"] += entry.prompt_tokens
+                totals["completion_tokens"] += entry.completion_tokens
+
     def build_entry(
         self,
         scenario_id: str,
@@ -125,10 +291,11 @@ class CostLogger:
         latency_ms: int,
         status: str,
         notes: str = "",
+        timestamp: Optional[datetime] = None,
     ) -> CostLogEntry:
         total = max(0, prompt_tokens) + max(0, completion_tokens)
         return CostLogEntry(
-            timestamp=datetime.utcnow().isoformat() + "Z",
+            timestamp=(timestamp or datetime.utcnow()).isoformat() + "Z",
             scenario_id=scenario_id or "unknown",
             call_id=call_id,
             model=model,
@@ -149,53 +316,122 @@ class CostLogger:
         model: str,
         endpoint: str,
         prompt_hash: str,
-        prompt_tokens: int,
+        prompt_tokens: Optional[int],
         latency_ms: int,
         error: Exception,
         notes: str = "",
+        prompt_text: str = "",
+    ) -> None:
+        """`prompt_tokens=None` counts `prompt_text` (off the caller's thread when asynchronous)."""
+        self._dispatch(
+            self._build_failure,
+            datetime.utcnow(),
+            scenario_id,
+            call_id,
+            model,
+            endpoint,
+            prompt_hash,
+            prompt_tokens,
+            prompt_text,
+            latency_ms,
+            error,
+            notes,
+        )
+
+    def log_success(
+        self,
+        scenario_id: str,
+        call_id: str,
+        model: str,
+        endpoint: str,
+        prompt_hash: str,
+        prompt_tokens: Optional[int],
+        completion_tokens: Optional[int],
+        latency_ms: int,
+        status: str = "success",
+        notes: str = "",
+        prompt_text: str = "",
+        completion_text: str = "",
     ) -> None:
+        """Token counts left to None are computed from `prompt_text` / `completion_text`."""
+        self._dispatch(
+            self._build_success,
+            datetime.utcnow(),
+            scenario_id,
+            call_id,
+            model,
+            endpoint,
+            prompt_hash,
+            prompt_tokens,
+            prompt_text,
+            completion_tokens,
+            completion_text,
+            latency_ms,
+            status,
+            notes,
+        )
+
+    def _build_failure(
+        self,
+        timestamp: datetime,
+        scenario_id: str,
+        call_id: str,
+        model: str,
+        endpoint: str,
+        prompt_hash: str,
+        prompt_tokens: Optional[int],
+        prompt_text: str,
+        latency_ms: int,
+        error: Exception,
+        notes: str,
+    ) -> CostLogEntry:
         status = f"error:{error.__class__.__name__}"
         merged_notes = f"{notes} | {error}".strip(" |")
-        entry = self.build_entry(
+        return self.build_entry(
             scenario_id=scenario_id,
             call_id=call_id,
             model=model,
             endpoint=endpoint,
             prompt_hash=prompt_hash,
-            prompt_tokens=prompt_tokens,
+            prompt_tokens=self.count_tokens(model, prompt_text) if prompt_tokens is None else prompt_tokens,
             completion_tokens=0,
             latency_ms=latency_ms,
             status=status,
             notes=merged_notes,
+            timestamp=timestamp,
         )
-        self.log(entry)
 
-    def log_success(
+    def _build_success(
         self,
+        timestamp: datetime,
         scenario_id: str,
         call_id: str,
         model: str,
         endpoint: str,
         prompt_hash: str,
-        prompt_tokens: int,
-        completion_tokens: int,
+        prompt_tokens: Optional[int],
+        prompt_text: str,
+        completion_tokens: Optional[int],
+        completion_text: str,
         latency_ms: int,
-        status: str = "success",
-        notes: str = "",
-    ) -> None:
-        entry = self.build_entry(
+        status: str,
+        notes: str,
+    ) -> CostLogEntry:
+        return self.build_entry(
             scenario_id=scenario_id,
             call_id=call_id,
             model=model,
             endpoint=endpoint,
             prompt_hash=prompt_hash,
-            prompt_tokens=prompt_tokens,
-            completion_tokens=completion_tokens,
+            prompt_tokens=self.count_tokens(model, prompt_text) if prompt_tokens is None else prompt_tokens,
+            completion_tokens=(
+                self.count_tokens(model, completion_text) if completion_tokens is None else completion_tokens
+            ),
             latency_ms=latency_ms,
             status=status or "success",
             notes=notes,
+            timestamp=timestamp,
         )
-        self.log(entry)
 
 
 def utc_ms() -> int:
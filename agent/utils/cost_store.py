@@ -0,0 +1,659 @@
+import csv
+import io
+import json
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, List, Optional, Tuple
+
+COST_FIELDS = [
+    "timestamp",
+    "scenario_id",
+    "call_id",
+    "model",
+    "endpoint",
+    "prompt_hash",
+    "prompt_tokens",
+    "completion_tokens",
+    "total_tokens",
+    "latency_ms",
+    "status",
+    "notes",
+]
+_INT_FIELDS = ("prompt_tokens", "completion_tokens", "total_tokens", "latency_ms")
+COST_BACKENDS = ("csv", "sqlite", "parquet")
+
+
+def _row_of(entry: Any) -> Dict[str, Any]:
+    return asdict(entry) if hasattr(entry, "__dataclass_fields__") else dict(entry)
+
+
+def _matches(row: Dict[str, Any], scenario_id: Optional[str], model: Optional[str], since: Optional[str]) -> bool:
+    if scenario_id and row.get("scenario_id") != scenario_id:
+        return False
+    if model and row.get("model") != model:
+        return False
+    if since and str(row.get("timestamp", "")) < since:
+        return False
+    return True
+
+
+def _percentile(sorted_values: List[int], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = pct / 100 * (len(sorted_values) - 1)
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return round(sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low), 1)
+
+
+def aggregate_costs(rows: Iterable[Dict[str, Any]], max_scenarios: int = 50) -> Dict[str, Any]:
+    """
+    Aggregates of cost rows: latency p50/p95, completion tokens per second (model calls only,
+    cache hits and errors are counted apart), totals per model and per scenario.
+    """
+    latencies: Dict[str, List[int]] = {}
+    by_model: Dict[str, Dict[str, float]] = {}
+    by_scenario: Dict[str, Dict[str, Any]] = {}
+    totals = {"calls": 0, "cache_hits": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0}
+    busy_ms = 0
+    for row in rows:
+        status = str(row.get("status") or "")
+        model = str(row.get("model") or "unknown")
+        scenario = by_scenario.setdefault(
+            str(row.get("scenario_id") or "unknown"),
+            {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "last_seen": ""},
+        )
+        scenario["last_seen"] = max(scenario["last_seen"], str(row.get("timestamp") or ""))
+        if status == "cache_hit":
+            totals["cache_hits"] += 1
+            continue
+        if status.startswith("error"):
+            totals["errors"] += 1
+            continue
+        prompt_tokens = int(row.get("prompt_tokens") or 0)
+        completion_tokens = int(row.get("completion_tokens") or 0)
+        latency = int(row.get("latency_ms") or 0)
+        totals["calls"] += 1
+        totals["prompt_tokens"] += prompt_tokens
+        totals["completion_tokens"] += completion_tokens
+        busy_ms += latency
+        latencies.setdefault(model, []).append(latency)
+        stats = by_model.setdefault(model, {"calls": 0, "completion_tokens": 0, "busy_ms": 0})
+        stats["calls"] += 1
+        stats["completion_tokens"] += completion_tokens
+        stats["busy_ms"] += latency
+        scenario["calls"] += 1
+        scenario["prompt_tokens"] += prompt_tokens
+        scenario["completion_tokens"] += completion_tokens
+        scenario["total_tokens"] += prompt_tokens + completion_tokens
+
+    all_latencies = sorted(value for values in latencies.values() for value in values)
+    models: Dict[str, Dict[str, float]] = {}
+    for model, stats in by_model.items():
+        values = sorted(latencies[model])
+        models[model] = {
+            "calls": stats["calls"],
+            "completion_tokens": stats["completion_tokens"],
+            "latency_p50_ms": _percentile(values, 50),
+            "latency_p95_ms": _percentile(values, 95),
+            "tokens_per_second": round(stats["completion_tokens"] * 1000 / stats["busy_ms"], 2) if stats["busy_ms"] else 0.0,
+        }
+    scenarios = sorted(by_scenario.items(), key=lambda item: item[1]["last_seen"], reverse=True)[: max(1, max_scenarios)]
+    return {
+        **totals,
+        "latency_p50_ms": _percentile(all_latencies, 50),
+        "latency_p95_ms": _percentile(all_latencies, 95),
+        "tokens_per_second": round(totals["completion_tokens"] * 1000 / busy_ms, 2) if busy_ms else 0.0,
+        "by_model": models,
+        "by_scenario": dict(scenarios),
+    }
+
+
+class CostBackend:
+    """Storage of cost rows. `write` receives batches from the CostLogger writer (or caller) thread."""
+
+    def write(self, entries: List[Any]) -> None:
+        raise NotImplementedError
+
+    def rows(
+        self,
+        scenario_id: Optional[str] = None,
+        model: Optional[str] = None,
+        since: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def aggregates(
+        self,
+        scenario_id: Optional[str] = None,
+        model: Optional[str] = None,
+        since: Optional[str] = None,
+        max_scenarios: int = 50,
+    ) -> Dict[str, Any]:
+        """See aggregate_costs; backends able to aggregate where the rows live override this."""
+        return aggregate_costs(self.rows(scenario_id=scenario_id, model=model, since=since), max_scenarios=max_scenarios)
+
+    def close(self) -> None:
+        return None
+
+
+@dataclass
+class _CsvSegment:
+    """Rows parsed so far from one CSV file, identified by device and inode."""
+
+    offset: int = 0
+    # First bytes of the file, to tell it apart from a later file reusing the inode.
+    head: bytes = b""
+    rows: List[Dict[str, Any]] = field(default_factory=list)
+
+
+class CsvCostBackend(CostBackend):
+    """
+    Append-only CSV (the historical format). The handle stays open between batches and the file
+    can be rotated by size and/or UTC day. Reads cover the current file and its rotated
+    `<stem>-AAAAMMJJ*.csv` siblings. They are incremental: files are tracked by inode, so a
+    rotated file keeps its parsed rows and only bytes appended since the previous query are
+    parsed. At most `max_cached_rows` parsed rows are kept (least recently read files dropped
+    first); files beyond that are parsed again on each query.
+    """
+
+    HEAD_BYTES = 256
+
+    def __init__(
+        self,
+        path: str | Path,
+        rotate_bytes: int = 0,
+        rotate_daily: bool = False,
+        max_cached_rows: int = 200_000,
+    ) -> None:
+        self.path = Path(path)
+        self.rotate_bytes = max(0, rotate_bytes)
+        self.rotate_daily = rotate_daily
+        self.max_cached_rows = max(0, max_cached_rows)
+        self.lock = threading.Lock()
+        self._fp: Optional[IO[str]] = None
+        self._file_day: Optional[str] = None
+        self._segments: "OrderedDict[Tuple[int, int], _CsvSegment]" = OrderedDict()
+        self._rotated_name = re.compile(
+            rf"{re.escape(self.path.stem)}-\d{{8}}(-\d{{6}})?(-\d+)?{re.escape(self.path.suffix)}"
+        )
+        self._ensure_header()
+
+    def _ensure_header(self) -> None:
+        if self.path.exists():
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("w", newline="", encoding="utf-8") as fp:
+                writer = csv.DictWriter(fp, fieldnames=COST_FIELDS)
+                writer.writeheader()
+        except Exception:
+            # Logging failures must never break the agent.
+            return
+
+    def write(self, entries: List[Any]) -> None:
+        try:
+            with self.lock:
+                self._rotate_if_needed()
+                fp = self._open_file()
+                writer = csv.DictWriter(fp, fieldnames=COST_FIELDS)
+                writer.writerows(_row_of(entry) for entry in entries)
+                fp.flush()
+        except Exception:
+            # CSV write must be non-blocking for the rest of the app.
+            with self.lock:
+                self._close_file(sync=False)
+
+    def rows(
+        self,
+        scenario_id: Optional[str] = None,
+        model: Optional[str] = None,
+        since: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        selected: List[Dict[str, Any]] = []
+        with self.lock:
+            seen = set()
+            for path in self._files():
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                key = (stat.st_dev, stat.st_ino)
+                seen.add(key)
+                if since and path != self.path:
+                    # A rotated file holds no row newer than its last write.
+                    last_write = datetime.utcfromtimestamp(stat.st_mtime).isoformat() + "Z"
+                    if last_write < since:
+                        continue
+                rows = self._read_file(path, key, stat.st_size)
+                selected.extend(row for row in rows if _matches(row, scenario_id, model, since))
+            for key in [key for key in self._segments if key not in seen]:
+                # Deleted files.
+                del self._segments[key]
+        return selected
+
+    def close(self) -> None:
+        with self.lock:
+            self._close_file(sync=True)
+
+    # Internal helpers ----------------------------------------------------------
+    def _files(self) -> List[Path]:
+        """Rotated files (oldest first), then the current one."""
+        try:
+            rotated = sorted(
+                path for path in self.path.parent.iterdir() if self._rotated_name.fullmatch(path.name)
+            )
+        except OSError:
+            rotated = []
+        return [*rotated, self.path]
+
+    def _read_file(self, path: Path, key: Tuple[int, int], size: int) -> List[Dict[str, Any]]:
+        # Caller holds self.lock.
+        segment = self._segments.pop(key, None)
+        try:
+            with path.open("rb") as fp:
+                head = fp.read(self.HEAD_BYTES)
+                if segment is None or size < segment.offset or not head.startswith(segment.head):
+                    # New file, truncated, or another file reusing the inode: parse from the start.
+                    segment = _CsvSegment()
+                if size > segment.offset:
+                    fp.seek(segment.offset)
+                    chunk = fp.read(size - segment.offset)
+                    complete = chunk[: chunk.rfind(b"\n") + 1]
+                    segment.offset += len(complete)
+                    segment.rows.extend(self._parse(complete))
+                segment.head = head[: segment.offset]
+        except OSError:
+            return segment.rows if segment is not None else []
+        self._segments[key] = segment
+        self._trim_cache()
+        return segment.rows
+
+    def _trim_cache(self) -> None:
+        # Caller holds self.lock. Least recently read files are dropped first.
+        cached = sum(len(segment.rows) for segment in self._segments.values())
+        while cached > self.max_cached_rows and self._segments:
+            _, segment = self._segments.popitem(last=False)
+            cached -= len(segment.rows)
+
+    def _parse(self, data: bytes) -> List[Dict[str, Any]]:
+        rows: List[Dict[str, Any]] = []
+        for record in csv.reader(io.StringIO(data.decode("utf-8", errors="replace"), newline="")):
+            if not record or record[0] == COST_FIELDS[0]:
+                continue
+            row: Dict[str, Any] = dict(zip(COST_FIELDS, record))
+            for name in _INT_FIELDS:
+                try:
+                    row[name] = int(row.get(name) or 0)
+                except ValueError:
+                    row[name] = 0
+            rows.append(row)
+        return rows
+
+    def _open_file(self) -> IO[str]:
+        # Caller holds self.lock. The handle stays open between batches.
+        if self._fp is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fresh = not self.path.exists() or self.path.stat().st_size == 0
+            self._fp = self.path.open("a", newline="", encoding="utf-8")
+            if fresh:
+                csv.DictWriter(self._fp, fieldnames=COST_FIELDS).writeheader()
+            self._file_day = self._file_date()
+        return self._fp
+
+    def _close_file(self, sync: bool) -> None:
+        if self._fp is None:
+            return
+        try:
+            self._fp.flush()
+            if sync:
+                os.fsync(self._fp.fileno())
+            self._fp.close()
+        except Exception:
+            pass
+        self._fp = None
+
+    def _file_date(self) -> str:
+        try:
+            return datetime.utcfromtimestamp(self.path.stat().st_mtime).strftime("%Y%m%d")
+        except Exception:
+            return datetime.utcnow().strftime("%Y%m%d")
+
+    def _rotate_if_needed(self) -> None:
+        """Caller holds self.lock. Move the current CSV aside when it is too big or from another day."""
+        if not (self.rotate_bytes or self.rotate_daily) or not self.path.exists():
+            return
+        today = datetime.utcnow().strftime("%Y%m%d")
+        file_day = self._file_day or self._file_date()
+        if self.rotate_daily and file_day != today:
+            suffix = file_day
+        elif self.rotate_bytes and self.path.stat().st_size >= self.rotate_bytes:
+            suffix = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+        else:
+            return
+        self._close_file(sync=True)
+        target = self.path.with_name(f"{self.path.stem}-{suffix}{self.path.suffix}")
+        counter = 1
+        while target.exists():
+            target = self.path.with_name(f"{self.path.stem}-{suffix}-{counter}{self.path.suffix}")
+            counter += 1
+        self.path.rename(target)
+
+
+class SqliteCostBackend(CostBackend):
+    """Cost rows in a SQLite table (WAL) indexed by scenario_id, model and timestamp."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS costs (
+                timestamp TEXT NOT NULL,
+                scenario_id TEXT NOT NULL,
+                call_id TEXT,
+                model TEXT NOT NULL,
+                endpoint TEXT,
+                prompt_hash TEXT,
+                prompt_tokens INTEGER NOT NULL DEFAULT 0,
+                completion_tokens INTEGER NOT NULL DEFAULT 0,
+                total_tokens INTEGER NOT NULL DEFAULT 0,
+                latency_ms INTEGER NOT NULL DEFAULT 0,
+                status TEXT,
+                notes TEXT
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_costs_scenario ON costs(scenario_id, timestamp)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_costs_model ON costs(model, timestamp)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_costs_timestamp ON costs(timestamp)")
+
+    def write(self, entries: List[Any]) -> None:
+        values = [tuple(_row_of(entry).get(name) for name in COST_FIELDS) for entry in entries]
+        try:
+            with self.lock:
+                self._conn.execute("BEGIN")
+                self._conn.executemany(
+                    f"INSERT INTO costs ({', '.join(COST_FIELDS)}) VALUES ({', '.join('?' for _ in COST_FIELDS)})",
+                    values,
+                )
+                self._conn.execute("COMMIT")
+        except Exception:
+            # Cost logging must never break the agent.
+            try:
+                self._conn.execute("ROLLBACK")
+            except Exception:
+                pass
+
+    def rows(
+        self,
+        scenario_id: Optional[str] = None,
+        model: Optional[str] = None,
+        since: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        clauses, params = self._filters(scenario_id, model, since)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self.lock:
+            cursor = self._conn.execute(f"SELECT {', '.join(COST_FIELDS)} FROM costs{where}", params)
+            return [dict(zip(COST_FIELDS, record)) for record in cursor.fetchall()]
+
+    def aggregates(
+        self,
+        scenario_id: Optional[str] = None,
+        model: Optional[str] = None,
+        since: Optional[str] = None,
+        max_scenarios: int = 50,
+    ) -> Dict[str, Any]:
+        """Same result as aggregate_costs, computed by SQLite (filters, sums and percentile ranks)."""
+        clauses, params = self._filters(scenario_id, model, since)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        calls_where = f" WHERE {' AND '.join([*clauses, self._CALL])}"
+        with self.lock:
+            cache_hits, errors = self._conn.execute(
+                f"SELECT COALESCE(SUM(status = 'cache_hit'), 0), COALESCE(SUM({self._ERROR}), 0) FROM costs{where}",
+                params,
+            ).fetchone()
+            calls, prompt_tokens, completion_tokens, busy_ms = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(prompt_tokens), 0), COALESCE(SUM(completion_tokens), 0), "
+                f"COALESCE(SUM(latency_ms), 0) FROM costs{calls_where}",
+                params,
+            ).fetchone()
+            by_model = self._conn.execute(
+                f"SELECT {self._MODEL}, COUNT(*), SUM(completion_tokens), SUM(latency_ms) FROM costs{calls_where} "
+                f"GROUP BY {self._MODEL}",
+                params,
+            ).fetchall()
+            scenarios = self._conn.execute(
+                f"SELECT COALESCE(NULLIF(scenario_id, ''), 'unknown') AS scenario, SUM({self._CALL}), "
+                f"SUM(CASE WHEN {self._CALL} THEN prompt_tokens ELSE 0 END), "
+                f"SUM(CASE WHEN {self._CALL} THEN completion_tokens ELSE 0 END), MAX(timestamp) "
+                f"FROM costs{where} GROUP BY scenario ORDER BY MAX(timestamp) DESC LIMIT ?",
+                [*params, max(1, max_scenarios)],
+            ).fetchall()
+            models: Dict[str, Dict[str, float]] = {}
+            for name, count, completion, busy in by_model:
+                model_where = f"{calls_where} AND {self._MODEL} = ?"
+                models[name] = {
+                    "calls": count,
+                    "completion_tokens": completion,
+                    "latency_p50_ms": self._percentile(model_where, [*params, name], count, 50),
+                    "latency_p95_ms": self._percentile(model_where, [*params, name], count, 95),
+                    "tokens_per_second": round(completion * 1000 / busy, 2) if busy else 0.0,
+                }
+            latency_p50 = self._percentile(calls_where, params, calls, 50)
+            latency_p95 = self._percentile(calls_where, params, calls, 95)
+        return {
+            "calls": calls,
+            "cache_hits": cache_hits,
+            "errors": errors,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "latency_p50_ms": latency_p50,
+            "latency_p95_ms": latency_p95,
+            "tokens_per_second": round(completion_tokens * 1000 / busy_ms, 2) if busy_ms else 0.0,
+            "by_model": models,
+            "by_scenario": {
+                scenario: {
+                    "calls": scenario_calls,
+                    "prompt_tokens": prompt,
+                    "completion_tokens": completion,
+                    "total_tokens": prompt + completion,
+                    "last_seen": last_seen or "",
+                }
+                for scenario, scenario_calls, prompt, completion, last_seen in scenarios
+            },
+        }
+
+    # Internal helpers ----------------------------------------------------------
+    # Row classes of aggregate_costs: cache hits and errors are not model calls.
+    _ERROR = "substr(COALESCE(status, ''), 1, 5) = 'error'"
+    _CALL = f"(COALESCE(status, '') != 'cache_hit' AND NOT {_ERROR})"
+    _MODEL = "COALESCE(NULLIF(model, ''), 'unknown')"
+
+    def _filters(
+        self, scenario_id: Optional[str], model: Optional[str], since: Optional[str]
+    ) -> Tuple[List[str], List[Any]]:
+        clauses: List[str] = []
+        params: List[Any] = []
+        for column, value, operator in (("scenario_id", scenario_id, "="), ("model", model, "="), ("timestamp", since, ">=")):
+            if value:
+                clauses.append(f"{column} {operator} ?")
+                params.append(value)
+        return clauses, params
+
+    def _percentile(self, where: str, params: List[Any], count: int, pct: float) -> float:
+        """Caller holds self.lock. Same interpolation as _percentile, reading only the two ranks needed."""
+        if not count:
+            return 0.0
+        rank = pct / 100 * (count - 1)
+        values = [
+            value
+            for (value,) in self._conn.execute(
+                f"SELECT latency_ms FROM costs{where} ORDER BY latency_ms LIMIT 2 OFFSET ?", [*params, int(rank)]
+            )
+        ]
+        return _percentile(values, (rank - int(rank)) * 100)
+
+    def close(self) -> None:
+        with self.lock:
+            try:
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                self._conn.close()
+            except Exception:
+                pass
+
+
+class ParquetCostBackend(CostBackend):
+    """
+    Parquet segments (one file per written batch) under `<dir>/date=YYYYMMDD/`, rows sorted by
+    scenario_id, model and timestamp so row-group statistics prune reads. Once a day folder holds
+    `merge_segments` files, the writer merges them into one `merged-*.parquet` file, which lists
+    its sources in its metadata so a crash before they are deleted never counts a row twice.
+    Reads push the filters down to pyarrow and keep nothing in memory. Requires `pyarrow`.
+    """
+
+    MERGED_FROM = b"mycodex.merged_from"
+
+    def __init__(self, path: str | Path, merge_segments: int = 32) -> None:
+        try:
+            import pyarrow as pa
+        except ImportError as exc:
+            raise RuntimeError("Le backend de couts parquet necessite pyarrow (pip install pyarrow).") from exc
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.merge_segments = max(2, merge_segments)
+        self.lock = threading.Lock()
+        self._sequence = 0
+        self._schema = pa.schema(
+            [(name, pa.int64() if name in _INT_FIELDS else pa.string()) for name in COST_FIELDS]
+        )
+
+    def write(self, entries: List[Any]) -> None:
+        import pyarrow as pa
+
+        rows = sorted(
+            (_row_of(entry) for entry in entries),
+            key=lambda row: (row["scenario_id"], row["model"], row["timestamp"]),
+        )
+        if not rows:
+            return
+        try:
+            table = pa.Table.from_pylist(rows, schema=self._schema)
+            with self.lock:
+                folder = self.path / f"date={datetime.utcnow().strftime('%Y%m%d')}"
+                self._publish(folder, "segment", table)
+                if len(self._live_files(folder)) >= self.merge_segments:
+                    self._merge(folder)
+        except Exception:
+            # Cost logging must never break the agent.
+            return
+
+    def rows(
+        self,
+        scenario_id: Optional[str] = None,
+        model: Optional[str] = None,
+        since: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        import pyarrow.parquet as pq
+
+        since_day = since[:10].replace("-", "") if since else ""
+        filters = [
+            (column, operator, value)
+            for column, value, operator in (("scenario_id", scenario_id, "=="), ("model", model, "=="), ("timestamp", since, ">="))
+            if value
+        ]
+        selected: List[Dict[str, Any]] = []
+        with self.lock:
+            for folder in sorted(self.path.glob("date=*")):
+                if since_day and folder.name.split("=", 1)[-1] < since_day:
+                    continue
+                for segment in self._live_files(folder):
+                    try:
+                        table = pq.read_table(segment, filters=filters or None)
+                    except Exception:
+                        continue
+                    selected.extend(table.to_pylist())
+        return selected
+
+    # Internal helpers ----------------------------------------------------------
+    def _publish(self, folder: Path, prefix: str, table: Any, metadata: Optional[Dict[bytes, bytes]] = None) -> Path:
+        # Caller holds self.lock.
+        import pyarrow.parquet as pq
+
+        self._sequence += 1
+        folder.mkdir(parents=True, exist_ok=True)
+        name = f"{prefix}-{datetime.utcnow().strftime('%H%M%S%f')}-{os.getpid()}-{self._sequence}.parquet"
+        tmp = folder / f".{name}.tmp"
+        if metadata:
+            table = table.replace_schema_metadata(metadata)
+        pq.write_table(table, tmp)
+        # Atomic publish: readers never see a partially written file.
+        os.replace(tmp, folder / name)
+        return folder / name
+
+    def _live_files(self, folder: Path) -> List[Path]:
+        """Caller holds self.lock. Files of `folder`, minus those already folded into a merged file."""
+        import pyarrow.parquet as pq
+
+        files = sorted(folder.glob("*.parquet"))
+        merged: set = set()
+        for path in files:
+            if path.name.startswith("merged-"):
+                try:
+                    metadata = pq.read_schema(path).metadata or {}
+                    merged.update(json.loads(metadata.get(self.MERGED_FROM, b"[]")))
+                except Exception:
+                    continue
+        return [path for path in files if path.name not in merged]
+
+    def _merge(self, folder: Path) -> None:
+        """Caller holds self.lock. Rewrite the live files of `folder` as one sorted file, then delete them."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        sources = self._live_files(folder)
+        # Files a previous merge could not delete stay listed, or they would be read again.
+        leftovers = [path for path in sorted(folder.glob("*.parquet")) if path not in sources]
+        tables = [pq.read_table(path).select(COST_FIELDS).cast(self._schema) for path in sources]
+        table = pa.concat_tables(tables).sort_by(
+            [("scenario_id", "ascending"), ("model", "ascending"), ("timestamp", "ascending")]
+        )
+        replaced = [*sources, *leftovers]
+        self._publish(folder, "merged", table, {self.MERGED_FROM: json.dumps([path.name for path in replaced]).encode()})
+        for path in replaced:
+            try:
+                path.unlink()
+            except OSError:
+                # Listed in the merged file, so skipped by readers until the next merge removes it.
+                pass
+
+
+def create_cost_backend(
+    kind: str,
+    path: str | Path,
+    rotate_bytes: int = 0,
+    rotate_daily: bool = False,
+) -> CostBackend:
+    """
+    Build the cost backend `kind` ("csv", "sqlite" or "parquet"). A `.csv` path given to another
+    backend is mapped next to it (`costs.csv` -> `costs.sqlite` / `costs_parquet/`).
+    """
+    kind = (kind or "csv").lower()
+    path = Path(path)
+    if kind == "sqlite":
+        return SqliteCostBackend(path.with_suffix(".sqlite") if path.suffix == ".csv" else path)
+    if kind == "parquet":
+        return ParquetCostBackend(path.with_name(f"{path.stem}_parquet") if path.suffix == ".csv" else path)
+    if kind != "csv":
+        raise ValueError(f"Backend de couts inconnu: {kind} (attendu: {', '.join(COST_BACKENDS)})")
+    return CsvCostBackend(path, rotate_bytes=rotate_bytes, rotate_daily=rotate_daily)
@@ -0,0 +1,61 @@
+import difflib
+from typing import Dict, List
+
+
+def _files_of(item: Dict[str, object]) -> Dict[str, str]:
+    execution = item.get("execution") or {}
+    return {
+        str(f["path"]): str(f["content"])
+        for f in execution.get("files") or []
+        if isinstance(f, dict) and "path" in f and "content" in f
+    }
+
+
+def diff_task_results(
+    before: List[Dict[str, object]],
+    after: List[Dict[str, object]],
+    context_lines: int = 3,
+) -> List[Dict[str, object]]:
+    """
+    Unified diffs of the files that changed between two lists of task results (matched by task id).
+    Returns one entry per changed task: id, title, the diffs of its modified/added/removed files
+    and the task review of the new version. Unchanged tasks and files are left out.
+    """
+    before_by_id = {(item.get("task") or {}).get("id"): item for item in before}
+    changes: List[Dict[str, object]] = []
+    for item in after:
+        task_data = item.get("task") or {}
+        previous = before_by_id.get(task_data.get("id"))
+        if previous is None:
+            continue
+        old_files = _files_of(previous)
+        new_files = _files_of(item)
+        diffs: List[str] = []
+        for path in sorted(set(old_files) | set(new_files)):
+            old_content = old_files.get(path, "")
+            new_content = new_files.get(path, "")
+            if old_content == new_content and path in old_files and path in new_files:
+                continue
+            diff = "".join(
+                difflib.unified_diff(
+                    old_content.splitlines(keepends=True),
+                    new_content.splitlines(keepends=True),
+                    fromfile=f"a/{path}" if path in old_files else "/dev/null",
+                    tofile=f"b/{path}" if path in new_files else "/dev/null",
+                    n=context_lines,
+                )
+            )
+            if diff:
+                diffs.append(diff if diff.endswith("\n") else f"{diff}\n")
+        if not diffs:
+            continue
+        execution = item.get("execution") or {}
+        changes.append(
+            {
+                "task_id": task_data.get("id"),
+                "title": task_data.get("title", ""),
+                "diff": "".join(diffs),
+                "review": execution.get("review"),
+            }
+        )
+    return changes
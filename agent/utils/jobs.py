@@ -0,0 +1,354 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from itertools import islice
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional
+
+from utils.metrics import JOBS_QUEUED, JOBS_RUNNING, JOBS_TOTAL
+
+JobRunner = Callable[[Callable[[Dict[str, Any]], None]], Awaitable[Dict[str, Any]]]
+
+TERMINAL_STATUSES = ("succeeded", "failed", "cancelled")
+# Events kept per job for replay (token chunks are only forwarded live).
+MAX_STORED_EVENTS = 1000
+
+
+class JobQueueFull(RuntimeError):
+    """Too many jobs waiting for a worker."""
+
+
+@dataclass
+class Job:
+    job_id: str
+    scenario_id: str = ""
+    conversation_id: str = ""
+    status: str = "queued"
+    created_at: float = field(default_factory=time.time)
+    started_at: float = 0.0
+    finished_at: float = 0.0
+    stage: str = ""
+    result: Optional[Dict[str, Any]] = None
+    error: str = ""
+    # Progress events with their `seq`, replayed to late subscribers.
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    runner: Optional[JobRunner] = field(default=None, repr=False)
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+    subscribers: List[asyncio.Queue] = field(default_factory=list, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+    def summary(self, with_result: bool = False) -> Dict[str, Any]:
+        data: Dict[str, Any] = {
+            "job_id": self.job_id,
+            "status": self.status,
+            "scenario_id": self.scenario_id,
+            "conversation_id": self.conversation_id,
+            "created_at": self.created_at,
+            "started_at": self.started_at or None,
+            "finished_at": self.finished_at or None,
+            "stage": self.stage,
+            "events": len(self.events),
+            "error": self.error,
+        }
+        if with_result:
+            data["result"] = self.result
+        return data
+
+
+class SqliteJobStore:
+    """Finished jobs (status, error, result JSON) kept in SQLite so results outlive the process."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                scenario_id TEXT NOT NULL DEFAULT '',
+                conversation_id TEXT NOT NULL DEFAULT '',
+                created_at REAL NOT NULL,
+                started_at REAL NOT NULL DEFAULT 0,
+                finished_at REAL NOT NULL DEFAULT 0,
+                error TEXT NOT NULL DEFAULT '',
+                result TEXT
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs(created_at)")
+
+    def save(self, job: Job) -> None:
+        row = (
+            job.job_id,
+            job.status,
+            job.scenario_id,
+            job.conversation_id,
+            job.created_at,
+            job.started_at,
+            job.finished_at,
+            job.error,
+            json.dumps(job.result, ensure_ascii=False) if job.result is not None else None,
+        )
+        with self.lock:
+            self._conn.execute("INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self.lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row) if row else None
+
+    def recent(self, limit: int) -> List[Job]:
+        with self.lock:
+            rows = self._conn.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [self._job(row) for row in rows]
+
+    def close(self) -> None:
+        with self.lock:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+
+    def _job(self, row: tuple) -> Job:
+        job_id, status, scenario_id, conversation_id, created_at, started_at, finished_at, error, result = row
+        try:
+            decoded = json.loads(result) if result else None
+        except ValueError:
+            decoded = None
+        return Job(
+            job_id=job_id,
+            status=status,
+            scenario_id=scenario_id,
+            conversation_id=conversation_id,
+            created_at=created_at,
+            started_at=started_at,
+            finished_at=finished_at,
+            error=error,
+            result=decoded,
+        )
+
+
+class JobManager:
+    """
+    Background runs for the API: `submit` queues a job and returns at once, a bounded pool of
+    `workers` coroutines on the server loop executes them, progress events are kept for polling
+    and replay (`events`), and results stay available after the request that created the job.
+    The `history` most recent jobs are kept in memory; with `store`, finished jobs are also saved
+    to SQLite and can be fetched after a restart.
+    Must be used from the server event loop (events are emitted and consumed on that loop).
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        max_queued: int = 100,
+        history: int = 200,
+        store: Optional[SqliteJobStore] = None,
+    ) -> None:
+        self.workers = max(1, workers)
+        self.max_queued = max(1, max_queued)
+        self.history = max(1, history)
+        self.store = store
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        # Jobs waiting for a worker, oldest first; a cancelled job leaves it at once.
+        self._pending: Deque[Job] = deque()
+        self._available: Optional[asyncio.Event] = None
+        self._workers: List[asyncio.Task] = []
+        # Set by `close`: workers return once no job is left instead of waiting for more.
+        self._closing = False
+
+    def submit(self, runner: JobRunner, scenario_id: str = "", conversation_id: str = "") -> Job:
+        """Queue `runner(emit)`; raises JobQueueFull when `max_queued` jobs are already waiting."""
+        self._start_workers()
+        assert self._available is not None
+        if len(self._pending) >= self.max_queued:
+            raise JobQueueFull(f"File des jobs pleine ({self.max_queued} en attente).")
+        job = Job(job_id=uuid.uuid4().hex, scenario_id=scenario_id, conversation_id=conversation_id, runner=runner)
+        self._pending.append(job)
+        self._available.set()
+        self.jobs[job.job_id] = job
+        self._trim_history()
+        JOBS_QUEUED.inc()
+        self._publish(job, {"type": "status", "status": job.status})
+        return job
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        """The job from memory, or else from the store (queried in a worker thread)."""
+        job = self.jobs.get(job_id)
+        if job is None and self.store is not None:
+            try:
+                job = await asyncio.to_thread(self.store.get, job_id)
+            except Exception:
+                job = None
+        return job
+
+    async def list(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Summaries of the most recent jobs (in memory, then stored), newest first."""
+        # Taken on the loop, which is the only place where `jobs` and the jobs themselves change.
+        summaries = [job.summary() for job in islice(reversed(self.jobs.values()), limit)]
+        if self.store is not None and len(summaries) < limit:
+            known = {summary["job_id"] for summary in summaries}
+            try:
+                stored = await asyncio.to_thread(self.store.recent, limit)
+            except Exception:
+                stored = []
+            summaries.extend(job.summary() for job in stored if job.job_id not in known)
+            summaries.sort(key=lambda summary: summary["created_at"], reverse=True)
+        return summaries[:limit]
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job; False when unknown or already finished."""
+        job = self.jobs.get(job_id)
+        if job is None or job.done:
+            return False
+        if job.task is not None:
+            # The worker records the cancellation once the run has unwound.
+            job.task.cancel()
+        else:
+            # Frees its place in the queue right away (see `max_queued`).
+            self._pending.remove(job)
+            JOBS_QUEUED.dec()
+            self._finish(job, "cancelled")
+        return True
+
+    async def events(self, job: Job, after: int = 0, idle: float = 15.0) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Stored events with `seq >= after`, then live ones (token chunks included) until the job ends.
+        Yields None after `idle` seconds without event so callers can send keep-alives.
+        """
+        backlog = [event for event in job.events if event.get("seq", 0) >= after]
+        if job.done:
+            for event in backlog:
+                yield event
+            return
+        queue: asyncio.Queue = asyncio.Queue()
+        job.subscribers.append(queue)
+        try:
+            for event in backlog:
+                yield event
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), idle)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                yield event
+                if event.get("type") == "status" and event.get("status") in TERMINAL_STATUSES:
+                    return
+        finally:
+            if queue in job.subscribers:
+                job.subscribers.remove(queue)
+
+    async def close(self, timeout: float = 10.0) -> None:
+        """
+        Cancel every unfinished job and wait (up to `timeout` seconds) for the workers to record
+        the cancellations (terminal event, store, metrics), then stop them.
+        """
+        self._closing = True
+        for job in list(self.jobs.values()):
+            self.cancel(job.job_id)
+        if self._available is not None:
+            self._available.set()
+        if self._workers:
+            _, stuck = await asyncio.wait(self._workers, timeout=timeout)
+            for worker in stuck:
+                worker.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._available = None
+        if self.store is not None:
+            self.store.close()
+
+    # Internal helpers ----------------------------------------------------------
+    def _start_workers(self) -> None:
+        if self._available is not None:
+            return
+        # Created lazily so that the event and workers belong to the server's running loop.
+        self._available = asyncio.Event()
+        self._closing = False
+        self._workers = [asyncio.create_task(self._worker(), name=f"job-worker-{i}") for i in range(self.workers)]
+
+    async def _worker(self) -> None:
+        assert self._available is not None
+        available = self._available
+        while True:
+            while not self._pending:
+                if self._closing:
+                    return
+                available.clear()
+                await available.wait()
+            job = self._pending.popleft()
+            assert job.runner is not None
+            JOBS_QUEUED.dec()
+            JOBS_RUNNING.inc()
+            job.status = "running"
+            job.started_at = time.time()
+            self._publish(job, {"type": "status", "status": job.status})
+            job.task = asyncio.create_task(job.runner(lambda event: self._publish(job, event)))
+            try:
+                await asyncio.wait({job.task})
+            except asyncio.CancelledError:
+                # Worker stopped while the run ignores its cancellation: still record the job.
+                job.task.cancel()
+                self._finish(job, "cancelled")
+                raise
+            finally:
+                JOBS_RUNNING.dec()
+            if job.task.cancelled():
+                self._finish(job, "cancelled")
+            elif job.task.exception() is not None:
+                self._finish(job, "failed", error=str(job.task.exception()))
+            else:
+                self._finish(job, "succeeded", result=job.task.result())
+
+    def _finish(self, job: Job, status: str, result: Optional[Dict[str, Any]] = None, error: str = "") -> None:
+        job.status = status
+        job.result = result
+        job.error = error
+        job.finished_at = time.time()
+        job.runner = None
+        job.task = None
+        JOBS_TOTAL.inc(status=status)
+        if status == "succeeded":
+            self._publish(job, {"type": "result", "data": result})
+        elif status == "failed":
+            self._publish(job, {"type": "error", "detail": error})
+        self._publish(job, {"type": "status", "status": status})
+        if self.store is not None:
+            try:
+                self.store.save(job)
+            except Exception:
+                # Result still available from memory while the job is in history.
+                pass
+        self._trim_history()
+
+    def _publish(self, job: Job, event: Dict[str, Any]) -> None:
+        if event.get("type") == "stage" and event.get("status") == "start":
+            job.stage = str(event.get("stage") or "")
+        if event.get("type") != "token" and len(job.events) < MAX_STORED_EVENTS:
+            event = {**event, "seq": len(job.events)}
+            job.events.append(event)
+        for queue in list(job.subscribers):
+            queue.put_nowait(event)
+
+    def _trim_history(self) -> None:
+        # Only finished jobs are dropped; their result remains in the store when there is one.
+        excess = len(self.jobs) - self.history
+        for job_id in list(self.jobs):
+            if excess <= 0:
+                break
+            if self.jobs[job_id].done:
+                del self.jobs[job_id]
+                excess -= 1
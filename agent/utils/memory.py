@@ -1,10 +1,27 @@
-import json
-import os
 import re
+import threading
 import time
-from collections import deque
+import uuid
+from collections import OrderedDict, deque
+from contextlib import contextmanager
 from dataclasses import asdict, dataclass, field
-from typing import Deque, Dict, List, Sequence, Tuple
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from utils.memory_backend import SqliteMemoryBackend
+from utils.memory_index import BM25Index
+from utils.metrics import (
+    MEMORY_COMPACTED,
+    MEMORY_ENTRIES,
+    MEMORY_PERSIST_ERRORS,
+    MEMORY_PERSIST_SECONDS,
+    MEMORY_SESSIONS,
+)
+from utils.rwlock import ReadWriteLock
+from utils.vector_index import VectorIndex
+
+# Reciprocal rank fusion constant used to merge BM25 and semantic rankings.
+RRF_K = 60
 
 
 def _trim_text(value: str, limit: int) -> str:
@@ -30,29 +47,120 @@ class MemoryEntry:
     history: List[ConversationTurn] = field(default_factory=list)
     timestamp: float = field(default_factory=lambda: time.time())
     conversation_id: str = "global"
+    # "entry" for a remembered interaction, "summary" for the rolled-up older entries of a session.
+    kind: str = "entry"
+    # Identifier exposed by /api/memory and used by delete_entry (timestamps can collide).
+    entry_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+
+
+@dataclass
+class _Session:
+    """In-memory state of one conversation, guarded by `lock` (readers: recall, writers: remember/delete)."""
+
+    session_id: str
+    short_term: Deque[MemoryEntry]
+    index: BM25Index
+    long_term: List[MemoryEntry] = field(default_factory=list)
+    entries: Dict[str, MemoryEntry] = field(default_factory=dict)
+    # Semantic recall: entry id -> vector row and the reverse map.
+    vector_rows: Dict[str, int] = field(default_factory=dict)
+    row_ids: Dict[int, str] = field(default_factory=dict)
+    lock: ReadWriteLock = field(default_factory=ReadWriteLock)
+    # Keeps disk writes of the session in the order of the in-memory changes.
+    persist_lock: threading.Lock = field(default_factory=threading.Lock)
+    loaded: bool = False
+    evicted: bool = False
 
 
 class MemoryStore:
     """
     Simple short/long term memory to persist past interactions and reuse them
     as contextual hints for the planner/executor pipeline.
+    Entries are persisted one by one in SQLite (see SqliteMemoryBackend); a `.json` path is
+    mapped to its `.sqlite` sibling and the legacy JSON imported once.
+    Sessions are loaded from the database on first access and kept in an LRU of at most
+    `max_hot_sessions` hot sessions; cold ones are dropped from memory (disk is always up to date),
+    so start-up does not read the store and resident memory follows the active sessions only.
+    With an `embedder`, each entry is embedded once when remembered and recall fuses BM25 with
+    cosine similarity over a memory-mapped vector file (`<db>.vectors.f32`).
+
+    Thread safety: each session has its own reader/writer lock, so recalls run concurrently and
+    writes are serialized per session only; the LRU lock is held just to look a session up.
+    Embedding calls and SQLite writes happen outside the session lock.
+
+    Compaction (`compact`, or periodically with `start_compaction`) deletes entries older than
+    `ttl_days` and folds the raw entries of a session beyond its `compact_keep_recent` most recent
+    ones into a single summary entry written by a small model, then vacuums the database and
+    rewrites the vector file without the rows of the removed entries.
     """
 
     def __init__(
         self,
-        path: str = "memory_store.json",
+        path: str = "memory_store.sqlite",
         short_term_limit: int = 5,
         long_term_limit: int = 200,
         max_formatted_chars: int = 2000,
+        recency_weight: float = 0.3,
+        recency_half_life_days: float = 30.0,
+        embedder: Optional[Callable[[str], Sequence[float]]] = None,
+        embedding_model: str = "",
+        max_hot_sessions: int = 64,
+        ttl_days: float = 0.0,
+        compact_keep_recent: int = 20,
+        compact_batch: int = 10,
+        compact_max_chars: int = 12000,
     ) -> None:
         self.path = path
         self.short_term_limit = max(1, short_term_limit)
         self.long_term_limit = max(1, long_term_limit)
         self.max_formatted_chars = max_formatted_chars
         self.default_conversation_id = "global"
-        self.short_term_by_session: Dict[str, Deque[MemoryEntry]] = {}
-        self.long_term_by_session: Dict[str, List[MemoryEntry]] = {}
-        self._load()
+        self.recency_weight = recency_weight
+        self.recency_half_life = max(1.0, recency_half_life_days * 24 * 3600)
+        self.max_hot_sessions = max(1, max_hot_sessions)
+        self.ttl_seconds = max(0.0, ttl_days * 24 * 3600)
+        self.compact_keep_recent = max(0, compact_keep_recent)
+        self.compact_batch = max(1, compact_batch)
+        # Input budget of one summarizer call (see MemorySummarizer.max_input_chars).
+        self.compact_max_chars = max(1, compact_max_chars)
+        self._compaction_stop = threading.Event()
+        self._compaction_thread: Optional[threading.Thread] = None
+        # Sessions resident in memory, least recently used first.
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._sessions_lock = threading.Lock()
+        self.embedder: Optional[Callable[[str], Sequence[float]]] = None
+        self.vectors: Optional[VectorIndex] = None
+        # Vector rows appended but not yet recorded in the database (kept by vector compaction).
+        self._pending_rows: Set[int] = set()
+        self._pending_lock = threading.Lock()
+        self.backend = SqliteMemoryBackend(path)
+        if embedder is not None:
+            self.enable_semantic(embedder, embedding_model)
+
+    def enable_semantic(self, embedder: Callable[[str], Sequence[float]], model: str = "") -> None:
+        """
+        Turn on semantic recall. Stored vectors are reused as is; they are dropped when `model`
+        differs from the one that produced them. Raises RuntimeError when numpy is missing.
+        """
+        vectors = VectorIndex(
+            Path(self.backend.path).with_suffix(".vectors.f32"),
+            dim=int(self.backend.get_meta("vector_dim", "0") or 0),
+        )
+        if self.backend.get_meta("vector_model") != model:
+            vectors.reset(0)
+            self.backend.clear_vectors()
+            self.backend.set_meta("vector_model", model)
+            self.backend.set_meta("vector_dim", "0")
+        self.vectors = vectors
+        self.embedder = embedder
+        with self._sessions_lock:
+            sessions = list(self._sessions.values())
+        for state in sessions:
+            with state.lock.write():
+                state.vector_rows.clear()
+                state.row_ids.clear()
+                if state.loaded and not state.evicted:
+                    self._load_vector_rows(state)
 
     # Public API -----------------------------------------------------------------
     def build_context(
@@ -98,30 +206,34 @@ class MemoryStore:
         limit: int = 3,
         conversation_id: str | None = None,
     ) -> List[MemoryEntry]:
-        """Return relevant memory entries (best-effort keyword match + recents)."""
+        """Return relevant memory entries (BM25 over the session's inverted index, recency weighted, + recents)."""
         session_id = self._resolve_session_id(conversation_id)
         history_text = " ".join(turn.content for turn in (history or []) if isinstance(turn, ConversationTurn))
         query_tokens = self._tokenize(" ".join([goal, context, history_text]))
-        scored: List[Tuple[int, float, MemoryEntry]] = []
-
-        for entry in self.long_term_by_session.get(session_id, []):
-            haystack = (entry.response or "").lower()
-            if not haystack:
-                continue
-            score = sum(1 for token in query_tokens if token in haystack)
-            if score:
-                scored.append((score, entry.timestamp, entry))
-
-        scored.sort(key=lambda item: (-item[0], -item[1]))
-        selected: List[MemoryEntry] = [item[2] for item in scored[:limit]]
-
-        # Top-up with most recent short term items if not enough matches.
-        if len(selected) < limit:
-            for entry in reversed(self.short_term_by_session.get(session_id, [])):
-                if entry not in selected:
+        # Embedding the query is a model call: done before taking the session lock.
+        query_vector = self._embed(_trim_text(" ".join([history_text, goal]).strip(), 2000))
+        selected: List[MemoryEntry] = []
+        with self._session(session_id) as state:
+            semantic = bool(query_vector) and bool(state.vector_rows)
+            # Wider candidate pools when two rankings are fused.
+            pool = limit * 3 if semantic else limit
+            ranked: List[str] = []
+            if query_tokens:
+                ranked = [entry_id for entry_id, _ in state.index.search(query_tokens, pool)]
+            if semantic:
+                ranked = self._fuse_rankings(ranked, self._semantic_search(state, query_vector, pool))
+            for entry_id in ranked[:limit]:
+                entry = state.entries.get(entry_id)
+                if entry is not None:
                     selected.append(entry)
-                    if len(selected) >= limit:
-                        break
+
+            # Top-up with most recent short term items if not enough matches.
+            if len(selected) < limit:
+                for entry in reversed(state.short_term):
+                    if entry not in selected:
+                        selected.append(entry)
+                        if len(selected) >= limit:
+                            break
 
         return selected
 
@@ -176,31 +288,113 @@ class MemoryStore:
             conversation_id=session_id,
         )
 
-        self._push_entry(entry)
-        self._persist()
+        vectors = self._embed_entry(entry)
+        with self._session(session_id, write=True) as state:
+            for entry_id, row in vectors.items():
+                state.vector_rows[entry_id] = row
+                state.row_ids[row] = entry_id
+            evicted = self._push_entry(state, entry)
+            # Taken before releasing the session lock so writes reach disk in order.
+            state.persist_lock.acquire()
+        try:
+            self._persist(inserts=[entry], deletes=evicted, vectors=vectors)
+        finally:
+            state.persist_lock.release()
+            self._settle_rows(vectors)
+        self._update_size_metrics()
 
     def list_entries(self, conversation_id: str | None = None) -> List[MemoryEntry]:
-        """Return all entries for a conversation (or all if None)."""
+        """Return all entries for a conversation (or all if None, read from disk without loading sessions)."""
         if conversation_id:
-            session_id = self._resolve_session_id(conversation_id)
-            return list(self.long_term_by_session.get(session_id, []))
+            with self._session(self._resolve_session_id(conversation_id)) as state:
+                return list(state.long_term)
         entries: List[MemoryEntry] = []
-        for sess_entries in self.long_term_by_session.values():
-            entries.extend(sess_entries)
+        try:
+            data = self.backend.load()
+        except Exception:
+            return entries
+        for item in data:
+            entry = self._entry_from_item(item)
+            if entry is not None:
+                entries.append(entry)
         return entries
 
     def delete_entry(self, entry_id: str) -> bool:
-        """Delete an entry by its timestamp identifier across sessions. Returns True if removed."""
-        removed = False
-        for session_id, entries in list(self.long_term_by_session.items()):
-            before = len(entries)
-            entries[:] = [e for e in entries if str(e.timestamp) != str(entry_id)]
-            if len(entries) != before:
-                removed = True
-                self._sync_session_buffers(session_id)
-        if removed:
-            self._persist()
-        return removed
+        """Delete an entry by its identifier across sessions. Returns True if removed."""
+        entry_id = str(entry_id)
+        try:
+            session_id = self.backend.conversation_of(entry_id)
+        except Exception:
+            session_id = None
+        if session_id is None:
+            return False
+        # Not a use of the conversation: a cold one must not evict hot sessions nor become hot.
+        self._apply(session_id, deletes=[entry_id], touch=False)
+        return True
+
+    def compact(self, summarize: Optional[Callable[[str, List[str]], str]] = None) -> Dict[str, int]:
+        """
+        One compaction pass over the whole store (cold sessions are not loaded):
+        - entries older than the TTL are deleted;
+        - with `summarize(previous_summary, responses)`, the old raw entries of a session and its
+          previous summary are replaced by one new summary entry;
+        - the database is vacuumed and the vector file compacted when rows were removed.
+        """
+        stats = {"expired": 0, "summarized": 0}
+        if self.ttl_seconds > 0:
+            try:
+                expired = self.backend.expired(time.time() - self.ttl_seconds)
+            except Exception:
+                expired = {}
+            for session_id, entry_ids in expired.items():
+                self._apply(session_id, deletes=entry_ids, touch=False)
+                stats["expired"] += len(entry_ids)
+        if summarize is not None:
+            try:
+                counts = self.backend.session_counts()
+            except Exception:
+                counts = {}
+            for session_id, count in counts.items():
+                if count >= self.compact_keep_recent + self.compact_batch:
+                    stats["summarized"] += self._summarize_session(session_id, summarize)
+        for reason, count in stats.items():
+            if count:
+                MEMORY_COMPACTED.inc(count, reason=reason)
+        if stats["expired"] or stats["summarized"]:
+            try:
+                self.backend.vacuum()
+            except Exception:
+                # Un VACUUM rate (base occupee) sera retente a la prochaine passe.
+                pass
+            self._compact_vectors()
+        return stats
+
+    def start_compaction(
+        self, interval: float, summarize: Optional[Callable[[str, List[str]], str]] = None
+    ) -> None:
+        """Run `compact` every `interval` seconds on a daemon thread (no-op if interval <= 0)."""
+        if interval <= 0 or self._compaction_thread is not None:
+            return
+
+        def loop() -> None:
+            while not self._compaction_stop.wait(interval):
+                try:
+                    self.compact(summarize)
+                except Exception:
+                    # Compaction is best effort; the next pass retries.
+                    continue
+
+        self._compaction_stop.clear()
+        self._compaction_thread = threading.Thread(target=loop, name="memory-compaction", daemon=True)
+        self._compaction_thread.start()
+
+    def stop_compaction(self, timeout: float = 5.0) -> None:
+        thread = self._compaction_thread
+        if thread is None:
+            return
+        self._compaction_stop.set()
+        thread.join(timeout)
+        self._compaction_thread = None
 
     def format_entries(self, entries: List[MemoryEntry]) -> str:
         """Return a human-readable memory block to append to prompts."""
@@ -212,7 +406,8 @@ class MemoryStore:
             if not entry.response:
                 continue
             preview = _trim_text(entry.response, 400)
-            lines.append(f"- Reponse precedente:\n  {preview}")
+            label = "Resume des echanges precedents" if entry.kind == "summary" else "Reponse precedente"
+            lines.append(f"- {label}:\n  {preview}")
         if not lines:
             return ""
         formatted = "\n".join(lines)
@@ -258,77 +453,332 @@ class MemoryStore:
         # Keep the latest turns to keep prompts compact.
         return normalized[-20:]
 
-    def _load(self) -> None:
-        if not os.path.exists(self.path):
-            return
+    def _entry_from_item(self, item: Any) -> Optional[MemoryEntry]:
         try:
-            with open(self.path, "r", encoding="utf-8") as fp:
-                data = json.load(fp)
+            if not isinstance(item, dict):
+                return None
+            return MemoryEntry(
+                goal=str(item.get("goal", "")),
+                context=str(item.get("context", "")),
+                constraints=str(item.get("constraints", "")),
+                notes=str(item.get("notes", item.get("summary", ""))),
+                response=str(item.get("response", "")),
+                history=self._normalize_history(item.get("history", [])),
+                timestamp=float(item.get("timestamp", time.time())),
+                conversation_id=self._resolve_session_id(item.get("conversation_id")),
+                kind=str(item.get("kind") or "entry"),
+                entry_id=str(item.get("id") or uuid.uuid4().hex),
+            )
         except Exception:
-            return
+            return None
+
+    @contextmanager
+    def _session(self, session_id: str, write: bool = False) -> Iterator[_Session]:
+        """Hold the session's read (or write) lock, loading it first if it is not resident."""
+        while True:
+            state = self._hot_session(session_id)
+            if not state.loaded:
+                with state.lock.write():
+                    if not state.loaded and not state.evicted:
+                        self._load_session(state)
+            with state.lock.write() if write else state.lock.read():
+                if state.evicted:
+                    # Evicted between lookup and lock: look it up (and reload it) again.
+                    continue
+                yield state
+                return
 
-        if not isinstance(data, list):
+    def _hot_session(self, session_id: str, touch: bool = True) -> _Session:
+        """
+        Look `session_id` up, creating it if needed. With `touch` it becomes the most recently used
+        session and the coldest ones are evicted; without (background work) a new session is put
+        first in line for eviction and nothing is evicted.
+        """
+        with self._sessions_lock:
+            state = self._sessions.get(session_id)
+            if state is not None:
+                if touch:
+                    self._sessions.move_to_end(session_id)
+                return state
+            state = _Session(
+                session_id=session_id,
+                short_term=deque(maxlen=self.short_term_limit),
+                index=BM25Index(recency_weight=self.recency_weight, recency_half_life=self.recency_half_life),
+            )
+            self._sessions[session_id] = state
+            if not touch:
+                self._sessions.move_to_end(session_id, last=False)
+                return state
+            cold = list(self._sessions.values())[: max(0, len(self._sessions) - self.max_hot_sessions)]
+        for cold_state in cold:
+            # Wait for in-flight readers/writers and pending disk writes of the cold session, so a
+            # reload never reads the database before them.
+            with cold_state.lock.write(), cold_state.persist_lock:
+                with self._sessions_lock:
+                    if self._sessions.get(cold_state.session_id) is not cold_state:
+                        continue
+                    del self._sessions[cold_state.session_id]
+                cold_state.evicted = True
+        return state
+
+    def _apply(
+        self,
+        session_id: str,
+        deletes: Sequence[str] = (),
+        summary: Optional[MemoryEntry] = None,
+        vectors: Optional[Dict[str, int]] = None,
+        touch: bool = True,
+    ) -> None:
+        """Delete entries (by id) and add a summary, in memory when the session is loaded and on disk."""
+        while True:
+            state = self._hot_session(session_id, touch=touch)
+            with state.lock.write():
+                if state.evicted:
+                    continue
+                trimmed: List[MemoryEntry] = []
+                if state.loaded:
+                    removed = set(deletes)
+                    state.long_term[:] = [e for e in state.long_term if self._entry_id(e) not in removed]
+                    for entry_id in removed:
+                        self._unindex(state, entry_id)
+                    if summary is not None:
+                        for entry_id, row in (vectors or {}).items():
+                            state.vector_rows[entry_id] = row
+                            state.row_ids[row] = entry_id
+                        self._push_entry(state, summary, sync=False)
+                        state.long_term.sort(key=lambda entry: entry.timestamp)
+                    trimmed = self._sync_session_buffers(state)
+                # An unloaded session is written while its lock is held, so it cannot load stale rows.
+                with state.persist_lock:
+                    self._persist(
+                        inserts=[summary] if summary is not None else [],
+                        deletes=[*deletes, *trimmed],
+                        vectors=vectors,
+                    )
+            self._settle_rows(vectors)
+            self._update_size_metrics()
             return
 
-        for item in data:
+    def _summarize_session(self, session_id: str, summarize: Callable[[str, List[str]], str]) -> int:
+        """
+        Fold the old raw entries of a session (read from disk) into its rolling summary, oldest
+        first, one `summarize` call per chunk that fits the summarizer input (`compact_batch`
+        entries, `compact_max_chars` characters). Each chunk is applied before the next call, so
+        only entries that reached the model are deleted, even if a later call fails.
+        """
+        try:
+            items = self.backend.load(session_id)
+        except Exception:
+            return 0
+        entries = [entry for entry in map(self._entry_from_item, items) if entry is not None]
+        previous = [entry for entry in entries if entry.kind == "summary"]
+        raw = [entry for entry in entries if entry.kind != "summary"]
+        old = raw[: len(raw) - self.compact_keep_recent]
+        if len(old) < self.compact_batch:
+            return 0
+        summarized = 0
+        while old:
+            chunk = self._compaction_chunk(old)
             try:
-                if not isinstance(item, dict):
-                    continue
-
-                history = self._normalize_history(item.get("history", []))
-                notes = str(item.get("notes", item.get("summary", "")))
-                conversation_id = self._resolve_session_id(item.get("conversation_id"))
-                entry = MemoryEntry(
-                    goal=str(item.get("goal", "")),
-                    context=str(item.get("context", "")),
-                    constraints=str(item.get("constraints", "")),
-                    notes=notes,
-                    response=str(item.get("response", "")),
-                    history=history,
-                    timestamp=float(item.get("timestamp", time.time())),
-                    conversation_id=conversation_id,
-                )
-                self._push_entry(entry, sync=False)
+                text = summarize("\n\n".join(entry.response for entry in previous), [entry.response for entry in chunk])
             except Exception:
-                continue
-
-        for session_id in list(self.long_term_by_session.keys()):
-            self._sync_session_buffers(session_id)
+                # The model may be unavailable: keep the remaining raw entries until the next pass.
+                break
+            text = _trim_text((text or "").strip(), 1200)
+            if not text:
+                break
+            summary = MemoryEntry(
+                goal="",
+                context="",
+                constraints="",
+                notes="",
+                response=text,
+                conversation_id=session_id,
+                kind="summary",
+            )
+            vectors = self._embed_entry(summary)
+            self._apply(
+                session_id,
+                deletes=[self._entry_id(entry) for entry in [*previous, *chunk]],
+                summary=summary,
+                vectors=vectors,
+                touch=False,
+            )
+            previous = [summary]
+            old = old[len(chunk):]
+            summarized += len(chunk)
+        return summarized
+
+    def _compaction_chunk(self, old: List[MemoryEntry]) -> List[MemoryEntry]:
+        """Oldest entries that fit one summarizer call (always at least one)."""
+        chunk: List[MemoryEntry] = []
+        used = 0
+        for entry in old[: self.compact_batch]:
+            # Same accounting as MemorySummarizer: one "- <response>" block per entry.
+            size = len(entry.response.strip()) + 2
+            if chunk and used + size > self.compact_max_chars:
+                break
+            chunk.append(entry)
+            used += size
+        return chunk
+
+    def _load_session(self, state: _Session) -> None:
+        try:
+            data = self.backend.load(state.session_id)
+        except Exception:
+            data = []
+        for item in data:
+            entry = self._entry_from_item(item)
+            if entry is not None:
+                self._push_entry(state, entry, sync=False)
+        stale = self._sync_session_buffers(state)
+        if stale:
+            # Entries beyond long_term_limit (e.g. after lowering it) are dropped from disk too.
+            self._persist(deletes=stale)
+        self._load_vector_rows(state)
+        state.loaded = True
+        self._update_size_metrics()
+
+    def _load_vector_rows(self, state: _Session) -> None:
+        if self.vectors is None:
+            return
+        try:
+            rows = self.backend.vector_rows(state.session_id)
+        except Exception:
+            return
+        for entry_id, row in rows.items():
+            if entry_id in state.entries and self.vectors.contains(row):
+                state.vector_rows[entry_id] = row
+                state.row_ids[row] = entry_id
 
-    def _persist(self) -> None:
+    def _persist(
+        self,
+        inserts: Sequence[MemoryEntry] = (),
+        deletes: Sequence[MemoryEntry | str] = (),
+        vectors: Optional[Dict[str, int]] = None,
+    ) -> None:
+        """Write only the entries that changed: one insert/delete per entry."""
+        started = time.perf_counter()
         try:
-            payload: List[dict] = []
-            for entries in self.long_term_by_session.values():
-                for entry in entries:
-                    payload.append(asdict(entry))
-            with open(self.path, "w", encoding="utf-8") as fp:
-                json.dump(payload, fp, ensure_ascii=False, indent=2)
+            self.backend.write(
+                inserts=[{"id": self._entry_id(entry), **asdict(entry)} for entry in inserts],
+                deletes=[item if isinstance(item, str) else self._entry_id(item) for item in deletes],
+                vectors=vectors,
+            )
         except Exception:
             # Persistence failure should not block the agent.
+            MEMORY_PERSIST_ERRORS.inc()
+            return
+        MEMORY_PERSIST_SECONDS.observe(time.perf_counter() - started)
+
+    def _update_size_metrics(self) -> None:
+        with self._sessions_lock:
+            sessions = list(self._sessions.values())
+        MEMORY_SESSIONS.set(len(sessions))
+        MEMORY_ENTRIES.set(sum(len(state.long_term) for state in sessions))
+
+    def _index(self, state: _Session, entry: MemoryEntry) -> None:
+        entry_id = self._entry_id(entry)
+        state.index.add(entry_id, self._tokenize(" ".join([entry.goal, entry.notes, entry.response])), entry.timestamp)
+        state.entries[entry_id] = entry
+
+    def _unindex(self, state: _Session, entry_id: str) -> None:
+        if state.entries.pop(entry_id, None) is None:
             return
+        state.index.remove(entry_id)
+        row = state.vector_rows.pop(entry_id, None)
+        if row is not None:
+            # The row stays in the vector file until the next compaction but is no longer a candidate.
+            state.row_ids.pop(row, None)
+
+    def _embed(self, text: str) -> Optional[Sequence[float]]:
+        if self.embedder is None or not text.strip():
+            return None
+        try:
+            return self.embedder(text)
+        except Exception:
+            # Embedding failure only disables semantic recall for this text.
+            return None
+
+    def _embed_entry(self, entry: MemoryEntry) -> Dict[str, int]:
+        """Embed `entry` once and append its vector; returns {entry id: row} to persist."""
+        if self.vectors is None:
+            return {}
+        vector = self._embed(" ".join(part for part in [entry.goal, entry.notes, entry.response] if part))
+        if not vector:
+            return {}
+        dim = self.vectors.dim
+        with self._pending_lock:
+            try:
+                row = self.vectors.append(vector)
+            except Exception:
+                return {}
+            self._pending_rows.add(row)
+        if dim != self.vectors.dim:
+            self.backend.set_meta("vector_dim", str(self.vectors.dim))
+        return {self._entry_id(entry): row}
+
+    def _settle_rows(self, vectors: Optional[Dict[str, int]]) -> None:
+        """Rows of `vectors` are now in the database (or lost with a failed write)."""
+        if vectors:
+            with self._pending_lock:
+                self._pending_rows.difference_update(vectors.values())
+
+    def _compact_vectors(self) -> None:
+        """Drop from the vector file the rows no longer referenced by any entry."""
+        if self.vectors is None:
+            return
+        with self._pending_lock:
+            # Rows appended from now on are numbered `since` or above and always kept.
+            since = self.vectors.rows
+            pending = set(self._pending_rows)
+        try:
+            live = self.backend.live_vector_rows()
+            self.vectors.compact(live | pending, since=since)
+        except Exception:
+            # The vector file keeps its dead rows until the next pass.
+            pass
+
+    def _semantic_search(self, state: _Session, query: Sequence[float], limit: int) -> List[str]:
+        if self.vectors is None:
+            return []
+        try:
+            matches = self.vectors.search(query, list(state.vector_rows.values()), limit)
+        except Exception:
+            return []
+        return [state.row_ids[row] for row, _ in matches if row in state.row_ids]
+
+    def _fuse_rankings(self, *rankings: Sequence[str]) -> List[str]:
+        """Reciprocal rank fusion: sum of 1 / (RRF_K + rank) over the rankings."""
+        scores: Dict[str, float] = {}
+        for ranking in rankings:
+            for rank, entry_id in enumerate(ranking):
+                scores[entry_id] = scores.get(entry_id, 0.0) + 1.0 / (RRF_K + rank + 1)
+        return sorted(scores, key=lambda entry_id: scores[entry_id], reverse=True)
+
+    def _entry_id(self, entry: MemoryEntry) -> str:
+        return entry.entry_id
 
     def _resolve_session_id(self, conversation_id: str | None) -> str:
         session_id = str(conversation_id or "").strip()
         return session_id or self.default_conversation_id
 
-    def _push_entry(self, entry: MemoryEntry, sync: bool = True) -> None:
-        _, long_term = self._ensure_session(entry.conversation_id)
-        long_term.append(entry)
+    def _push_entry(self, state: _Session, entry: MemoryEntry, sync: bool = True) -> List[MemoryEntry]:
+        """Append `entry` to its session; returns the entries trimmed out of long term memory."""
+        state.long_term.append(entry)
+        self._index(state, entry)
         if sync:
-            self._sync_session_buffers(entry.conversation_id)
+            return self._sync_session_buffers(state)
+        return []
 
-    def _sync_session_buffers(self, session_id: str) -> None:
-        _, long_term = self._ensure_session(session_id)
+    def _sync_session_buffers(self, state: _Session) -> List[MemoryEntry]:
+        evicted: List[MemoryEntry] = []
         # Trim long term memory for this session.
-        if len(long_term) > self.long_term_limit:
-            long_term[:] = long_term[-self.long_term_limit :]
+        if len(state.long_term) > self.long_term_limit:
+            evicted = state.long_term[: -self.long_term_limit]
+            state.long_term[:] = state.long_term[-self.long_term_limit :]
+            for entry in evicted:
+                self._unindex(state, self._entry_id(entry))
         # Rebuild short term from the end of the long term buffer.
-        recent_slice = list(long_term[-self.short_term_limit :])
-        self.short_term_by_session[session_id] = deque(recent_slice, maxlen=self.short_term_limit)
-
-    def _ensure_session(self, session_id: str) -> Tuple[Deque[MemoryEntry], List[MemoryEntry]]:
-        if session_id not in self.short_term_by_session:
-            self.short_term_by_session[session_id] = deque(maxlen=self.short_term_limit)
-        if session_id not in self.long_term_by_session:
-            self.long_term_by_session[session_id] = []
-        return self.short_term_by_session[session_id], self.long_term_by_session[session_id]
+        state.short_term = deque(state.long_term[-self.short_term_limit :], maxlen=self.short_term_limit)
+        return evicted
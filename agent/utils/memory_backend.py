@@ -0,0 +1,231 @@
+import json
+import sqlite3
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+ENTRY_COLUMNS = (
+    "id", "conversation_id", "timestamp", "goal", "context", "constraints", "notes", "response", "history", "kind"
+)
+
+
+class SqliteMemoryBackend:
+    """
+    Memory entries stored one row per entry in SQLite (WAL journal), indexed by
+    conversation_id and timestamp. Writes are per-entry inserts/deletes, so their cost does not
+    depend on the size of the store, and a crash never leaves a half-written file behind.
+    A legacy `memory_store.json` next to the database is imported once, when the table is empty.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        path = Path(path)
+        legacy_json = path.with_suffix(".json")
+        if path.suffix == ".json":
+            # Historical --memory-path value: keep the JSON as import source only.
+            path = path.with_suffix(".sqlite")
+        self.path = path
+        self.lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS memory_entries (
+                id TEXT PRIMARY KEY,
+                conversation_id TEXT NOT NULL,
+                timestamp REAL NOT NULL,
+                goal TEXT NOT NULL DEFAULT '',
+                context TEXT NOT NULL DEFAULT '',
+                constraints TEXT NOT NULL DEFAULT '',
+                notes TEXT NOT NULL DEFAULT '',
+                response TEXT NOT NULL DEFAULT '',
+                history TEXT NOT NULL DEFAULT '[]',
+                kind TEXT NOT NULL DEFAULT 'entry'
+            )
+            """
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(memory_entries)")}
+        if "kind" not in columns:
+            # Stores created before compaction summaries: every row is a raw entry.
+            self._conn.execute("ALTER TABLE memory_entries ADD COLUMN kind TEXT NOT NULL DEFAULT 'entry'")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_memory_conversation ON memory_entries(conversation_id, timestamp)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_memory_timestamp ON memory_entries(timestamp)")
+        # Row of each entry's embedding in the vector file (see utils.vector_index).
+        self._conn.execute("CREATE TABLE IF NOT EXISTS memory_vectors (id TEXT PRIMARY KEY, row INTEGER NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS memory_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        if legacy_json.exists() and self.count() == 0:
+            self._import_json(legacy_json)
+
+    def load(self, conversation_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Entries (all, or of one conversation), oldest first, as dicts shaped like the legacy JSON items."""
+        with self.lock:
+            if conversation_id is None:
+                cursor = self._conn.execute(
+                    f"SELECT {', '.join(ENTRY_COLUMNS)} FROM memory_entries ORDER BY timestamp, rowid"
+                )
+            else:
+                cursor = self._conn.execute(
+                    f"SELECT {', '.join(ENTRY_COLUMNS)} FROM memory_entries WHERE conversation_id = ? ORDER BY timestamp, rowid",
+                    (conversation_id,),
+                )
+            rows = cursor.fetchall()
+        items: List[Dict[str, Any]] = []
+        for row in rows:
+            item = dict(zip(ENTRY_COLUMNS, row))
+            try:
+                item["history"] = json.loads(item["history"] or "[]")
+            except ValueError:
+                item["history"] = []
+            items.append(item)
+        return items
+
+    def conversation_of(self, entry_id: str) -> Optional[str]:
+        with self.lock:
+            row = self._conn.execute("SELECT conversation_id FROM memory_entries WHERE id = ?", (entry_id,)).fetchone()
+        return str(row[0]) if row else None
+
+    def expired(self, before: float) -> Dict[str, List[str]]:
+        """Ids of the entries older than `before`, by conversation."""
+        with self.lock:
+            rows = self._conn.execute(
+                "SELECT conversation_id, id FROM memory_entries WHERE timestamp < ?", (before,)
+            ).fetchall()
+        expired: Dict[str, List[str]] = {}
+        for conversation_id, entry_id in rows:
+            expired.setdefault(str(conversation_id), []).append(str(entry_id))
+        return expired
+
+    def session_counts(self, kind: str = "entry") -> Dict[str, int]:
+        with self.lock:
+            rows = self._conn.execute(
+                "SELECT conversation_id, COUNT(*) FROM memory_entries WHERE kind = ? GROUP BY conversation_id", (kind,)
+            ).fetchall()
+        return {str(conversation_id): int(count) for conversation_id, count in rows}
+
+    def vacuum(self) -> None:
+        """Give the space of deleted rows back to the file system."""
+        with self.lock:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._conn.execute("VACUUM")
+
+    def count(self) -> int:
+        with self.lock:
+            return int(self._conn.execute("SELECT COUNT(*) FROM memory_entries").fetchone()[0])
+
+    def write(
+        self,
+        inserts: Iterable[Dict[str, Any]] = (),
+        deletes: Iterable[str] = (),
+        vectors: Dict[str, int] | None = None,
+    ) -> None:
+        """
+        Insert and delete entries (by id), and record vector rows, in one transaction. Entry ids
+        are unique: inserting an existing id fails instead of replacing that entry.
+        """
+        rows = [self._row(item) for item in inserts]
+        ids = [(entry_id,) for entry_id in deletes]
+        vector_rows = list((vectors or {}).items())
+        if not rows and not ids and not vector_rows:
+            return
+        with self.lock:
+            self._conn.execute("BEGIN")
+            try:
+                if rows:
+                    self._conn.executemany(
+                        f"INSERT INTO memory_entries ({', '.join(ENTRY_COLUMNS)}) "
+                        f"VALUES ({', '.join('?' for _ in ENTRY_COLUMNS)})",
+                        rows,
+                    )
+                if vector_rows:
+                    self._conn.executemany("INSERT OR REPLACE INTO memory_vectors (id, row) VALUES (?, ?)", vector_rows)
+                if ids:
+                    self._conn.executemany("DELETE FROM memory_entries WHERE id = ?", ids)
+                    self._conn.executemany("DELETE FROM memory_vectors WHERE id = ?", ids)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def vector_rows(self, conversation_id: str) -> Dict[str, int]:
+        with self.lock:
+            cursor = self._conn.execute(
+                "SELECT v.id, v.row FROM memory_vectors v JOIN memory_entries e ON e.id = v.id "
+                "WHERE e.conversation_id = ?",
+                (conversation_id,),
+            )
+            return {entry_id: int(row) for entry_id, row in cursor}
+
+    def live_vector_rows(self) -> Set[int]:
+        """Vector rows still referenced by an entry, across every conversation."""
+        with self.lock:
+            cursor = self._conn.execute(
+                "SELECT v.row FROM memory_vectors v JOIN memory_entries e ON e.id = v.id"
+            )
+            return {int(row) for (row,) in cursor}
+
+    def clear_vectors(self) -> None:
+        with self.lock:
+            self._conn.execute("DELETE FROM memory_vectors")
+
+    def get_meta(self, key: str, default: str = "") -> str:
+        with self.lock:
+            row = self._conn.execute("SELECT value FROM memory_meta WHERE key = ?", (key,)).fetchone()
+        return str(row[0]) if row else default
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self.lock:
+            self._conn.execute("INSERT OR REPLACE INTO memory_meta (key, value) VALUES (?, ?)", (key, value))
+
+    def close(self) -> None:
+        with self.lock:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+
+    # Internal helpers ----------------------------------------------------------
+    def _row(self, item: Dict[str, Any]) -> tuple:
+        values = dict(item)
+        values["history"] = json.dumps(values.get("history") or [], ensure_ascii=False)
+        values["id"] = values.get("id") or uuid.uuid4().hex
+        values["kind"] = values.get("kind") or "entry"
+        return tuple(values.get(column, "") for column in ENTRY_COLUMNS)
+
+    def _import_json(self, legacy_json: Path) -> None:
+        try:
+            with open(legacy_json, "r", encoding="utf-8") as fp:
+                data = json.load(fp)
+        except Exception:
+            return
+        if not isinstance(data, list):
+            return
+        items: List[Dict[str, Any]] = []
+        for item in data:
+            try:
+                timestamp = float(item["timestamp"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            items.append(
+                {
+                    # Not the timestamp: the legacy file can hold several entries with the same one.
+                    "id": uuid.uuid4().hex,
+                    "conversation_id": str(item.get("conversation_id") or "global"),
+                    "timestamp": timestamp,
+                    "goal": str(item.get("goal", "")),
+                    "context": str(item.get("context", "")),
+                    "constraints": str(item.get("constraints", "")),
+                    "notes": str(item.get("notes", item.get("summary", ""))),
+                    "response": str(item.get("response", "")),
+                    "history": item.get("history") if isinstance(item.get("history"), list) else [],
+                }
+            )
+        try:
+            self.write(inserts=items)
+        except Exception:
+            # A broken legacy file must not prevent the store from starting.
+            return
+
@@ -0,0 +1,87 @@
+import heapq
+import math
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class BM25Index:
+    """
+    Incremental inverted index (token -> {doc_id: term frequency}) scored with Okapi BM25.
+    `add`/`remove` only touch the postings of the document's own tokens and a query only visits
+    the postings of its tokens, so lookups do not scan every document.
+    Scores are optionally weighted by recency: `score * (1 - w + w * 0.5 ** (age / half_life))`.
+    """
+
+    def __init__(
+        self,
+        k1: float = 1.2,
+        b: float = 0.75,
+        recency_weight: float = 0.3,
+        recency_half_life: float = 30 * 24 * 3600,
+    ) -> None:
+        self.k1 = k1
+        self.b = b
+        self.recency_weight = min(1.0, max(0.0, recency_weight))
+        self.recency_half_life = max(1.0, recency_half_life)
+        self._postings: Dict[str, Dict[str, int]] = {}
+        # doc_id -> (length in tokens, timestamp, distinct tokens)
+        self._docs: Dict[str, Tuple[int, float, Tuple[str, ...]]] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, doc_id: object) -> bool:
+        return doc_id in self._docs
+
+    def add(self, doc_id: str, tokens: Iterable[str], timestamp: float = 0.0) -> None:
+        if doc_id in self._docs:
+            self.remove(doc_id)
+        counts = Counter(tokens)
+        length = sum(counts.values())
+        for token, frequency in counts.items():
+            self._postings.setdefault(token, {})[doc_id] = frequency
+        self._docs[doc_id] = (length, timestamp, tuple(counts))
+        self._total_length += length
+
+    def remove(self, doc_id: str) -> bool:
+        doc = self._docs.pop(doc_id, None)
+        if doc is None:
+            return False
+        length, _, tokens = doc
+        for token in tokens:
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[token]
+        self._total_length -= length
+        return True
+
+    def search(self, query_tokens: Iterable[str], limit: int = 3, now: Optional[float] = None) -> List[Tuple[str, float]]:
+        """Best `limit` (doc_id, score) pairs for the query, highest score first."""
+        if not self._docs or limit <= 0:
+            return []
+        doc_count = len(self._docs)
+        average_length = self._total_length / doc_count or 1.0
+        scores: Dict[str, float] = {}
+        for token in set(query_tokens):
+            postings = self._postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, frequency in postings.items():
+                length = self._docs[doc_id][0]
+                norm = self.k1 * (1 - self.b + self.b * length / average_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+        if not scores:
+            return []
+        if self.recency_weight:
+            now = time.time() if now is None else now
+            for doc_id in scores:
+                age = max(0.0, now - self._docs[doc_id][1])
+                decay = 0.5 ** (age / self.recency_half_life)
+                scores[doc_id] *= 1 - self.recency_weight + self.recency_weight * decay
+        return heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], self._docs[item[0]][1]))
@@ -0,0 +1,258 @@
+import bisect
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Seconds; covers sub-second cache/queue waits up to multi-minute local generations.
+DEFAULT_BUCKETS = (0.005, 0.025, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+LabelKey = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelKey:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self.lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self.lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self.lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """Gauge set by callers, or computed at scrape time when `collect` is given."""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        collect: Optional[Callable[[], Iterable[Tuple[LabelKey, float]]]] = None,
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelKey, float] = {}
+        self.collect = collect
+
+    def set(self, value: float, **labels: str) -> None:
+        with self.lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self.lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: str) -> float:
+        with self.lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self.lock:
+            values = dict(self._values)
+        if self.collect is not None:
+            try:
+                values.update(self.collect())
+            except Exception:
+                # A failing collector must not break the whole scrape.
+                pass
+        return [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+            for key, value in sorted(values.items())
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (+Inf last)], sum.
+        self._values: Dict[LabelKey, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = ([0] * (len(self.buckets) + 1), [0.0])
+                self._values[key] = entry
+            entry[0][index] += 1
+            entry[1][0] += value
+
+    def _samples(self) -> List[str]:
+        with self.lock:
+            items = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._values.items())
+        lines: List[str] = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(round(total, 6))}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    In-process metrics rendered in the Prometheus text exposition format (0.0.4).
+    Updates take one short lock per metric; gauges with a `collect` callback are only
+    computed when scraped.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labels))  # type: ignore[return-value]
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        collect: Optional[Callable[[], Iterable[Tuple[LabelKey, float]]]] = None,
+    ) -> Gauge:
+        return self._register(Gauge(name, documentation, labels, collect))  # type: ignore[return-value]
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labels, buckets))  # type: ignore[return-value]
+
+    def render(self) -> str:
+        with self.lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self.lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+
+REGISTRY = MetricsRegistry()
+
+# Runs (Orchestrator) -------------------------------------------------------------
+RUNS_IN_FLIGHT = REGISTRY.gauge("mycodex_runs_in_flight", "Runs currently executing.")
+RUNS_TOTAL = REGISTRY.counter("mycodex_runs_total", "Finished runs by outcome (success, error, cancelled, deadline, budget).", ["status"])
+RUN_DURATION = REGISTRY.histogram("mycodex_run_duration_seconds", "Wall time of a full run.")
+STAGE_POOL_IN_USE = REGISTRY.gauge(
+    "mycodex_stage_pool_in_use", "Stage pool slots held by executor/reviewer/correction calls.", ["model"]
+)
+STAGE_POOL_WAITING = REGISTRY.gauge("mycodex_stage_pool_waiting", "Tasks waiting for a stage pool slot.", ["model"])
+
+# Model calls (OllamaClient) --------------------------------------------------------
+LLM_REQUESTS = REGISTRY.counter("mycodex_llm_requests_total", "Model calls by model and status.", ["model", "status"])
+LLM_LATENCY = REGISTRY.histogram(
+    "mycodex_llm_request_duration_seconds", "Model call latency (queue wait excluded).", ["model"]
+)
+LLM_QUEUE_WAIT = REGISTRY.histogram(
+    "mycodex_llm_queue_wait_seconds", "Time spent waiting for a model scheduler slot.", ["model"]
+)
+LLM_TOKENS = REGISTRY.counter(
+    "mycodex_llm_tokens_total", "Tokens reported by Ollama (kind=prompt|completion).", ["model", "kind"]
+)
+LLM_GENERATION_SECONDS = REGISTRY.counter(
+    "mycodex_llm_generation_seconds_total",
+    "Time spent generating completion tokens; tokens/s = rate(tokens{kind=completion}) / rate(this).",
+    ["model"],
+)
+RESPONSE_CACHE_REQUESTS = REGISTRY.counter(
+    "mycodex_response_cache_requests_total", "Response cache lookups by result (hit|miss).", ["result"]
+)
+
+# Memory (MemoryStore) --------------------------------------------------------------
+MEMORY_ENTRIES = REGISTRY.gauge("mycodex_memory_entries", "Memory entries resident in memory (hot sessions).")
+MEMORY_SESSIONS = REGISTRY.gauge("mycodex_memory_sessions", "Conversations resident in memory (hot sessions).")
+MEMORY_PERSIST_SECONDS = REGISTRY.histogram(
+    "mycodex_memory_persist_seconds",
+    "Time to persist the memory store.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+MEMORY_PERSIST_ERRORS = REGISTRY.counter("mycodex_memory_persist_errors_total", "Failed memory store writes.")
+MEMORY_COMPACTED = REGISTRY.counter(
+    "mycodex_memory_compacted_entries_total", "Entries removed by compaction (reason=expired|summarized).", ["reason"]
+)
+
+# Background jobs (JobManager) ------------------------------------------------------
+JOBS_QUEUED = REGISTRY.gauge("mycodex_jobs_queued", "Jobs waiting for a worker.")
+JOBS_RUNNING = REGISTRY.gauge("mycodex_jobs_running", "Jobs currently executing.")
+JOBS_TOTAL = REGISTRY.counter(
+    "mycodex_jobs_total", "Finished jobs by outcome (status=succeeded|failed|cancelled).", ["status"]
+)
+
+# HTTP (FastAPI app) ----------------------------------------------------------------
+HTTP_REQUESTS = REGISTRY.counter("mycodex_http_requests_total", "HTTP requests by route and status code.", ["route", "status"])
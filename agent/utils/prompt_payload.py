@@ -0,0 +1,63 @@
+import hashlib
+import json
+from typing import Any, Dict, List
+
+from models.tasks import ExecutionOutput
+
+
+def encode(value: Any) -> str:
+    """Compact JSON for prompt payloads: no indentation nor padding, UTF-8 kept as-is."""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def strip_raw(value: Any) -> Any:
+    """Drop the `raw` copies kept next to parsed reviews/critiques: they repeat the same fields."""
+    if isinstance(value, dict):
+        return {key: strip_raw(item) for key, item in value.items() if key != "raw"}
+    if isinstance(value, list):
+        return [strip_raw(item) for item in value]
+    return value
+
+
+def execution_payload(execution: ExecutionOutput, include_contents: bool = True) -> Dict[str, Any]:
+    """
+    Execution output as sent to a model. Without contents, files are listed by path and line
+    count only (for prompts that already carry the code elsewhere).
+    """
+    if include_contents:
+        files = [{"path": f.path, "content": f.content} for f in execution.files]
+    else:
+        files = [{"path": f.path, "lines": f.content.count("\n") + 1 if f.content else 0} for f in execution.files]
+    return {"status": execution.status, "notes": execution.notes, "files": files}
+
+
+def task_results_payload(task_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Task results without `raw` copies, where a file body identical to one already sent
+    (same content in an earlier task) is replaced by a reference to its first occurrence.
+    """
+    seen: Dict[str, str] = {}
+    payload: List[Dict[str, Any]] = []
+    for item in strip_raw(task_results):
+        if not isinstance(item, dict):
+            payload.append(item)
+            continue
+        task_id = (item.get("task") or {}).get("id")
+        execution = item.get("execution")
+        if isinstance(execution, dict) and execution.get("files"):
+            files: List[Any] = []
+            for file_entry in execution["files"]:
+                if not isinstance(file_entry, dict) or not isinstance(file_entry.get("content"), str):
+                    files.append(file_entry)
+                    continue
+                digest = hashlib.sha1(file_entry["content"].encode("utf-8")).hexdigest()
+                reference = seen.get(digest)
+                if reference is not None and file_entry["content"]:
+                    files.append({"path": file_entry.get("path"), "same_content_as": reference})
+                    continue
+                seen.setdefault(digest, f"tache {task_id}: {file_entry.get('path')}")
+                files.append(file_entry)
+            execution = {**execution, "files": files}
+            item = {**item, "execution": execution}
+        payload.append(item)
+    return payload
@@ -0,0 +1,199 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+
+@dataclass
+class CachedResponse:
+    content: str
+    completion_tokens: int = 0
+    created_at: float = 0.0
+
+
+class ResponseCache:
+    """
+    Content-addressed cache of model completions keyed on (model, options, prompt_hash).
+    Two tiers: an in-memory LRU for hot prompts and an optional SQLite file that survives
+    restarts. Entries expire after `ttl_seconds`; the disk tier is trimmed (least recently
+    used first) once it grows beyond `max_disk_bytes`.
+    """
+
+    def __init__(
+        self,
+        path: str | Path | None = "response_cache.sqlite",
+        max_memory_entries: int = 256,
+        max_disk_bytes: int = 256 * 1024 * 1024,
+        ttl_seconds: float = 24 * 3600,
+    ) -> None:
+        self.path = Path(path) if path else None
+        self.max_memory_entries = max(1, max_memory_entries)
+        self.max_disk_bytes = max(0, max_disk_bytes)
+        self.ttl_seconds = ttl_seconds
+        self.lock = threading.Lock()
+        self._memory: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._disk_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        if self.path is not None:
+            self._open_disk()
+
+    @property
+    def on_disk(self) -> bool:
+        """Whether `get`/`put` may hit the SQLite file (callers on an event loop run them in a thread)."""
+        return self._conn is not None
+
+    def make_key(self, model: str, options: Dict[str, Any], prompt_hash: str) -> str:
+        options_text = json.dumps(options or {}, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(f"{model}\n{options_text}\n{prompt_hash}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        now = time.time()
+        with self.lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                if self._expired(cached.created_at, now):
+                    del self._memory[key]
+                    self._delete_disk(key)
+                    cached = None
+                else:
+                    self._memory.move_to_end(key)
+            if cached is None:
+                cached = self._get_disk(key, now)
+                if cached is not None:
+                    self._remember(key, cached)
+            if cached is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return cached
+
+    def put(self, key: str, content: str, completion_tokens: int = 0) -> None:
+        cached = CachedResponse(content=content, completion_tokens=max(0, completion_tokens), created_at=time.time())
+        with self.lock:
+            self._remember(key, cached)
+            self._put_disk(key, cached)
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "disk_bytes": self._disk_bytes,
+            }
+
+    def close(self) -> None:
+        with self.lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # Internal helpers ----------------------------------------------------------
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - created_at > self.ttl_seconds
+
+    def _remember(self, key: str, cached: CachedResponse) -> None:
+        self._memory[key] = cached
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _open_disk(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    content TEXT NOT NULL,
+                    completion_tokens INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    size INTEGER NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)")
+            if self.ttl_seconds > 0:
+                conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            row = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+            self._disk_bytes = int(row[0] or 0)
+            self._conn = conn
+        except Exception:
+            # The disk tier is optional: fall back to the in-memory LRU only.
+            self._conn = None
+
+    def _get_disk(self, key: str, now: float) -> Optional[CachedResponse]:
+        if self._conn is None:
+            return None
+        try:
+            row: Optional[Tuple[str, int, float, int]] = self._conn.execute(
+                "SELECT content, completion_tokens, created_at, size FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            content, completion_tokens, created_at, _ = row
+            if self._expired(created_at, now):
+                self._delete_disk(key)
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            return CachedResponse(content=content, completion_tokens=int(completion_tokens), created_at=created_at)
+        except Exception:
+            return None
+
+    def _put_disk(self, key: str, cached: CachedResponse) -> None:
+        if self._conn is None:
+            return
+        size = len(cached.content.encode("utf-8"))
+        if self.max_disk_bytes and size > self.max_disk_bytes:
+            return
+        try:
+            self._delete_disk(key)
+            self._conn.execute(
+                "INSERT INTO responses (key, content, completion_tokens, created_at, accessed_at, size) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, cached.content, cached.completion_tokens, cached.created_at, cached.created_at, size),
+            )
+            self._disk_bytes += size
+            self._evict_disk()
+        except Exception:
+            return
+
+    def _delete_disk(self, key: str) -> None:
+        if self._conn is None:
+            return
+        try:
+            row = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._disk_bytes = max(0, self._disk_bytes - int(row[0] or 0))
+        except Exception:
+            return
+
+    def _evict_disk(self) -> None:
+        if not self.max_disk_bytes or self._disk_bytes <= self.max_disk_bytes:
+            return
+        while self._disk_bytes > self.max_disk_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at ASC LIMIT 32"
+            ).fetchall()
+            if not rows:
+                self._disk_bytes = 0
+                return
+            for key, size in rows:
+                if self._disk_bytes <= self.max_disk_bytes:
+                    break
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._disk_bytes = max(0, self._disk_bytes - int(size or 0))
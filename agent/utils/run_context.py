@@ -0,0 +1,156 @@
+import asyncio
+import contextvars
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+
+from utils.tracing import Tracer
+
+_current_run: contextvars.ContextVar[Optional["RunContext"]] = contextvars.ContextVar("mycodex_run", default=None)
+
+
+class RunBudgetExceeded(RuntimeError):
+    """The run used its token budget; further model calls are refused."""
+
+
+class RunDeadlineExceeded(TimeoutError):
+    """The run passed its deadline; further model calls are refused."""
+
+
+class RunCancelled(RuntimeError):
+    """The run was cancelled (explicit cancel or client gone); further model calls are refused."""
+
+
+class RunIdInUse(ValueError):
+    """Another run with the same `run_id` is still in progress."""
+
+
+# Errors that end a run: resilience handlers around model calls must let them propagate.
+RUN_ABORTED = (RunBudgetExceeded, RunDeadlineExceeded, RunCancelled)
+
+
+@dataclass
+class RunContext:
+    """
+    State of one run, carried in a context variable instead of on the shared Orchestrator and
+    OllamaClient, so concurrent runs never see each other's scenario, trace or budgets.
+    Asyncio tasks and `asyncio.to_thread` calls started inside the run inherit it.
+    It is also the run's cancellation token: `cancel` (thread-safe) refuses further model calls
+    and cancels the task bound with `bind`, aborting the HTTP requests in flight.
+    """
+
+    run_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    scenario_id: str = "unknown"
+    conversation_id: str = ""
+    tracer: Optional[Tracer] = None
+    # time.monotonic() value after which model calls are refused (None = no deadline).
+    deadline: Optional[float] = None
+    # Prompt + completion tokens allowed for the run (0 = unlimited).
+    token_budget: int = 0
+    tokens_used: int = 0
+    # "deadline" or "cancelled" once the run was aborted ("" while it may continue).
+    cancel_reason: str = ""
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @classmethod
+    def create(
+        cls,
+        scenario_id: str,
+        conversation_id: str = "",
+        tracer: Optional[Tracer] = None,
+        timeout: float = 0.0,
+        token_budget: int = 0,
+        run_id: Optional[str] = None,
+    ) -> "RunContext":
+        return cls(
+            run_id=run_id or uuid.uuid4().hex,
+            scenario_id=scenario_id,
+            conversation_id=conversation_id,
+            tracer=tracer,
+            deadline=time.monotonic() + timeout if timeout > 0 else None,
+            token_budget=max(0, token_budget),
+        )
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline (None without deadline)."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def call_timeout(self, default: float) -> float:
+        """HTTP timeout of a model call: `default`, capped by the time left before the deadline."""
+        remaining = self.remaining()
+        if remaining is None:
+            return default
+        return max(0.001, min(default, remaining))
+
+    def bind(self, task: asyncio.Task) -> None:
+        """Task executing the run, cancelled by `cancel` (at once if the run is already cancelled)."""
+        with self.lock:
+            self.task = task
+            cancelled = bool(self.cancel_reason)
+        if cancelled:
+            task.cancel()
+
+    def cancel(self, reason: str = "cancelled") -> bool:
+        """Abort the run from any thread; False when it was already aborted."""
+        with self.lock:
+            if self.cancel_reason:
+                return False
+            self.cancel_reason = reason
+            task = self.task
+        if task is not None and not task.done():
+            try:
+                task.get_loop().call_soon_threadsafe(task.cancel)
+            except RuntimeError:
+                # Loop already closed: the task cannot run any more.
+                pass
+        return True
+
+    def abort_error(self) -> Exception:
+        """Exception reporting why the run was aborted."""
+        if self.cancel_reason == "deadline":
+            return RunDeadlineExceeded(f"Delai du run depasse ({self.scenario_id}).")
+        return RunCancelled(f"Run annule ({self.scenario_id}).")
+
+    def add_tokens(self, count: int) -> None:
+        with self.lock:
+            self.tokens_used += max(0, count)
+
+    def check(self) -> None:
+        """Raise if the run may not start another model call."""
+        if self.cancel_reason:
+            raise self.abort_error()
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise RunDeadlineExceeded(f"Delai du run depasse ({self.scenario_id}).")
+        if self.token_budget and self.tokens_used >= self.token_budget:
+            raise RunBudgetExceeded(
+                f"Budget de tokens du run epuise ({self.tokens_used}/{self.token_budget}, {self.scenario_id})."
+            )
+
+
+def current_run() -> Optional[RunContext]:
+    return _current_run.get()
+
+
+def current_scenario_id() -> Optional[str]:
+    run = _current_run.get()
+    return run.scenario_id if run is not None else None
+
+
+@contextmanager
+def run_scope(run: RunContext) -> Iterator[RunContext]:
+    """Make `run` the run of the current context for the duration of the block."""
+    token = _current_run.set(run)
+    try:
+        yield run
+    finally:
+        try:
+            _current_run.reset(token)
+        except ValueError:
+            # Token from another context (e.g. generator closed elsewhere): nothing to restore.
+            _current_run.set(None)
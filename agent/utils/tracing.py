@@ -0,0 +1,217 @@
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+SERVICE_NAME = "mycodex"
+
+_current_tracer: contextvars.ContextVar[Optional["Tracer"]] = contextvars.ContextVar("mycodex_tracer", default=None)
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("mycodex_span", default=None)
+
+
+def _new_id(size: int) -> str:
+    return os.urandom(size).hex()
+
+
+def _lane() -> int:
+    """Concurrency lane of the caller: the running asyncio task, else the thread."""
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    return id(task) if task is not None else threading.get_ident()
+
+
+@dataclass
+class Span:
+    name: str
+    span_id: str
+    parent_id: Optional[str]
+    start_ns: int
+    end_ns: int = 0
+    lane: int = 0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: str = ""
+
+    @property
+    def duration_ms(self) -> float:
+        return max(0, (self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+
+class Tracer:
+    """
+    Spans of one run. Spans nest through a context variable, so children opened in asyncio
+    tasks or `asyncio.to_thread` calls started inside a span are attached to it. Exports to
+    OpenTelemetry JSON (OTLP `resourceSpans`) and Chrome trace format (chrome://tracing, Perfetto).
+    """
+
+    def __init__(self, name: str = "run", **attributes: Any) -> None:
+        self.trace_id = _new_id(16)
+        self.name = name
+        self.attributes = attributes
+        self.started_ns = time.time_ns()
+        self.lock = threading.Lock()
+        self.spans: List[Span] = []
+
+    def start(self, name: str, attributes: Dict[str, Any], start_ns: Optional[int] = None) -> Span:
+        parent = _current_span.get()
+        span = Span(
+            name=name,
+            span_id=_new_id(8),
+            parent_id=parent.span_id if parent is not None else None,
+            start_ns=start_ns or time.time_ns(),
+            lane=_lane(),
+            attributes=attributes,
+        )
+        with self.lock:
+            self.spans.append(span)
+        return span
+
+    @property
+    def duration_ms(self) -> float:
+        with self.lock:
+            end = max((span.end_ns for span in self.spans), default=0) or time.time_ns()
+        return max(0, end - self.started_ns) / 1e6
+
+    def summary(self) -> Dict[str, Any]:
+        """Trace id, attributes, duration and total time per span name (ms)."""
+        by_name: Dict[str, float] = {}
+        with self.lock:
+            spans = list(self.spans)
+        for span in spans:
+            by_name[span.name] = round(by_name.get(span.name, 0.0) + span.duration_ms, 2)
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            **{key: value for key, value in self.attributes.items() if isinstance(value, (str, int, float, bool))},
+            "started_at_ms": self.started_ns // 1_000_000,
+            "duration_ms": round(self.duration_ms, 2),
+            "spans": len(spans),
+            "time_by_span_ms": by_name,
+        }
+
+    def to_otel(self) -> Dict[str, Any]:
+        with self.lock:
+            spans = list(self.spans)
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": _otel_attributes({"service.name": SERVICE_NAME})},
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": f"{SERVICE_NAME}.orchestrator"},
+                            "spans": [
+                                {
+                                    "traceId": self.trace_id,
+                                    "spanId": span.span_id,
+                                    "parentSpanId": span.parent_id or "",
+                                    "name": span.name,
+                                    "kind": 1,
+                                    "startTimeUnixNano": str(span.start_ns),
+                                    "endTimeUnixNano": str(span.end_ns or span.start_ns),
+                                    "attributes": _otel_attributes(span.attributes),
+                                    # STATUS_CODE_ERROR = 2, STATUS_CODE_UNSET = 0
+                                    "status": {"code": 2, "message": span.error} if span.error else {"code": 0},
+                                }
+                                for span in spans
+                            ],
+                        }
+                    ],
+                }
+            ]
+        }
+
+    def to_chrome(self) -> Dict[str, Any]:
+        with self.lock:
+            spans = list(self.spans)
+        lanes: Dict[int, int] = {}
+        events: List[Dict[str, Any]] = []
+        for span in sorted(spans, key=lambda item: item.start_ns):
+            tid = lanes.setdefault(span.lane, len(lanes) + 1)
+            args = dict(span.attributes)
+            if span.error:
+                args["error"] = span.error
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": span.name.split(".", 1)[0],
+                    "ph": "X",
+                    "ts": span.start_ns / 1000,
+                    "dur": max(0, (span.end_ns or span.start_ns) - span.start_ns) / 1000,
+                    "pid": 1,
+                    "tid": tid,
+                    "args": args,
+                }
+            )
+        events.insert(0, {"name": "process_name", "ph": "M", "pid": 1, "args": {"name": f"{SERVICE_NAME} {self.trace_id}"}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export(self, fmt: str = "otel") -> Dict[str, Any]:
+        return self.to_chrome() if fmt == "chrome" else self.to_otel()
+
+
+def _otel_attributes(values: Dict[str, Any]) -> List[Dict[str, Any]]:
+    attributes: List[Dict[str, Any]] = []
+    for key, value in values.items():
+        if isinstance(value, bool):
+            typed = {"boolValue": value}
+        elif isinstance(value, int):
+            typed = {"intValue": str(value)}
+        elif isinstance(value, float):
+            typed = {"doubleValue": value}
+        else:
+            typed = {"stringValue": str(value)}
+        attributes.append({"key": key, "value": typed})
+    return attributes
+
+
+def current_tracer() -> Optional[Tracer]:
+    return _current_tracer.get()
+
+
+def activate(tracer: Optional[Tracer]) -> contextvars.Token:
+    """Make `tracer` the tracer of the current context (and of tasks/threads started from it)."""
+    return _current_tracer.set(tracer)
+
+
+def deactivate(token: contextvars.Token) -> None:
+    try:
+        _current_tracer.reset(token)
+    except ValueError:
+        # Token from another context (e.g. generator closed elsewhere): nothing to restore.
+        _current_tracer.set(None)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Open a child span of the current span; no-op (yields None) when no tracer is active."""
+    tracer = _current_tracer.get()
+    if tracer is None:
+        yield None
+        return
+    current = tracer.start(name, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.error = f"{exc.__class__.__name__}: {exc}"
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            pass
+
+
+def record_span(name: str, start_ns: int, end_ns: int, **attributes: Any) -> None:
+    """Add an already finished span (e.g. a queue wait measured around a lock) under the current span."""
+    tracer = _current_tracer.get()
+    if tracer is None:
+        return
+    finished = tracer.start(name, attributes, start_ns=start_ns)
+    finished.end_ns = end_ns
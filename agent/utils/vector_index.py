@@ -0,0 +1,228 @@
+import os
+import threading
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+# Slot of a row dropped by `compact`.
+DROPPED = -1
+
+
+class VectorIndex:
+    """
+    Float32 matrix on disk, one L2-normalized row per vector, memory-mapped for search so stored
+    embeddings are never recomputed nor parsed on start-up. Cosine similarity is a single
+    matrix-vector product over the candidate rows. Requires numpy.
+
+    Callers keep the row number returned by `append`; it stays valid across `compact`, which
+    rewrites the matrix without the dropped rows. A small int64 side file (`<path>.idx`: the
+    matrix generation, then the physical row of each row number) maps the two; without it (files
+    written before compaction existed) row numbers are physical rows.
+    """
+
+    def __init__(self, path: str | Path, dim: int = 0) -> None:
+        try:
+            import numpy
+        except ImportError as exc:
+            raise RuntimeError("Le rappel semantique necessite numpy (pip install numpy).") from exc
+        self._np = numpy
+        self.path = Path(path)
+        self.index_path = self.path.with_suffix(".idx")
+        self.lock = threading.Lock()
+        self.dim = max(0, dim)
+        self._matrix: Any = None
+        self._generation = 0
+        # Row number -> physical row in the current matrix file (DROPPED once compacted away).
+        self._slots: List[int] = []
+        self._load_index()
+        self._physical = self._rows_on_disk()
+        self._remove_stale_files()
+
+    @property
+    def rows(self) -> int:
+        """Row numbers handed out so far (dropped ones included)."""
+        return len(self._slots)
+
+    def contains(self, row: int) -> bool:
+        """Whether `row` still has a vector (not dropped, not lost to an interrupted write)."""
+        with self.lock:
+            return 0 <= row < len(self._slots) and 0 <= self._slots[row] < self._physical
+
+    def reset(self, dim: int) -> None:
+        """Drop every vector (e.g. after switching to a model with another dimension)."""
+        with self.lock:
+            self._matrix = None
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            previous = self._matrix_path()
+            self._generation = 0
+            self.path.write_bytes(b"")
+            self._slots = []
+            self._physical = 0
+            self._write_index()
+            if previous != self.path:
+                self._unlink(previous)
+            self.dim = dim
+
+    def append(self, vector: Sequence[float]) -> int:
+        """Store `vector` and return its row number."""
+        np = self._np
+        values = np.asarray(vector, dtype=np.float32)
+        if values.ndim != 1 or not values.size:
+            raise ValueError("Vecteur d'embedding invalide.")
+        with self.lock:
+            if not self.dim:
+                self.dim = int(values.size)
+                self._physical = self._rows_on_disk()
+            if values.size != self.dim:
+                raise ValueError(f"Dimension d'embedding {values.size} != {self.dim}.")
+            norm = float(np.linalg.norm(values))
+            if norm:
+                values = values / norm
+            path = self._matrix_path()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "ab") as fp:
+                # Written at the current end of file; a row left by an interrupted append is skipped.
+                fp.seek(self._physical * 4 * self.dim)
+                fp.truncate()
+                fp.write(values.tobytes())
+                fp.flush()
+            if not self.index_path.exists():
+                self._write_index()
+            with open(self.index_path, "ab") as fp:
+                fp.write(np.asarray([self._physical], dtype=np.int64).tobytes())
+                fp.flush()
+            row = len(self._slots)
+            self._slots.append(self._physical)
+            self._physical += 1
+            return row
+
+    def search(self, query: Sequence[float], rows: Sequence[int], limit: int) -> List[Tuple[int, float]]:
+        """Best `limit` (row, cosine similarity) pairs among `rows`, highest first."""
+        np = self._np
+        if not rows or limit <= 0 or not self.dim:
+            return []
+        values = np.asarray(query, dtype=np.float32)
+        if values.size != self.dim:
+            return []
+        norm = float(np.linalg.norm(values))
+        if not norm:
+            return []
+        with self.lock:
+            # Translated with the mapping of the same generation; a concurrent compaction swaps both.
+            pairs = [
+                (row, self._slots[row])
+                for row in rows
+                if 0 <= row < len(self._slots) and 0 <= self._slots[row] < self._physical
+            ]
+            matrix = self._mapped() if pairs else None
+        if not pairs:
+            return []
+        candidates = np.asarray([row for row, _ in pairs], dtype=np.int64)
+        physical = np.asarray([slot for _, slot in pairs], dtype=np.int64)
+        similarities = matrix[physical] @ (values / norm)
+        count = min(limit, similarities.size)
+        top = np.argpartition(-similarities, count - 1)[:count]
+        top = top[np.argsort(-similarities[top])]
+        return [(int(candidates[i]), float(similarities[i])) for i in top]
+
+    def compact(self, keep: Iterable[int], since: Optional[int] = None) -> int:
+        """
+        Rewrite the matrix with only the rows in `keep` (plus every row numbered `since` or
+        above, i.e. appended after the caller took its snapshot) and return how many vectors
+        were dropped. Row numbers are unchanged. The new matrix and mapping are written to new
+        files and swapped in by one rename of the mapping, so a crash leaves the old state.
+        """
+        np = self._np
+        with self.lock:
+            total = len(self._slots)
+            since = total if since is None else max(0, since)
+            wanted = {row for row in keep if 0 <= row < total}
+            wanted.update(range(min(since, total), total))
+            kept = sorted(row for row in wanted if 0 <= self._slots[row] < self._physical)
+            dropped = sum(1 for slot in self._slots if 0 <= slot < self._physical) - len(kept)
+            if not self.dim or (dropped <= 0 and self._physical == len(kept)):
+                return 0
+            previous = self._matrix_path()
+            source = self._mapped()
+            self._generation += 1
+            target = self._matrix_path()
+            slots = [DROPPED] * total
+            with open(target, "wb") as fp:
+                for start in range(0, len(kept), 4096):
+                    batch = kept[start : start + 4096]
+                    fp.write(np.ascontiguousarray(source[[self._slots[row] for row in batch]]).tobytes())
+                    for offset, row in enumerate(batch):
+                        slots[row] = start + offset
+                fp.flush()
+                os.fsync(fp.fileno())
+            self._slots = slots
+            self._physical = len(kept)
+            self._matrix = None
+            self._write_index()
+            self._unlink(previous)
+            return max(0, dropped)
+
+    # Internal helpers ----------------------------------------------------------
+    def _matrix_path(self, generation: Optional[int] = None) -> Path:
+        generation = self._generation if generation is None else generation
+        if not generation:
+            return self.path
+        return self.path.with_name(f"{self.path.stem}.{generation}{self.path.suffix}")
+
+    def _load_index(self) -> None:
+        np = self._np
+        try:
+            data = np.fromfile(self.index_path, dtype=np.int64)
+        except (OSError, ValueError):
+            data = None
+        if data is not None and data.size:
+            self._generation = int(data[0])
+            self._slots = [int(slot) for slot in data[1:]]
+        else:
+            # Legacy file: row numbers are physical rows.
+            self._generation = 0
+            self._slots = list(range(self._rows_on_disk()))
+
+    def _write_index(self) -> None:
+        """Replace the mapping file atomically."""
+        np = self._np
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_path.with_name(self.index_path.name + ".tmp")
+        with open(tmp, "wb") as fp:
+            fp.write(np.asarray([self._generation, *self._slots], dtype=np.int64).tobytes())
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(tmp, self.index_path)
+
+    def _remove_stale_files(self) -> None:
+        # Matrices of other generations are leftovers of an interrupted compaction.
+        current = self._matrix_path()
+        pattern = f"{self.path.stem}.*{self.path.suffix}"
+        for path in self.path.parent.glob(pattern):
+            if path != current and path.name[len(self.path.stem) + 1 : -len(self.path.suffix)].isdigit():
+                self._unlink(path)
+        if self._generation and self.path.exists():
+            self._unlink(self.path)
+
+    def _unlink(self, path: Path) -> None:
+        try:
+            path.unlink()
+        except OSError:
+            # Still mapped elsewhere (Windows) or already gone: removed on the next start.
+            pass
+
+    def _rows_on_disk(self) -> int:
+        if not self.dim:
+            return 0
+        try:
+            return os.path.getsize(self._matrix_path()) // (4 * self.dim)
+        except OSError:
+            return 0
+
+    def _mapped(self) -> Any:
+        # Caller holds self.lock.
+        if self._matrix is None or self._matrix.shape[0] < self._physical:
+            # Re-map after appends; the mapping itself is O(1), pages load on demand.
+            self._matrix = self._np.memmap(
+                self._matrix_path(), dtype=self._np.float32, mode="r", shape=(self._physical, self.dim)
+            )
+        return self._matrix
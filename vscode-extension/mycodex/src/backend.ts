@@ -1,4 +1,5 @@
 import * as cp from 'child_process';
+import { randomUUID } from 'crypto';
 import { existsSync } from 'fs';
 import * as http from 'http';
 import * as https from 'https';
@@ -7,6 +8,7 @@ import * as vscode from 'vscode';
 import { Transport } from './types';
 
 type ConversationTurn = { role: string; content: string };
+export type RunEvent = { type: string; stage?: string; status?: string; text?: string; [key: string]: unknown };
 export type MemoryEntry = {
 	id: string;
 	goal: string;
@@ -23,7 +25,9 @@ export async function callBackend(
 	history: ConversationTurn[] = [],
 	sessionId?: string,
 	enableSearch = false,
-	enableOptimize = true
+	enableOptimize = true,
+	onEvent?: (event: RunEvent) => void,
+	signal?: AbortSignal
 ): Promise<unknown> {
 	const config = vscode.workspace.getConfiguration('mycodex');
 	const transport = (config.get<string>('transport', 'http') as Transport) || 'http';
@@ -59,7 +63,11 @@ export async function callBackend(
 			proc.stdout.on('data', (data) => (stdout += data.toString()));
 			proc.stderr.on('data', (data) => (stderr += data.toString()));
 			proc.on('error', (err) => reject(err));
+			signal?.addEventListener('abort', () => proc.kill(), { once: true });
 			proc.on('close', (code) => {
+				if (signal?.aborted) {
+					return reject(new Error('Run annule.'));
+				}
 				if (code !== 0) {
 					return reject(new Error(`CLI exited with code ${code}: ${stderr || stdout}`));
 				}
@@ -82,7 +90,14 @@ export async function callBackend(
 	if (sessionId) {
 		payload.session_id = sessionId;
 	}
-	const httpResult = await postJsonWithLongTimeout(baseUrl, payload);
+	// Known before the first byte so the run can be cancelled server-side at any time.
+	const runId = randomUUID();
+	payload.run_id = runId;
+	signal?.addEventListener('abort', () => void cancelRun(apiRoot, runId), { once: true });
+	if (config.get<boolean>('streaming', true)) {
+		return postJsonStream(`${apiRoot}/run/stream`, payload, onEvent, signal);
+	}
+	const httpResult = await postJsonWithLongTimeout(baseUrl, payload, signal);
 	if (httpResult.status < 200 || httpResult.status >= 300) {
 		const detail = httpResult.body ? `: ${httpResult.body}` : '';
 		throw new Error(`HTTP ${httpResult.status} ${httpResult.statusText}${detail}`);
@@ -117,6 +132,15 @@ export async function deleteMemoryEntry(entryId: string): Promise<void> {
 	}
 }
 
+async function cancelRun(apiRoot: string, runId: string): Promise<void> {
+	// Best effort: closing the connection also stops the run once the server notices it.
+	try {
+		await fetch(`${apiRoot}/run/${encodeURIComponent(runId)}`, { method: 'DELETE' });
+	} catch {
+		// Server unreachable or run already finished.
+	}
+}
+
 function deriveApiRoot(runUrl: string): string {
 	if (!runUrl) {
 		return '';
@@ -200,6 +224,7 @@ function resolveCliCwd(config: vscode.WorkspaceConfiguration): string {
 async function postJsonWithLongTimeout(
 	runUrl: string,
 	payload: Record<string, unknown>,
+	signal?: AbortSignal,
 	timeoutMs = 600_000
 ): Promise<{ status: number; statusText: string; body: string }> {
 	return new Promise((resolve, reject) => {
@@ -240,8 +265,20 @@ async function postJsonWithLongTimeout(
 		req.setTimeout(timeoutMs, () => {
 			req.destroy(new Error(`Timeout apres ${timeoutMs}ms sans reponse`));
 		});
+		signal?.addEventListener(
+			'abort',
+			() => {
+				req.destroy();
+				reject(new Error('Run annule.'));
+			},
+			{ once: true }
+		);
 
 		req.on('error', (err) => {
+			if (signal?.aborted) {
+				reject(new Error('Run annule.'));
+				return;
+			}
 			const reason =
 				err instanceof Error
 					? [err.message, (err as any).code || (err as any).errno].filter(Boolean).join(' | ')
@@ -253,3 +290,122 @@ async function postJsonWithLongTimeout(
 		req.end();
 	});
 }
+
+async function postJsonStream(
+	streamUrl: string,
+	payload: Record<string, unknown>,
+	onEvent?: (event: RunEvent) => void,
+	signal?: AbortSignal,
+	timeoutMs = 600_000
+): Promise<unknown> {
+	return new Promise((resolve, reject) => {
+		let parsed: URL;
+		try {
+			parsed = new URL(streamUrl);
+		} catch (err) {
+			reject(new Error(`URL invalide: ${streamUrl}`));
+			return;
+		}
+
+		const isHttps = parsed.protocol === 'https:';
+		const data = Buffer.from(JSON.stringify(payload));
+		const options: http.RequestOptions = {
+			method: 'POST',
+			hostname: parsed.hostname,
+			port: parsed.port ? Number(parsed.port) : isHttps ? 443 : 80,
+			path: `${parsed.pathname}${parsed.search}`,
+			headers: {
+				'Content-Type': 'application/json',
+				'Content-Length': data.length,
+				Accept: 'application/x-ndjson',
+			},
+		};
+
+		let settled = false;
+		const settle = (fn: () => void) => {
+			if (!settled) {
+				settled = true;
+				fn();
+			}
+		};
+
+		const req = (isHttps ? https : http).request(options, (res) => {
+			const status = res.statusCode || 0;
+			let pending = '';
+			let errorBody = '';
+
+			const handleLine = (line: string) => {
+				if (!line.trim()) {
+					return;
+				}
+				let event: RunEvent;
+				try {
+					event = JSON.parse(line) as RunEvent;
+				} catch {
+					return;
+				}
+				if (event.type === 'result') {
+					settle(() => resolve(event.data));
+				} else if (event.type === 'error') {
+					settle(() => reject(new Error(String(event.detail || 'Erreur inconnue.'))));
+				} else if (onEvent) {
+					onEvent(event);
+				}
+			};
+
+			res.setEncoding('utf-8');
+			res.on('error', (err) => settle(() => reject(err)));
+			res.on('data', (chunk: string) => {
+				if (status < 200 || status >= 300) {
+					errorBody += chunk;
+					return;
+				}
+				pending += chunk;
+				let newline = pending.indexOf('\n');
+				while (newline >= 0) {
+					handleLine(pending.slice(0, newline));
+					pending = pending.slice(newline + 1);
+					newline = pending.indexOf('\n');
+				}
+			});
+			res.on('end', () => {
+				if (status < 200 || status >= 300) {
+					const detail = errorBody ? `: ${errorBody}` : '';
+					settle(() => reject(new Error(`HTTP ${status} ${res.statusMessage || ''}${detail}`)));
+					return;
+				}
+				handleLine(pending);
+				settle(() => reject(new Error('Flux /api/run/stream termine sans resultat.')));
+			});
+		});
+
+		// The timeout only fires when the stream stays silent, so long runs keep going as long as events arrive.
+		req.setTimeout(timeoutMs, () => {
+			req.destroy(new Error(`Timeout apres ${timeoutMs}ms sans evenement`));
+		});
+		// Closing the stream is enough for the server to stop the run.
+		signal?.addEventListener(
+			'abort',
+			() => {
+				req.destroy();
+				settle(() => reject(new Error('Run annule.')));
+			},
+			{ once: true }
+		);
+
+		req.on('error', (err) => {
+			if (signal?.aborted) {
+				settle(() => reject(new Error('Run annule.')));
+				return;
+			}
+			const reason =
+				err instanceof Error
+					? [err.message, (err as any).code || (err as any).errno].filter(Boolean).join(' | ')
+					: String(err);
+			settle(() => reject(new Error(`Appel /api/run/stream echoue: ${reason || 'erreur inconnue'}`)));
+		});
+
+		req.write(data);
+		req.end();
+	});
+}
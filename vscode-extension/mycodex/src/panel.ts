@@ -10,9 +10,18 @@ export class CodexPanel {
 	private constructor(panel: vscode.WebviewPanel) {
 		this.panel = panel;
 		this.panel.webview.html = buildHtml(this.panel.webview);
-		this.panel.webview.onDidReceiveMessage(createMessageHandler(this.panel.webview), null, this.disposables);
-
-		this.panel.onDidDispose(() => this.dispose(), null, this.disposables);
+		const handler = createMessageHandler(this.panel.webview);
+		this.panel.webview.onDidReceiveMessage(handler, null, this.disposables);
+
+		// Closing the panel cancels the run it was waiting for.
+		this.panel.onDidDispose(
+			() => {
+				handler.cancelPending();
+				this.dispose();
+			},
+			null,
+			this.disposables
+		);
 	}
 
 	public static render(): CodexPanel {
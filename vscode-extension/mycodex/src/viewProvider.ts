@@ -7,6 +7,8 @@ export class CodexViewProvider implements vscode.WebviewViewProvider {
 	resolveWebviewView(webviewView: vscode.WebviewView): void {
 		webviewView.webview.options = { enableScripts: true };
 		webviewView.webview.html = buildHtml(webviewView.webview);
-		webviewView.webview.onDidReceiveMessage(createMessageHandler(webviewView.webview));
+		const handler = createMessageHandler(webviewView.webview);
+		webviewView.webview.onDidReceiveMessage(handler);
+		webviewView.onDidDispose(() => handler.cancelPending());
 	}
 }
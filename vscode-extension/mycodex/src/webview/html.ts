@@ -1347,8 +1347,19 @@ export function buildHtml(webview: vscode.Webview): string {
 
             function setLoading(isLoading) {
               state.sending = isLoading;
-              sendBtn.disabled = isLoading;
-              sendBtn.textContent = isLoading ? 'Envoi...' : 'Envoyer';
+              // While a run is in progress the button cancels it (server side included).
+              sendBtn.disabled = false;
+              sendBtn.textContent = isLoading ? 'Annuler' : 'Envoyer';
+              sendBtn.title = isLoading ? 'Annuler le run en cours' : 'Envoyer';
+            }
+
+            function cancelPrompt() {
+              if (!state.sending) {
+                return;
+              }
+              sendBtn.disabled = true;
+              setStatus('Annulation...', 'busy');
+              vscode.postMessage({ type: 'cancel' });
             }
 
             function sendPrompt() {
@@ -1410,7 +1421,35 @@ export function buildHtml(webview: vscode.Webview): string {
               }
             }
 
-            sendBtn.addEventListener('click', sendPrompt);
+            const stageLabels = {
+              optimizer: 'Optimisation du prompt',
+              planner: 'Planification',
+              executor: 'Execution',
+              reviewer: 'Revision',
+              critic: 'Critique',
+              self_correction: 'Self-correction',
+              responder: 'Redaction de la reponse',
+            };
+            let streamedChars = 0;
+
+            function handleProgressMessage(event) {
+              if (!event || !event.stage) {
+                return;
+              }
+              const label = stageLabels[event.stage] || event.stage;
+              const suffix = event.task_id !== undefined ? ' (tache ' + event.task_id + ')' : '';
+              if (event.type === 'stage' && event.status === 'start') {
+                streamedChars = 0;
+                setStatus(label + suffix + '...', 'busy');
+                return;
+              }
+              if (event.type === 'token') {
+                streamedChars += String(event.text || '').length;
+                setStatus(label + suffix + '... ' + streamedChars + ' car. recus', 'busy');
+              }
+            }
+
+            sendBtn.addEventListener('click', () => (state.sending ? cancelPrompt() : sendPrompt()));
             promptEl.addEventListener('keydown', (event) => {
               if (event.key === 'Enter' && !event.shiftKey) {
                 event.preventDefault();
@@ -1516,6 +1555,11 @@ export function buildHtml(webview: vscode.Webview): string {
                 return;
               }
 
+              if (msg.type === 'progress') {
+                handleProgressMessage(msg.event);
+                return;
+              }
+
               if (msg.type === 'response') {
                 handleResponseMessage(msg);
               }
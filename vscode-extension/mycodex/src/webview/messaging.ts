@@ -4,7 +4,15 @@ import { callBackend, deleteMemoryEntry, fetchMemoryEntries } from '../backend';
 import { isUriInsideWorkspace } from '../utils/workspace';
 
 export function createMessageHandler(webview: vscode.Webview) {
-	return async (message: any) => {
+	// Run in progress for this webview, aborted by a 'cancel' message or when the view is disposed.
+	let pending: AbortController | undefined;
+
+	const handler = async (message: any) => {
+		if (message?.type === 'cancel') {
+			pending?.abort();
+			return;
+		}
+
 		if (message?.type === 'ask') {
 			const prompt = String(message.prompt ?? '');
 			const context = String(message.context ?? '');
@@ -17,12 +25,27 @@ export function createMessageHandler(webview: vscode.Webview) {
 				return;
 			}
 
+			const controller = new AbortController();
+			pending = controller;
 			try {
-				const result = await callBackend(prompt, context, history, sessionId, enableSearch, enableOptimize);
+				const result = await callBackend(
+					prompt,
+					context,
+					history,
+					sessionId,
+					enableSearch,
+					enableOptimize,
+					(event) => webview.postMessage({ type: 'progress', event }),
+					controller.signal
+				);
 				webview.postMessage({ type: 'response', ok: true, data: result });
 			} catch (err: unknown) {
 				const msg = err instanceof Error ? err.message : 'Erreur inconnue.';
 				webview.postMessage({ type: 'response', ok: false, data: msg });
+			} finally {
+				if (pending === controller) {
+					pending = undefined;
+				}
 			}
 			return;
 		}
@@ -133,4 +156,8 @@ export function createMessageHandler(webview: vscode.Webview) {
 			}
 		}
 	};
+
+	return Object.assign(handler, {
+		cancelPending: () => pending?.abort(),
+	});
 }